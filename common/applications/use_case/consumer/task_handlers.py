@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+import time
+from functools import partial
+
+from common.constants import MOCK_PROCESSING_TIME
+from common.domain.models import DEFAULT_TASK_TYPE, Task, TaskRecord
+from common.domain.services.task_handler import BatchTaskHandler, ExecutionBackend, TaskHandler
+
+CHECKSUM_ROUNDS = 200_000
+
+
+async def mock_processing(payload: str, sleep_time: float = MOCK_PROCESSING_TIME):
+    """模擬 non-blocking IO"""
+    await asyncio.sleep(sleep_time)
+
+
+def blocking_io(payload: str, sleep_time: float = MOCK_PROCESSING_TIME):
+    """模擬 blocking IO (例如沒有 async driver 的 SDK)"""
+    time.sleep(sleep_time)
+
+
+def compute_checksum(payload: str, rounds: int = CHECKSUM_ROUNDS) -> str:
+    """CPU-bound: 反覆 hash payload"""
+    digest = payload.encode()
+    for _ in range(rounds):
+        digest = hashlib.sha256(digest).digest()
+    return digest.hex()
+
+
+async def mock_bulk_request(tasks: list[Task | TaskRecord], sleep_time: float = MOCK_PROCESSING_TIME) -> list[None]:
+    """模擬下游的 bulk API: 整批 task 只需要一次 round trip"""
+    await asyncio.sleep(sleep_time)
+    return [None] * len(tasks)
+
+
+def create_default_task_handlers(
+    sleep_time: float = MOCK_PROCESSING_TIME,
+) -> list[TaskHandler | BatchTaskHandler]:
+    return [
+        TaskHandler(
+            task_type=DEFAULT_TASK_TYPE,
+            func=partial(mock_processing, sleep_time=sleep_time),
+            expected_duration=sleep_time,
+        ),
+        TaskHandler(
+            task_type="blocking_io",
+            func=partial(blocking_io, sleep_time=sleep_time),
+            backend=ExecutionBackend.THREAD,
+            expected_duration=sleep_time,
+        ),
+        TaskHandler(
+            task_type="checksum",
+            func=compute_checksum,
+            backend=ExecutionBackend.PROCESS,
+            memoize=True,
+        ),
+        BatchTaskHandler(
+            task_type="bulk",
+            func=partial(mock_bulk_request, sleep_time=sleep_time),
+            max_batch_size=500,
+        ),
+    ]
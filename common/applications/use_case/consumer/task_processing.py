@@ -1,15 +1,17 @@
 import asyncio
-import json
+from contextlib import AbstractAsyncContextManager
 from datetime import datetime
+from typing import Callable
 
-from aio_pika import IncomingMessage
 from loguru import logger
 
-from common.constants import MOCK_PROCESSING_TIME
-from common.domain.models import Task, TaskStatus
+from common.domain.models import Task, TaskRecord, TaskStatus
 from common.domain.repo.task_repo import ITaskRepository
+from common.domain.services.consume_queue_service import TaskMessage
 from common.domain.services.prometheus_service import IPrometheusMetricsService
-from common.domain.services.task_cancellation_cache import ITaskCancellationCache
+from common.domain.services.task_handler import BatchTaskHandler, ITaskHandlerRegistry, UnknownTaskTypeError
+from common.domain.services.task_result_cache import ITaskResultCache
+from common.domain.services.task_status_cache import ITaskStatusCache
 
 rabbitmq_connected = False
 routing_key = "task_queue"
@@ -18,93 +20,263 @@ routing_key = "task_queue"
 class TaskProcessUseCase:
     def __init__(
         self,
-        task_repository: ITaskRepository,
+        task_repo_factory: Callable[[], AbstractAsyncContextManager[ITaskRepository]],
         metrics: IPrometheusMetricsService,
-        cancellation_cache: ITaskCancellationCache,
-        sleep_time: float = MOCK_PROCESSING_TIME,
+        status_cache: ITaskStatusCache,
+        handler_registry: ITaskHandlerRegistry,
+        result_cache: ITaskResultCache | None = None,
     ):
-        self.repo = task_repository
+        # 每個階段各自從 pool 借一個 session, 並行的 batch / task 不會共用同一個 AsyncSession
+        self.task_repo_factory = task_repo_factory
         self.metrics = metrics
-        self.cancellation_cache = cancellation_cache
+        self.status_cache = status_cache
+        self.handler_registry = handler_registry
+        self.result_cache = result_cache
 
-        self.sleep_time = sleep_time
+        # 執行中的 task, 收到取消事件時用來中斷
+        self._running: dict[int, asyncio.Task] = {}
+        # 已要求中斷的 task_id -> 取消時間
+        self._interrupted: dict[int, float] = {}
 
-    async def task_processing(self, task: Task) -> int:
+    async def start_tasks(self, task_ids: list[int]) -> list[Task | TaskRecord]:
         """
+        用一個 compare-and-set UPDATE 把 PENDING 的 task 標記為 PROCESSING 並讀回，不需要另外讀取
+        已取消、已完成或被其他 consumer 取走的 task 不會被 claim, 回傳需要執行的 task
+        """
+        async with self.task_repo_factory() as repo:
+            claimed_tasks = await repo.claim_tasks(task_ids)
+        if len(claimed_tasks) < len(task_ids):
+            claimed_task_ids = {task.id for task in claimed_tasks}
+            skipped_task_ids = [task_id for task_id in task_ids if task_id not in claimed_task_ids]
+            logger.warning(f"跳過非 PENDING 狀態的任務 {skipped_task_ids}")
+        if not claimed_tasks:
+            return []
+
+        started_at = datetime.now().timestamp()
+        started_tasks = []
+        unhandled_tasks = []
+        for task in claimed_tasks:
+            if not self._has_handler(task):
+                # requeue 也不會成功，直接以 FAILED 結束這個 task, 不會被誤認為使用者取消
+                logger.error(f"任務 {task.id} 的 task_type {task.task_type!r} 沒有對應的 handler")
+                task.mark_failed()
+                unhandled_tasks.append(task)
+                continue
+            if task.created_at:
+                self.metrics.observe_queue_wait(task.priority.value, started_at - task.created_at.timestamp())
+            started_tasks.append(task)
+
+        if unhandled_tasks:
+            async with self.task_repo_factory() as repo:
+                failed_task_ids = set(
+                    await repo.update_tasks(unhandled_tasks, expected_statuses=[TaskStatus.PROCESSING])
+                )
+            for task in unhandled_tasks:
+                if task.id in failed_task_ids:
+                    await self.metrics.inc_label("failed")
+                else:
+                    # claim 之後被 web_api 取消, database 已經是 CANCELED
+                    task.status = TaskStatus.CANCELED
+        # 先寫 database 再寫 projection, web_api 的 backfill 只會 NX 寫入，不會蓋掉這裡的狀態
+        await self.status_cache.set_statuses({task.id: task.status for task in claimed_tasks})
+        return started_tasks
+
+    def _has_handler(self, task: Task | TaskRecord) -> bool:
+        try:
+            self.handler_registry.get(task.task_type)
+        except UnknownTaskTypeError:
+            return False
+        return True
+
+    async def task_processing(self, task: Task | TaskRecord) -> int:
+        """
+        依 task_type 找到 handler 執行已標記為 PROCESSING 的 task, 狀態寫回由 finish_tasks 以 compare-and-set 整批處理
+        執行中收到取消事件會被中斷並標記為 CANCELED
+        handler 宣告 memoize 且啟用 result cache 時，相同 (task_type, payload) 的 task 共用同一次執行結果
         回傳 task.id 會避免 Message 被 requeue
         """
         started_processing_at = datetime.now().timestamp()
-
-        await self.metrics.inc_label("received")
         logger.info(f"開始處理任務: {task.id}")
 
-        if task.status != TaskStatus.PENDING:
-            logger.warning(f"跳過非 PENDING 狀態的任務 {task.id}")
-            return task.id
+        handler = self.handler_registry.get(task.task_type)
+        try:
+            if self.result_cache and handler.memoize:
+                await self.result_cache.get_or_compute(
+                    task.task_type, task.payload, lambda: self.handler_registry.run(handler, task)
+                )
+            else:
+                await self.handler_registry.run(handler, task)
+        except asyncio.CancelledError:
+            cancelled_at = self._interrupted.pop(task.id, None)
+            if cancelled_at is None:
+                # 不是取消事件造成的中斷 (例如 consumer 關閉), 照常往外拋
+                raise
+            asyncio.current_task().uncancel()
+            return await self._finish_interrupted_task(task, cancelled_at, started_processing_at)
 
-        # 檢查任務是否被取消
-        if await self.cancellation_cache.is_task_cancelled(task.id):
-            logger.info(f"任務 {task.id} 已被取消，停止處理")
-            task.cancel()
-            await self.repo.update_task(task)
-            return task.id
+        self.metrics.observe_processing_time(datetime.now().timestamp() - started_processing_at)
+        return task.id
 
-        task.mark_processing()
-        await self.repo.update_task(task)
+    async def _finish_interrupted_task(
+        self, task: Task | TaskRecord, cancelled_at: float, started_processing_at: float
+    ) -> int:
+        try:
+            handler = self.handler_registry.get(task.task_type)
+        except UnknownTaskTypeError:
+            handler = None
+        if handler and handler.on_interrupted:
+            # 讓 handler 釋放處理過程中取得的資源
+            await handler.on_interrupted(task)
+        task.cancel()
 
-        await asyncio.sleep(self.sleep_time)
+        interrupted_at = datetime.now().timestamp()
+        self.metrics.observe_interruption_latency(max(0.0, interrupted_at - cancelled_at))
+        if handler:
+            self.metrics.observe_interruption_time_saved(
+                max(0.0, handler.expected_duration - (interrupted_at - started_processing_at))
+            )
+        logger.info(f"任務 {task.id} 在處理過程中被取消，已中斷執行")
+        return task.id
 
-        # 檢查任務是否被取消
-        if await self.cancellation_cache.is_task_cancelled(task.id):
-            logger.info(f"任務 {task.id} 在處理過程中被取消")
-            task.cancel()
-            await self.repo.update_task(task)
-            return task.id
+    def interrupt_task(self, task_id: int, cancelled_at: float):
+        """取消事件的 callback: 中斷執行中的 task, 釋出它佔用的處理時間"""
+        running = self._running.get(task_id)
+        if running is None or running.done():
+            return
+        self._interrupted[task_id] = cancelled_at
+        running.cancel()
 
-        task.mark_completed()
+    async def finish_tasks(self, tasks: list[Task | TaskRecord], failed_task_ids: set[int]):
+        """
+        整批用一個 compare-and-set UPDATE 寫回最終狀態 (只更新仍是 PROCESSING 的 task):
+        執行成功 -> COMPLETED, 被中斷 -> CANCELED, 執行失敗 -> PENDING (requeue 後可以再被 claim)
+        執行期間被 web_api 取消的 task, database 已經是 CANCELED, 這裡的結果不會寫入,
+        projection 也寫 CANCELED, 不會被 COMPLETED / PENDING 蓋掉
+        """
+        if not tasks:
+            return
 
-        end_processing_at = datetime.now().timestamp()
-        processing_duration = end_processing_at - started_processing_at
-        self.metrics.observe_processing_time(processing_duration)
+        for task in tasks:
+            if task.id in failed_task_ids:
+                task.release()
+            elif task.status == TaskStatus.PROCESSING:
+                task.mark_completed()
 
-        execution_duration = end_processing_at - task.created_at.timestamp()
-        self.metrics.observe_execution_time(execution_duration)
-        await self.metrics.inc_label("success")
+        async with self.task_repo_factory() as repo:
+            updated_task_ids = set(await repo.update_tasks(tasks, expected_statuses=[TaskStatus.PROCESSING]))
 
-        return task.id
+        finished_at = datetime.now().timestamp()
+        for task in tasks:
+            if task.id not in updated_task_ids:
+                if task.status != TaskStatus.CANCELED:
+                    logger.info(f"任務 {task.id} 在處理過程中被取消")
+                    task.status = TaskStatus.CANCELED
+                continue
+            if task.status != TaskStatus.COMPLETED:
+                continue
+            self.metrics.observe_execution_time(finished_at - task.created_at.timestamp())
+            await self.metrics.inc_label("success")
 
-    # TODO: 介面上出現 `IncomingMessage` 不太合適，應該移往 infra 或 main.py, 只需要接受 task_ids 並回傳 success_task_ids
-    async def process_batch(self, messages: list[IncomingMessage]) -> list[int]:
+        await self.status_cache.set_statuses({task.id: task.status for task in tasks})
+
+    async def fail_tasks(self, task_ids: list[int]):
+        """
+        dead_letter_handler: 重試次數用完或無法解析而送進 dead-letter queue 的 task 不會再被執行,
+        仍是 PENDING 的改為 FAILED, 等待中的 long-poll / SSE 才會結束; replay 時再改回 PENDING
         """
-        目前效能瓶頸是 database IO, 透過 batch query & batch update 來減少 database IO
+        async with self.task_repo_factory() as repo:
+            failed_task_ids = await repo.transition_tasks(
+                task_ids, TaskStatus.FAILED, expected_statuses=[TaskStatus.PENDING]
+            )
+        if not failed_task_ids:
+            return
 
+        logger.error(f"任務 {failed_task_ids} 已送進 dead-letter queue, 標記為 FAILED")
+        for _ in failed_task_ids:
+            await self.metrics.inc_label("failed")
+        await self.status_cache.set_statuses({task_id: TaskStatus.FAILED for task_id in failed_task_ids})
+
+    async def _run_tasks(self, tasks: list[Task | TaskRecord]) -> dict[int, int | BaseException]:
         """
-        task_ids: list[int] = []
-        for message in messages:
-            try:
-                message_content = json.loads(message.body)
-                task_id = message_content["task_id"]
-                task_ids.append(task_id)
-            except Exception as e:
-                logger.exception(f"解析消息時出現錯誤: {e}")
-                continue
+        一般 handler 每個 task 各自一個 asyncio task (可以個別中斷),
+        batch handler 依 task_type 重新分組後整組交給 handler
+        回傳 task_id -> task_id 或失敗的 exception
+        """
+        single_tasks: list[Task | TaskRecord] = []
+        groups: dict[str, list[Task | TaskRecord]] = {}
+        for task in tasks:
+            if isinstance(self.handler_registry.get(task.task_type), BatchTaskHandler):
+                groups.setdefault(task.task_type, []).append(task)
+            else:
+                single_tasks.append(task)
 
-        tasks = await self.repo.get_tasks_by_ids(task_ids)
+        group_runs = []
+        for task_type, group in groups.items():
+            handler = self.handler_registry.get(task_type)
+            chunk_size = handler.max_batch_size or len(group)
+            chunks = [group[index : index + chunk_size] for index in range(0, len(group), chunk_size)]  # noqa: E203
+            group_runs.extend(self.process_task_group(handler, chunk) for chunk in chunks)
 
         # 發揮 async 的 concurrency 優勢
-        processing_tasks = [self.task_processing(task) for task in tasks]
-        completed_tasks = await asyncio.gather(*processing_tasks, return_exceptions=True)
+        running = {task.id: asyncio.create_task(self.task_processing(task)) for task in single_tasks}
+        self._running.update(running)
+        try:
+            single_results, *group_results = await asyncio.gather(
+                asyncio.gather(*running.values(), return_exceptions=True), *group_runs
+            )
+            results: dict[int, int | BaseException] = {}
+            for task, result in zip(single_tasks, single_results):
+                # 還沒開始執行就被中斷的 task, CancelledError 不會進到 task_processing 內
+                if isinstance(result, asyncio.CancelledError) and task.id in self._interrupted:
+                    result = await self._finish_interrupted_task(
+                        task, self._interrupted.pop(task.id), datetime.now().timestamp()
+                    )
+                results[task.id] = result
+        finally:
+            for task_id in running:
+                self._running.pop(task_id, None)
+                self._interrupted.pop(task_id, None)
 
-        await self.repo.update_tasks(tasks)
+        for group_result in group_results:
+            results.update(group_result)
+        return results
 
-        success_task_ids = []
-        for message, result in zip(messages, completed_tasks):
-            if isinstance(result, Exception):
-                continue
+    async def process_task_group(
+        self, handler: BatchTaskHandler, tasks: list[Task | TaskRecord]
+    ) -> dict[int, int | BaseException]:
+        """把同一個 task_type 的 task 一次交給 batch handler, 回傳每個 task 的結果"""
+        started_processing_at = datetime.now().timestamp()
+        logger.info(f"開始批次處理 {len(tasks)} 個 {handler.task_type} 任務")
+        try:
+            outcomes = await self.handler_registry.run_batch(handler, tasks)
+        except Exception as e:
+            logger.error(f"Batch handler {handler.task_type!r} failed: {e}")
+            return {task.id: e for task in tasks}
 
-            if not isinstance(result, int):
+        processing_duration = datetime.now().timestamp() - started_processing_at
+        results: dict[int, int | BaseException] = {}
+        for task, outcome in zip(tasks, outcomes):
+            if isinstance(outcome, BaseException):
+                results[task.id] = outcome
                 continue
+            self.metrics.observe_processing_time(processing_duration)
+            results[task.id] = task.id
+        return results
+
+    async def process_batch(self, task_messages: list[TaskMessage]) -> list[int]:
+        """
+        目前效能瓶頸是 database IO, 整批只有兩次 query: claim (標記 PROCESSING 並讀回)、寫回最終狀態
+        取消由 compare-and-set 的結果決定，不需要另外查詢取消標記
+        """
+        task_ids = [task_message.task_id for task_message in task_messages]
+        for _ in task_ids:
+            await self.metrics.inc_label("received")
+
+        started_tasks = await self.start_tasks(task_ids)
+        results = await self._run_tasks(started_tasks)
 
-            success_task_ids.append(result)
+        failed_task_ids = {task_id for task_id, result in results.items() if not isinstance(result, int)}
+        await self.finish_tasks(started_tasks, failed_task_ids)
 
-        return success_task_ids
+        # 跳過與取消的 task 也算成功，只有執行失敗的 task 會被 requeue
+        return [task_id for task_id in task_ids if task_id not in failed_task_ids]
@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+from loguru import logger
+
+from common.domain.repo.task_outbox_repo import ITaskOutboxRepository
+from common.domain.services.send_to_queue_service import ISendToQueueService
+
+
+class OutboxRelayUseCase:
+    def __init__(
+        self,
+        outbox_repo_factory: Callable[[], AbstractAsyncContextManager[ITaskOutboxRepository]],
+        task_queue_service: ISendToQueueService,
+        batch_size: int = 500,
+        idle_interval: float = 0.05,
+    ):
+        self.outbox_repo_factory = outbox_repo_factory
+        self.task_queue_service = task_queue_service
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+
+    async def relay_batch(self) -> int:
+        """
+        鎖定一批 outbox entry -> 一次 pipeline publish -> 刪除並 commit
+        publish 失敗時 session 結束會 rollback, entry 留在 outbox 等下一輪 (at-least-once)
+        """
+        async with self.outbox_repo_factory() as outbox_repo:
+            entries = await outbox_repo.lock_pending(self.batch_size)
+            if not entries:
+                return 0
+
+            await self.task_queue_service.send_messages(
+                messages=[
+                    {"task_id": entry.task_id, "payload": entry.payload, "priority": entry.priority.value}
+                    for entry in entries
+                ],
+            )
+            await outbox_repo.delete([entry.id for entry in entries])
+
+        logger.info(f"Relayed {len(entries)} outbox entries")
+        return len(entries)
+
+    async def run(self):
+        while True:
+            try:
+                relayed = await self.relay_batch()
+            except Exception as e:
+                logger.error(f"Outbox relay failed: {e}")
+                relayed = 0
+
+            # outbox 已清空時才休息，backlog 存在時連續 drain
+            if relayed < self.batch_size:
+                await asyncio.sleep(self.idle_interval)
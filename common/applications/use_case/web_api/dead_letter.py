@@ -0,0 +1,45 @@
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+from common.domain.models import TaskStatus
+from common.domain.repo.task_repo import ITaskRepository
+from common.domain.services.dead_letter_queue import DeadLetter, IDeadLetterQueueService
+from common.domain.services.task_status_cache import ITaskStatusCache
+
+
+class DeadLetterUseCase:
+    """
+    重試次數用完或無法解析的 message 會留在 dead-letter queue (task 是 FAILED), 修正問題後再 replay 回原本的 queue
+    replay 前把 task 改回 PENDING, 送不出去的 task 再改回 FAILED
+    """
+
+    def __init__(
+        self,
+        dead_letter_queue_service: IDeadLetterQueueService,
+        task_repo_factory: Callable[[], AbstractAsyncContextManager[ITaskRepository]],
+        status_cache: ITaskStatusCache,
+    ):
+        self.dead_letter_queue_service = dead_letter_queue_service
+        self.task_repo_factory = task_repo_factory
+        self.status_cache = status_cache
+
+    async def list_dead_letters(self, limit: int) -> list[DeadLetter]:
+        return await self.dead_letter_queue_service.peek(limit)
+
+    async def replay_dead_letters(self, limit: int) -> int:
+        return await self.dead_letter_queue_service.replay(
+            limit, on_replay=self._requeue_tasks, on_replay_failed=self._fail_tasks
+        )
+
+    async def _requeue_tasks(self, task_ids: list[int]):
+        await self._transition_tasks(task_ids, TaskStatus.PENDING, expected_status=TaskStatus.FAILED)
+
+    async def _fail_tasks(self, task_ids: list[int]):
+        await self._transition_tasks(task_ids, TaskStatus.FAILED, expected_status=TaskStatus.PENDING)
+
+    async def _transition_tasks(self, task_ids: list[int], status: TaskStatus, expected_status: TaskStatus):
+        # 只有 compare-and-set 成功的 task 寫入 projection, 期間被取消的 task 維持 CANCELED
+        async with self.task_repo_factory() as repo:
+            updated_task_ids = await repo.transition_tasks(task_ids, status, expected_statuses=[expected_status])
+        if updated_task_ids:
+            await self.status_cache.set_statuses({task_id: status for task_id in updated_task_ids})
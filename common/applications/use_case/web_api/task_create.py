@@ -1,33 +1,98 @@
-from common.domain.models import Task, TaskStatus
+import asyncio
+import hashlib
+import json
+from contextlib import suppress
+
+from loguru import logger
+
+from common.domain.models import DEFAULT_TASK_TYPE, Task, TaskPriority, TaskStatus
 from common.domain.repo.task_repo import ITaskRepository
-from common.domain.services.send_to_queue_service import ISendToQueueService
+from common.domain.services.idempotency_store import IdempotencyRecord, IIdempotencyStore
 from common.domain.services.task_cancellation_cache import ITaskCancellationCache
+from common.domain.services.task_create_batcher import ITaskCreateBatcher
+from common.domain.services.task_status_cache import ITaskStatusCache
 
 
 class CreateTaskUseCase:
+    """
+    task 與 outbox entry 在同一個 transaction 寫入，publish 交給 OutboxRelayUseCase,
+    HTTP path 只花一個 DB transaction, 也不會因為 crash 留下沒有 message 的 PENDING task
+    """
+
     def __init__(
         self,
         task_repo: ITaskRepository,
-        task_queue_service: ISendToQueueService,
+        task_create_batcher: ITaskCreateBatcher | None = None,
+        idempotency_store: IIdempotencyStore | None = None,
     ):
         self.task_repo = task_repo
-        self.task_queue_service = task_queue_service
-
-    async def create_task(self, payload: str) -> Task:
-        task = await self.task_repo.create_task(payload)
-        await self.task_queue_service.send_message(
-            message={
-                "task_id": task.id,
-                "payload": task.payload,
-            },
-        )
+        self.task_create_batcher = task_create_batcher
+        self.idempotency_store = idempotency_store
+
+    async def create_task(
+        self,
+        payload: str,
+        task_type: str = DEFAULT_TASK_TYPE,
+        priority: TaskPriority = TaskPriority.NORMAL,
+        idempotency_key: str | None = None,
+    ) -> Task:
+        if not idempotency_key or not self.idempotency_store:
+            return await self._create_task(payload, task_type, priority)
+
+        # client timeout 後重試的 request 直接拿到第一次的結果，不會再寫 database / outbox
+        fingerprint = self._fingerprint(payload, task_type, priority)
+        record = await self.idempotency_store.reserve(idempotency_key, fingerprint)
+        if record:
+            return Task(
+                id=record.task_id, payload=payload, status=record.status, task_type=task_type, priority=priority
+            )
+
+        keep_reserved = asyncio.create_task(self.idempotency_store.keep_reserved(idempotency_key))
+        try:
+            task = await self._create_task(payload, task_type, priority)
+        except BaseException:
+            await self.idempotency_store.release(idempotency_key)
+            raise
+        finally:
+            # 等到延長 TTL 的 EXPIRE 結束，才不會在 complete 之後把 dedup window 縮短回 pending TTL
+            keep_reserved.cancel()
+            with suppress(asyncio.CancelledError):
+                await keep_reserved
+
+        try:
+            await self.idempotency_store.complete(
+                idempotency_key, fingerprint, IdempotencyRecord(task_id=task.id, status=task.status)
+            )
+        except Exception as e:
+            # task 與 outbox entry 已經 commit, 回 500 只會讓 client 重試並建立重複的 task
+            logger.error(f"Failed to save Idempotency-Key {idempotency_key} for task {task.id}: {e}")
         return task
 
+    @staticmethod
+    def _fingerprint(payload: str, task_type: str, priority: TaskPriority) -> str:
+        return hashlib.sha256(json.dumps([task_type, priority.value, payload]).encode()).hexdigest()
+
+    async def _create_task(self, payload: str, task_type: str, priority: TaskPriority) -> Task:
+        if self.task_create_batcher:
+            return await self.task_create_batcher.create_task(payload, task_type, priority)
+        return await self.task_repo.create_task(payload, task_type, priority)
+
+    async def create_tasks(
+        self, payloads: list[str], task_type: str = DEFAULT_TASK_TYPE, priority: TaskPriority = TaskPriority.NORMAL
+    ) -> list[Task]:
+        return await self.task_repo.create_tasks(payloads, [task_type] * len(payloads), [priority] * len(payloads))
+
 
 class CancelTaskUseCase:
-    def __init__(self, task_repo: ITaskRepository, cancellation_cache: ITaskCancellationCache):
+    def __init__(
+        self,
+        task_repo: ITaskRepository,
+        cancellation_cache: ITaskCancellationCache,
+        status_cache: ITaskStatusCache,
+    ):
         self.task_repo = task_repo
         self.cancellation_cache = cancellation_cache
+        self.status_cache = status_cache
 
     async def cancel_task(self, task_id: int) -> Task:
         task = await self.task_repo.get_task(task_id)
@@ -35,11 +100,15 @@ class CancelTaskUseCase:
         if task.status not in [TaskStatus.PENDING, TaskStatus.PROCESSING]:
             raise ValueError("Cannot cancel a completed or already canceled task")
 
-        # 注意這邊是 double write, 會有資料一致性相關的 edge case
+        # compare-and-set: 讀取之後才完成的 task 不會被改成 CANCELED
         task.cancel()
-        await self.task_repo.update_task(task)
+        if not await self.task_repo.update_tasks([task], expected_statuses=[TaskStatus.PENDING, TaskStatus.PROCESSING]):
+            raise ValueError("Cannot cancel a completed or already canceled task")
+
+        # 注意這邊是 double write, 會有資料一致性相關的 edge case
 
         # 設置取消標記
         await self.cancellation_cache.set_task_cancelled(task_id)
+        await self.status_cache.set_statuses({task.id: task.status})
 
         return task
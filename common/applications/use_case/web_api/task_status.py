@@ -0,0 +1,115 @@
+import asyncio
+from contextlib import AbstractAsyncContextManager
+from typing import AsyncIterator, Callable
+
+from common.domain.models import FINAL_TASK_STATUSES, TaskStatus
+from common.domain.repo.task_repo import ITaskRepository, TaskNotFoundError
+from common.domain.services.prometheus_service import IPrometheusMetricsService
+from common.domain.services.task_status_cache import ITaskStatusCache
+from common.domain.services.task_status_notifier import ITaskStatusNotifier
+
+
+class GetTaskStatusUseCase:
+    """
+    優先讀取 consumer 寫入 redis 的 status projection, miss 時才查 database 並回填
+    """
+
+    def __init__(self, task_repo: ITaskRepository, status_cache: ITaskStatusCache):
+        self.task_repo = task_repo
+        self.status_cache = status_cache
+
+    async def get_task_status(self, task_id: int) -> TaskStatus:
+        status = await self.status_cache.get_status(task_id)
+        if status is not None:
+            return status
+
+        task = await self.task_repo.get_task(task_id)
+        await self.status_cache.backfill_status(task.id, task.status)
+        return task.status
+
+
+class WatchTaskStatusUseCase:
+    """
+    讓 client 等待 consumer 發出的狀態事件，而不是輪詢 status endpoint。
+    一律先訂閱再讀目前狀態，避免讀取與訂閱之間發生的轉換被漏掉。
+    等待期間不持有 database session, 只有 projection miss 時才短暫借用一個連線。
+    """
+
+    def __init__(
+        self,
+        task_repo_factory: Callable[[], AbstractAsyncContextManager[ITaskRepository]],
+        status_cache: ITaskStatusCache,
+        status_notifier: ITaskStatusNotifier,
+    ):
+        self.task_repo_factory = task_repo_factory
+        self.status_cache = status_cache
+        self.status_notifier = status_notifier
+
+    async def get_task_status(self, task_id: int) -> TaskStatus:
+        async with self.task_repo_factory() as task_repo:
+            return await GetTaskStatusUseCase(task_repo=task_repo, status_cache=self.status_cache).get_task_status(
+                task_id
+            )
+
+    async def wait_for_task(self, task_id: int, timeout: float) -> TaskStatus:
+        """等到任務進入 COMPLETED / CANCELED / FAILED 或 timeout, 回傳當下的狀態"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        async with self.status_notifier.subscribe([task_id]) as events:
+            status = await self.get_task_status(task_id)
+            while status not in FINAL_TASK_STATUSES:
+                try:
+                    _, status = await asyncio.wait_for(events.get(), timeout=deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+        return status
+
+    async def stream_task_statuses(self, task_ids: list[int], timeout: float) -> AsyncIterator[tuple[int, TaskStatus]]:
+        """先送出每個任務目前的狀態，之後持續送出狀態轉換，直到全部結束或 timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        async with self.status_notifier.subscribe(task_ids) as events:
+            pending_task_ids = set(task_ids)
+            for task_id in task_ids:
+                try:
+                    status = await self.get_task_status(task_id)
+                except TaskNotFoundError:
+                    pending_task_ids.discard(task_id)
+                    continue
+                yield task_id, status
+                if status in FINAL_TASK_STATUSES:
+                    pending_task_ids.discard(task_id)
+
+            while pending_task_ids:
+                try:
+                    task_id, status = await asyncio.wait_for(events.get(), timeout=deadline - loop.time())
+                except asyncio.TimeoutError:
+                    return
+                yield task_id, status
+                if status in FINAL_TASK_STATUSES:
+                    pending_task_ids.discard(task_id)
+
+
+class BatchTaskStatusUseCase:
+    """
+    一次查詢大量任務的狀態，只 project id 與 status, 結果以 streaming 回傳
+    """
+
+    def __init__(
+        self,
+        task_repo_factory: Callable[[], AbstractAsyncContextManager[ITaskRepository]],
+        metrics: IPrometheusMetricsService,
+    ):
+        self.task_repo_factory = task_repo_factory
+        self.metrics = metrics
+
+    async def iter_task_statuses(self, task_ids: list[int]) -> AsyncIterator[tuple[int, TaskStatus]]:
+        unique_task_ids = list(dict.fromkeys(task_ids))
+        self.metrics.observe_status_batch_size(len(unique_task_ids))
+
+        # session 跟著 generator 的生命週期，而不是 request dependency, streaming 期間才不會被提早關閉
+        async with self.task_repo_factory() as task_repo:
+            async for task_id, status in task_repo.iter_task_statuses(unique_task_ids):
+                yield task_id, status
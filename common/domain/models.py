@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 
@@ -10,24 +11,32 @@ class TaskStatus(str, Enum):
     PROCESSING = "PROCESSING"
     COMPLETED = "COMPLETED"
     CANCELED = "CANCELED"
+    # 沒有辦法執行 (例如沒有對應 task_type 的 handler), 與使用者取消區分
+    FAILED = "FAILED"
+
+
+class TaskPriority(str, Enum):
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"  # backfill 之類可以延後的大量 task
+
+
+DEFAULT_TASK_TYPE = "default"
+MAX_TASK_TYPE_LENGTH = 64
+
+FINAL_TASK_STATUSES = (TaskStatus.COMPLETED, TaskStatus.CANCELED, TaskStatus.FAILED)
+TASK_STATUS_BY_VALUE = {status.value: status for status in TaskStatus}
+TASK_PRIORITY_BY_VALUE = {priority.value: priority for priority in TaskPriority}
 
 
 class OperationNotAllowed(Exception):
     message: str
 
 
-class Task(BaseModel):
-    id: int | None = Field(None)
-    payload: str = Field(..., min_length=1)
-    status: TaskStatus = Field(TaskStatus.PENDING)
-
-    created_at: datetime | None = Field(None)
+class TaskStateMachine:
+    """Task 與 TaskRecord 共用的狀態轉換"""
 
-    @field_validator("payload")
-    def validate_payload(cls, v):
-        if not v.strip():
-            raise ValueError("Payload cannot be empty or whitespace")
-        return v
+    __slots__ = ()
 
     def mark_processing(self):
         if self.status != TaskStatus.PENDING:
@@ -41,8 +50,65 @@ class Task(BaseModel):
             raise OperationNotAllowed(f"Task status {self.status} cannot be processed")
         self.status = TaskStatus.COMPLETED
 
+    def release(self):
+        """執行失敗，交還給 queue 重試"""
+        if self.status != TaskStatus.PROCESSING:
+            logger.warning(f"Task status {self.status} cannot be processed")
+            raise OperationNotAllowed(f"Task status {self.status} cannot be processed")
+        self.status = TaskStatus.PENDING
+
+    def mark_failed(self):
+        """重試也不會成功，直接結束"""
+        if self.status != TaskStatus.PROCESSING:
+            logger.warning(f"Task status {self.status} cannot be processed")
+            raise OperationNotAllowed(f"Task status {self.status} cannot be processed")
+        self.status = TaskStatus.FAILED
+
     def cancel(self):
         if self.status not in [TaskStatus.PENDING, TaskStatus.PROCESSING]:
             logger.warning(f"Task status {self.status} cannot be processed")
             raise OperationNotAllowed(f"Task status {self.status} cannot be processed")
         self.status = TaskStatus.CANCELED
+
+
+class Task(BaseModel, TaskStateMachine):
+    id: int | None = Field(None)
+    payload: str = Field(..., min_length=1)
+    status: TaskStatus = Field(TaskStatus.PENDING)
+    task_type: str = Field(DEFAULT_TASK_TYPE, min_length=1, max_length=MAX_TASK_TYPE_LENGTH)
+    priority: TaskPriority = Field(TaskPriority.NORMAL)
+
+    created_at: datetime | None = Field(None)
+
+    @field_validator("payload")
+    def validate_payload(cls, v):
+        if not v.strip():
+            raise ValueError("Payload cannot be empty or whitespace")
+        return v
+
+
+@dataclass(slots=True)
+class TaskRecord(TaskStateMachine):
+    """
+    從自己的 table 讀回來的資料已經驗證過，consumer hot path 用這個輕量 record 取代 pydantic Task,
+    省去 validation 與大部分的記憶體配置
+    """
+
+    id: int
+    payload: str
+    status: TaskStatus
+    created_at: datetime | None = None
+    task_type: str = DEFAULT_TASK_TYPE
+    priority: TaskPriority = TaskPriority.NORMAL
+
+    @classmethod
+    def from_row(
+        cls,
+        id: int,
+        payload: str,
+        status: str,
+        created_at: datetime | None,
+        task_type: str = DEFAULT_TASK_TYPE,
+        priority: str = TaskPriority.NORMAL.value,
+    ) -> "TaskRecord":
+        return cls(id, payload, TASK_STATUS_BY_VALUE[status], created_at, task_type, TASK_PRIORITY_BY_VALUE[priority])
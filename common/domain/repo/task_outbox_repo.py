@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from common.domain.models import TaskPriority
+
+
+@dataclass
+class OutboxEntry:
+    id: int
+    task_id: int
+    payload: str
+    priority: TaskPriority = TaskPriority.NORMAL
+
+
+class ITaskOutboxRepository(ABC):
+    @abstractmethod
+    async def lock_pending(self, limit: int) -> list[OutboxEntry]:
+        """鎖定最舊的一批 outbox entry (FOR UPDATE SKIP LOCKED), 鎖會持有到 delete 或 session 結束"""
+        pass
+
+    @abstractmethod
+    async def delete(self, entry_ids: list[int]) -> None:
+        """刪除已 publish 的 entry 並 commit"""
+        pass
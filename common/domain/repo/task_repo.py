@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import AsyncIterator, Sequence
 
-from common.domain.models import Task
+from common.domain.models import DEFAULT_TASK_TYPE, Task, TaskPriority, TaskRecord, TaskStatus
 
 
 @dataclass
@@ -11,26 +12,66 @@ class TaskNotFoundError(Exception):
 
 class ITaskRepository(ABC):
     @abstractmethod
-    async def create_task(self, payload: str) -> Task:
+    async def create_task(
+        self, payload: str, task_type: str = DEFAULT_TASK_TYPE, priority: TaskPriority = TaskPriority.NORMAL
+    ) -> Task:
         """建立新任務"""
         pass
 
+    @abstractmethod
+    async def create_tasks(
+        self,
+        payloads: list[str],
+        task_types: list[str] | None = None,
+        priorities: list[TaskPriority] | None = None,
+    ) -> list[Task]:
+        """batch create tasks, 回傳順序與 payloads 相同; task_types / priorities 未指定時全部使用預設值"""
+        pass
+
     @abstractmethod
     async def get_task(self, task_id: int) -> Task:
         """獲取指定任務"""
         pass
 
     @abstractmethod
-    async def update_task(self, domain_task: Task) -> None:
+    async def update_task(self, domain_task: Task | TaskRecord) -> None:
         """更新任務狀態"""
         pass
 
     @abstractmethod
-    async def get_tasks_by_ids(self, task_ids: list[int]) -> list[Task]:
-        """batch get tasks by ids"""
+    async def get_tasks_by_ids(self, task_ids: list[int]) -> list[TaskRecord]:
+        """batch get tasks by ids, 回傳不經 validation 的輕量 TaskRecord"""
+        pass
+
+    @abstractmethod
+    def iter_task_statuses(self, task_ids: list[int]) -> AsyncIterator[tuple[int, TaskStatus]]:
+        """只讀取 id 與 status, 以 streaming 方式逐筆回傳，找不到的 id 會被略過"""
+        pass
+
+    @abstractmethod
+    async def claim_tasks(self, task_ids: list[int]) -> list[TaskRecord]:
+        """
+        把 PENDING 的 task 改為 PROCESSING 並回傳 (compare-and-set), 一個 UPDATE ... RETURNING 同時完成讀取與標記
+        不是 PENDING 的 task (已取消、已完成、被其他 consumer 取走) 不會出現在結果中
+        """
+        pass
+
+    @abstractmethod
+    async def transition_tasks(
+        self, task_ids: list[int], status: TaskStatus, expected_statuses: Sequence[TaskStatus]
+    ) -> list[int]:
+        """
+        只知道 task_id 時使用: 把目前狀態在 expected_statuses 中的 task 改為 status (compare-and-set),
+        回傳實際更新的 task_id
+        """
         pass
 
     @abstractmethod
-    async def update_tasks(self, tasks: list[Task]) -> None:
-        """batch update tasks"""
+    async def update_tasks(
+        self, tasks: list[Task | TaskRecord], expected_statuses: Sequence[TaskStatus] | None = None
+    ) -> list[int]:
+        """
+        batch update tasks, 回傳實際更新的 task_id
+        指定 expected_statuses 時只更新目前狀態在其中的 task (compare-and-set), 由 database 決定 race 的結果
+        """
         pass
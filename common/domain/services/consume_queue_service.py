@@ -1,7 +1,29 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from common.domain.models import TaskPriority
+
+
+def priority_queue_name(routing_key: str, priority: TaskPriority) -> str:
+    """每個 priority 一個 queue; normal 沿用原本的 queue 名稱，升級時既有的 message 不需要搬移"""
+    if priority == TaskPriority.NORMAL:
+        return routing_key
+    return f"{routing_key}.{priority.value}"
+
+
+@dataclass
+class TaskMessage:
+    """consumer 交給 handler 的 message 內容; task_id 優先取自 header, 不 decode body 時 payload 為 None"""
+
+    task_id: int
+    payload: str | None = None
 
 
 class IConsumeQueueService(ABC):
     @abstractmethod
-    async def consume(self, message_handler):
+    async def consume(self, message_handler, dead_letter_handler=None):
+        """
+        message_handler(list[TaskMessage]) -> list[int], 回傳的 task_id 會被 ack, 其餘 requeue
+        dead_letter_handler(list[int]): 送進 dead-letter queue 的 task_id, 不會再被處理
+        """
         pass
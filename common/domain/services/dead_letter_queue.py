@@ -0,0 +1,32 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+
+@dataclass
+class DeadLetter:
+    task_id: int | None  # 無法解析的 message 可能沒有 task_id
+    attempts: int
+    reason: str
+    original_queue: str
+    dead_lettered_at: float | None = None
+
+
+class IDeadLetterQueueService(ABC):
+    @abstractmethod
+    async def peek(self, limit: int) -> list[DeadLetter]:
+        """讀取最舊的 limit 個 dead letter, 不會移出 queue"""
+        pass
+
+    @abstractmethod
+    async def replay(
+        self,
+        limit: int,
+        on_replay: Callable[[list[int]], Awaitable[None]] | None = None,
+        on_replay_failed: Callable[[list[int]], Awaitable[None]] | None = None,
+    ) -> int:
+        """
+        把最舊的 limit 個 dead letter 送回原本的 queue 並重設失敗次數，回傳實際送回的數量
+        送出前以這批的 task_id 呼叫 on_replay, 送不出去 (留在 dead-letter queue) 的 task_id 呼叫 on_replay_failed
+        """
+        pass
@@ -0,0 +1,53 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from common.domain.models import TaskStatus
+
+
+class IdempotencyKeyInProgressError(Exception):
+    """同一個 Idempotency-Key 的第一個 request 還沒完成，等待逾時"""
+
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(f"Request with Idempotency-Key {key} is still in progress")
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """同一個 Idempotency-Key 帶了不同的 request 內容"""
+
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(f"Idempotency-Key {key} was used with a different request")
+
+
+@dataclass
+class IdempotencyRecord:
+    task_id: int
+    status: TaskStatus
+
+
+class IIdempotencyStore(ABC):
+    @abstractmethod
+    async def reserve(self, key: str, fingerprint: str) -> IdempotencyRecord | None:
+        """
+        fingerprint 是 request 內容的 hash, 與 key 一起保存
+        回傳 None 代表呼叫端取得 key, 必須接著呼叫 complete 或 release;
+        key 已經完成時回傳當初的結果，處理中時等待結果，逾時 raise IdempotencyKeyInProgressError
+        fingerprint 與保存的不同時 raise IdempotencyKeyMismatchError
+        """
+        pass
+
+    @abstractmethod
+    async def keep_reserved(self, key: str):
+        """處理中定期延長保留的 TTL, 直到被取消; 建立得再慢，重試的 request 也不會重複建立"""
+        pass
+
+    @abstractmethod
+    async def complete(self, key: str, fingerprint: str, record: IdempotencyRecord):
+        """保存結果，dedup window 內重複的 request 都會拿到同一個結果"""
+        pass
+
+    @abstractmethod
+    async def release(self, key: str):
+        """建立失敗時釋放 key, 讓 client 可以重試"""
+        pass
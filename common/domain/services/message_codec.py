@@ -0,0 +1,22 @@
+from abc import ABC, abstractmethod
+
+# publish 時把 task_id 放進 AMQP header, consumer 做 ack / nack routing 時不需要解析 body
+TASK_ID_HEADER = "x-task-id"
+# 已經失敗的次數，consumer 依此決定延遲重試的 tier 或送進 dead-letter queue
+ATTEMPT_HEADER = "x-attempt"
+# 送進 dead-letter queue 時記錄原本的 queue 與原因，replay 時送回原本的 queue
+ORIGINAL_QUEUE_HEADER = "x-original-queue"
+DEAD_LETTER_REASON_HEADER = "x-dead-letter-reason"
+DEAD_LETTERED_AT_HEADER = "x-dead-lettered-at"
+
+
+class IMessageCodec(ABC):
+    content_type: str
+
+    @abstractmethod
+    def encode(self, message: dict) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, body: bytes) -> dict:
+        pass
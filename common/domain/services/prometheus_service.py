@@ -14,3 +14,31 @@ class IPrometheusMetricsService(ABC):
     @abstractmethod
     def observe_execution_time(self, duration: float):
         pass
+
+    @abstractmethod
+    def observe_create_batch_size(self, size: int):
+        pass
+
+    @abstractmethod
+    def observe_status_batch_size(self, size: int):
+        pass
+
+    @abstractmethod
+    def observe_settlement_time(self, duration: float):
+        pass
+
+    @abstractmethod
+    def observe_interruption_latency(self, duration: float):
+        pass
+
+    @abstractmethod
+    def observe_interruption_time_saved(self, duration: float):
+        pass
+
+    @abstractmethod
+    def observe_queue_wait(self, priority: str, duration: float):
+        pass
+
+    @abstractmethod
+    def inc_result_cache_lookup(self, outcome: str):
+        pass
@@ -3,7 +3,18 @@ from abc import ABC, abstractmethod
 from common.domain.models import Task
 
 
+class QueueUnavailableError(Exception):
+    """broker 無法使用 (circuit open / publish 失敗), 呼叫端應 fail fast"""
+
+    pass
+
+
 class ISendToQueueService(ABC):
     @abstractmethod
     async def send_message(self, message: dict) -> Task:
         pass
+
+    @abstractmethod
+    async def send_messages(self, messages: list[dict]) -> None:
+        """batch publish, 所有 message pipeline 發送後一起等待 confirm"""
+        pass
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Callable
 
 
 class ITaskCancellationCache(ABC):
@@ -12,3 +13,8 @@ class ITaskCancellationCache(ABC):
     async def is_task_cancelled(self, task_id: int) -> bool:
         """檢查任務是否被取消"""
         pass
+
+    @abstractmethod
+    def add_cancel_listener(self, listener: Callable[[int, float], None]):
+        """註冊取消事件的 callback, 參數為 task_id 與取消時間 (unix timestamp)"""
+        pass
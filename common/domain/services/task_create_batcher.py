@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+
+from common.domain.models import DEFAULT_TASK_TYPE, Task, TaskPriority
+
+
+class ITaskCreateBatcher(ABC):
+    @abstractmethod
+    async def create_task(
+        self, payload: str, task_type: str = DEFAULT_TASK_TYPE, priority: TaskPriority = TaskPriority.NORMAL
+    ) -> Task:
+        """與同一時間窗口內的其他 create_task 合併成一個 transaction 寫入"""
+        pass
@@ -0,0 +1,66 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable
+
+from common.domain.models import Task, TaskRecord
+
+
+class ExecutionBackend(str, Enum):
+    ASYNCIO = "asyncio"  # 直接在 event loop 上 await, 適合 non-blocking IO
+    THREAD = "thread"  # ThreadPoolExecutor, 適合 blocking IO
+    PROCESS = "process"  # ProcessPoolExecutor, 適合 CPU-bound, func 必須可以被 pickle
+
+
+@dataclass(frozen=True)
+class TaskHandler:
+    """
+    func 以 payload 為參數: ASYNCIO backend 為 coroutine function, 其他 backend 為一般 function
+    on_interrupted 在執行中被取消時呼叫，用來釋放資源
+    """
+
+    task_type: str
+    func: Callable[[str], Any]
+    backend: ExecutionBackend = ExecutionBackend.ASYNCIO
+    # 預期的執行時間，用來估計中斷後省下的時間
+    expected_duration: float = 0.0
+    on_interrupted: Callable[[Task | TaskRecord], Awaitable[None]] | None = None
+    # 結果只取決於 payload 且沒有 side effect 時設為 True, 啟用 result cache 後相同 payload 只執行一次
+    memoize: bool = False
+
+
+@dataclass(frozen=True)
+class BatchTaskHandler:
+    """
+    一次處理同一個 task_type 的整批 task, 適合向量化運算或下游的 bulk API
+    func 以 list[TaskRecord] 為參數，回傳與輸入同順序、同長度的結果; 結果為 Exception 代表該 task 失敗
+    整批一起執行，無法只中斷其中一個 task; 執行期間被取消的 task 由 finish_tasks 的 compare-and-set 決定，不會被改成 COMPLETED
+    """
+
+    task_type: str
+    func: Callable[[list[Task | TaskRecord]], Any]
+    backend: ExecutionBackend = ExecutionBackend.ASYNCIO
+    # consumer batch 內同 type 的 task 超過這個數量時拆成多次呼叫，None 表示不拆
+    max_batch_size: int | None = None
+
+
+@dataclass
+class UnknownTaskTypeError(Exception):
+    task_type: str
+
+
+class ITaskHandlerRegistry(ABC):
+    @abstractmethod
+    def get(self, task_type: str) -> TaskHandler | BatchTaskHandler:
+        """找不到時 raise UnknownTaskTypeError"""
+        pass
+
+    @abstractmethod
+    async def run(self, handler: TaskHandler, task: Task | TaskRecord) -> Any:
+        """依 handler 宣告的 backend 執行，受該 backend 的並行上限限制"""
+        pass
+
+    @abstractmethod
+    async def run_batch(self, handler: BatchTaskHandler, tasks: list[Task | TaskRecord]) -> list[Any]:
+        """依 handler 宣告的 backend 執行整批 task, 整批只佔用一個並行名額"""
+        pass
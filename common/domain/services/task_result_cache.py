@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable
+
+
+class ITaskResultCache(ABC):
+    @abstractmethod
+    async def get_or_compute(self, task_type: str, payload: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        以 (task_type, payload) 的 hash 為 key: 有快取時直接回傳結果，
+        同一個 key 正在執行時等待那一次的結果，都沒有時呼叫 compute 並寫入快取; 失敗的結果不會被快取
+        """
+        pass
@@ -0,0 +1,21 @@
+from abc import ABC, abstractmethod
+
+from common.domain.models import TaskStatus
+
+
+class ITaskStatusCache(ABC):
+
+    @abstractmethod
+    async def set_statuses(self, statuses: dict[int, TaskStatus]):
+        """寫入狀態轉換 (覆蓋舊值)"""
+        pass
+
+    @abstractmethod
+    async def backfill_status(self, task_id: int, status: TaskStatus):
+        """cache miss 後從 database 回填，只在 key 不存在時寫入，避免蓋掉 consumer 較新的狀態"""
+        pass
+
+    @abstractmethod
+    async def get_status(self, task_id: int) -> TaskStatus | None:
+        """讀取狀態，沒有 projection 時回傳 None"""
+        pass
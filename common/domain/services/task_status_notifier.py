@@ -0,0 +1,13 @@
+import asyncio
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager
+
+from common.domain.models import TaskStatus
+
+
+class ITaskStatusNotifier(ABC):
+
+    @abstractmethod
+    def subscribe(self, task_ids: list[int]) -> AbstractAsyncContextManager[asyncio.Queue[tuple[int, TaskStatus]]]:
+        """訂閱指定任務的狀態轉換事件，離開 context 時取消訂閱"""
+        pass
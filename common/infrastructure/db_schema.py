@@ -1,9 +1,9 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
 from sqlalchemy.orm import declarative_base
 
-from common.domain.models import TaskStatus
+from common.domain.models import DEFAULT_TASK_TYPE, MAX_TASK_TYPE_LENGTH, TaskPriority, TaskStatus
 
 Base = declarative_base()
 
@@ -15,3 +15,17 @@ class TaskORM(Base):
     payload = Column(String, nullable=False)
     status = Column(String, default=TaskStatus.PENDING.value, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+    # consumer 依 task_type 找到對應的 handler
+    task_type = Column(String(MAX_TASK_TYPE_LENGTH), default=DEFAULT_TASK_TYPE, nullable=False)
+    # 決定 publish 到哪一個 priority queue
+    priority = Column(String(16), default=TaskPriority.NORMAL.value, nullable=False)
+
+
+class TaskOutboxORM(Base):
+    """與 tasks 在同一個 transaction 寫入，由 outbox relay 負責 publish 到 RabbitMQ"""
+
+    __tablename__ = "task_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
@@ -1,30 +1,134 @@
 import os
+from contextlib import asynccontextmanager
 from functools import lru_cache
+from typing import AsyncIterator
 
 import redis.asyncio as redis
 from fastapi import Depends
 
+from common.applications.use_case.consumer.task_handlers import create_default_task_handlers
+from common.applications.use_case.outbox_relay.outbox_relay import OutboxRelayUseCase
+from common.applications.use_case.web_api.dead_letter import DeadLetterUseCase
 from common.applications.use_case.web_api.task_create import CancelTaskUseCase, CreateTaskUseCase
-from common.infrastructure.database import get_db
+from common.applications.use_case.web_api.task_status import (
+    BatchTaskStatusUseCase,
+    GetTaskStatusUseCase,
+    WatchTaskStatusUseCase,
+)
+from common.domain.models import TaskPriority
+from common.domain.services.message_codec import IMessageCodec
+from common.infrastructure.database import async_session, get_db
+from common.infrastructure.repo.task_outbox_repo import TaskOutboxRepository
 from common.infrastructure.repo.task_repo import TaskRepository
+from common.infrastructure.services.adaptive_batcher import AdaptiveBatcher
+from common.infrastructure.services.circuit_breaker import CircuitBreaker
 from common.infrastructure.services.consume_queue_service import ConsumeQueueService
+from common.infrastructure.services.dead_letter_queue import DeadLetterQueueService
+from common.infrastructure.services.idempotency_store import IdempotencyStore
+from common.infrastructure.services.message_codec import ContentTypeMessageDecoder, create_message_codec
 from common.infrastructure.services.prometheus_service import PrometheusMetricsService
+from common.infrastructure.services.retry_scheduler import RetryScheduler
 from common.infrastructure.services.send_to_queue_service import SendToQueueService
 from common.infrastructure.services.task_cancellation_cache import TaskCancellationCache
+from common.infrastructure.services.task_create_batcher import TaskCreateBatcher
+from common.infrastructure.services.task_handler_registry import TaskHandlerRegistry
+from common.infrastructure.services.task_result_cache import TaskResultCache
+from common.infrastructure.services.task_status_cache import TaskStatusCache
+from common.infrastructure.services.task_status_notifier import TaskStatusNotifier
 
 
 def get_task_repo(db_session=Depends(get_db)) -> TaskRepository:
     return TaskRepository(db_session=db_session)
 
 
+@asynccontextmanager
+async def task_repo_scope() -> AsyncIterator[TaskRepository]:
+    """給不在 request scope 內的元件使用，每次開一個獨立的 session"""
+    async with async_session() as session:
+        yield TaskRepository(db_session=session)
+
+
+@asynccontextmanager
+async def task_outbox_repo_scope() -> AsyncIterator[TaskOutboxRepository]:
+    async with async_session() as session:
+        yield TaskOutboxRepository(db_session=session)
+
+
+@lru_cache()
+def get_message_codec() -> IMessageCodec:
+    return create_message_codec(os.getenv("MESSAGE_CODEC", "json"))
+
+
 @lru_cache()
 def get_send_to_queue_service() -> SendToQueueService:
-    return SendToQueueService()
+    return SendToQueueService(
+        codec=get_message_codec(),
+        channel_pool_size=int(os.getenv("RABBITMQ_PUBLISH_CHANNELS", "4")),
+        max_in_flight=int(os.getenv("RABBITMQ_PUBLISH_MAX_IN_FLIGHT", "256")),
+        publish_timeout=float(os.getenv("RABBITMQ_PUBLISH_TIMEOUT", "5")),
+        circuit_breaker=CircuitBreaker(
+            name="rabbitmq-publish",
+            failure_threshold=int(os.getenv("RABBITMQ_CIRCUIT_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("RABBITMQ_CIRCUIT_RESET_TIMEOUT", "10")),
+        ),
+    )
 
 
 @lru_cache()
 def get_consume_queue_service() -> ConsumeQueueService:
-    return ConsumeQueueService()
+    max_in_flight_batches = int(os.getenv("CONSUMER_MAX_IN_FLIGHT_BATCHES", "4"))
+    return ConsumeQueueService(
+        decoder=ContentTypeMessageDecoder(get_message_codec()),
+        batcher=AdaptiveBatcher(
+            min_batch_size=int(os.getenv("CONSUMER_MIN_BATCH_SIZE", "1")),
+            max_batch_size=int(os.getenv("CONSUMER_MAX_BATCH_SIZE", "1024")),
+            initial_batch_size=int(os.getenv("CONSUMER_INITIAL_BATCH_SIZE", "32")),
+            batch_timeout=float(os.getenv("CONSUMER_BATCH_TIMEOUT_MS", "100")) / 1000,
+            target_latency=float(os.getenv("CONSUMER_TARGET_BATCH_LATENCY_MS", "5000")) / 1000,
+            # prefetch 要能填滿所有處理中的 batch, 再加上一個正在累積的 batch
+            prefetch_multiplier=max_in_flight_batches + 1,
+            min_prefetch=int(os.getenv("CONSUMER_MIN_PREFETCH", "32")),
+            max_prefetch=int(os.getenv("CONSUMER_MAX_PREFETCH", "2048")),
+        ),
+        metrics=get_prometheus_metrics_service(),
+        max_in_flight_batches=max_in_flight_batches,
+        # 例如 "high=8,normal=4,low=1"
+        priority_weights={
+            TaskPriority(name.strip()): int(weight)
+            for name, weight in (
+                item.split("=") for item in os.getenv("CONSUMER_PRIORITY_WEIGHTS", "high=8,normal=4,low=1").split(",")
+            )
+        },
+        # 第 n 次失敗後等待的秒數，用完後送進 dead-letter queue
+        retry_scheduler=RetryScheduler(
+            delays=tuple(float(delay) for delay in os.getenv("CONSUMER_RETRY_DELAYS", "1,4,16,64,256").split(","))
+        ),
+    )
+
+
+@lru_cache()
+def get_dead_letter_queue_service() -> DeadLetterQueueService:
+    return DeadLetterQueueService()
+
+
+def get_dead_letter_use_case() -> DeadLetterUseCase:
+    return DeadLetterUseCase(
+        dead_letter_queue_service=get_dead_letter_queue_service(),
+        task_repo_factory=task_repo_scope,
+        status_cache=get_task_status_cache(),
+    )
+
+
+@lru_cache()
+def get_task_handler_registry() -> TaskHandlerRegistry:
+    registry = TaskHandlerRegistry(
+        asyncio_concurrency=int(os.getenv("TASK_HANDLER_ASYNCIO_CONCURRENCY", "10000")),
+        thread_workers=int(os.getenv("TASK_HANDLER_THREAD_WORKERS", "32")),
+        process_workers=int(os.getenv("TASK_HANDLER_PROCESS_WORKERS", str(os.cpu_count() or 1))),
+    )
+    for handler in create_default_task_handlers():
+        registry.register(handler)
+    return registry
 
 
 # def get_task_process_use_case(db_session) -> TaskProcessUseCase:
@@ -34,13 +138,33 @@ def get_consume_queue_service() -> ConsumeQueueService:
 #     )
 
 
-def get_create_task_use_case(
-    task_repo=Depends(get_task_repo),
-    task_queue_service=Depends(get_send_to_queue_service),
-) -> CreateTaskUseCase:
+@lru_cache()
+def get_task_create_batcher() -> TaskCreateBatcher | None:
+    # opt-in: 預設每個 request 各自 commit
+    if os.getenv("TASK_CREATE_BATCH_ENABLED", "false").lower() != "true":
+        return None
+    return TaskCreateBatcher(
+        task_repo_factory=task_repo_scope,
+        metrics=get_prometheus_metrics_service(),
+        window=float(os.getenv("TASK_CREATE_BATCH_WINDOW_MS", "5")) / 1000,
+        max_batch_size=int(os.getenv("TASK_CREATE_BATCH_MAX_SIZE", "100")),
+    )
+
+
+def get_create_task_use_case(task_repo=Depends(get_task_repo)) -> CreateTaskUseCase:
     return CreateTaskUseCase(
         task_repo=task_repo,
-        task_queue_service=task_queue_service,
+        task_create_batcher=get_task_create_batcher(),
+        idempotency_store=get_idempotency_store(),
+    )
+
+
+def get_outbox_relay_use_case() -> OutboxRelayUseCase:
+    return OutboxRelayUseCase(
+        outbox_repo_factory=task_outbox_repo_scope,
+        task_queue_service=get_send_to_queue_service(),
+        batch_size=int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", "500")),
+        idle_interval=float(os.getenv("OUTBOX_RELAY_IDLE_INTERVAL_MS", "50")) / 1000,
     )
 
 
@@ -48,6 +172,31 @@ def get_cancel_task_use_case(task_repo=Depends(get_task_repo)) -> CancelTaskUseC
     return CancelTaskUseCase(
         task_repo=task_repo,
         cancellation_cache=get_task_cancellation_cache(),
+        status_cache=get_task_status_cache(),
+    )
+
+
+def get_task_status_use_case(task_repo=Depends(get_task_repo)) -> GetTaskStatusUseCase:
+    return GetTaskStatusUseCase(
+        task_repo=task_repo,
+        status_cache=get_task_status_cache(),
+    )
+
+
+@lru_cache()
+def get_batch_task_status_use_case() -> BatchTaskStatusUseCase:
+    return BatchTaskStatusUseCase(
+        task_repo_factory=task_repo_scope,
+        metrics=get_prometheus_metrics_service(),
+    )
+
+
+@lru_cache()
+def get_watch_task_status_use_case() -> WatchTaskStatusUseCase:
+    return WatchTaskStatusUseCase(
+        task_repo_factory=task_repo_scope,
+        status_cache=get_task_status_cache(),
+        status_notifier=get_task_status_notifier(),
     )
 
 
@@ -56,11 +205,8 @@ def get_prometheus_metrics_service() -> PrometheusMetricsService:
     from loguru import logger
 
     logger.info("PrometheusMetricsService()")
-    metrics_service = PrometheusMetricsService()
-    logger.info("metrics_service.start_server()")
-    # Start the Prometheus server only once
-    metrics_service.start_server()
-    return metrics_service
+    # metrics server 由各 entry point 的 lifespan 啟動, 這裡只負責建立 singleton
+    return PrometheusMetricsService()
 
 
 @lru_cache()
@@ -71,6 +217,41 @@ def get_redis_client() -> redis.Redis:
 
 @lru_cache()
 def get_task_cancellation_cache() -> TaskCancellationCache:
-    return TaskCancellationCache(
+    return TaskCancellationCache(redis_client=get_redis_client())
+
+
+@lru_cache()
+def get_task_status_cache() -> TaskStatusCache:
+    return TaskStatusCache(
         redis_client=get_redis_client(),
+        ttl=int(os.getenv("TASK_STATUS_CACHE_TTL", "3600")),
     )
+
+
+@lru_cache()
+def get_idempotency_store() -> IdempotencyStore:
+    return IdempotencyStore(
+        redis_client=get_redis_client(),
+        window=int(os.getenv("IDEMPOTENCY_KEY_WINDOW", "86400")),
+        # 建立期間每 pending_ttl / 3 秒延長一次，只決定 web_api crash 後 key 多久會被釋放
+        pending_ttl=int(os.getenv("IDEMPOTENCY_KEY_PENDING_TTL", "30")),
+        wait_timeout=float(os.getenv("IDEMPOTENCY_KEY_WAIT_TIMEOUT", "10")),
+    )
+
+
+@lru_cache()
+def get_task_result_cache() -> TaskResultCache | None:
+    # opt-in: 只對宣告 memoize 的 handler 生效
+    if os.getenv("TASK_RESULT_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    return TaskResultCache(
+        redis_client=get_redis_client(),
+        metrics=get_prometheus_metrics_service(),
+        max_entries=int(os.getenv("TASK_RESULT_CACHE_MAX_ENTRIES", "10000")),
+        ttl=int(os.getenv("TASK_RESULT_CACHE_TTL", "3600")),
+    )
+
+
+@lru_cache()
+def get_task_status_notifier() -> TaskStatusNotifier:
+    return TaskStatusNotifier(redis_client=get_redis_client())
@@ -0,0 +1,31 @@
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.domain.models import TaskPriority
+from common.domain.repo.task_outbox_repo import ITaskOutboxRepository, OutboxEntry
+from common.infrastructure.db_schema import TaskORM, TaskOutboxORM
+
+
+class TaskOutboxRepository(ITaskOutboxRepository):
+    def __init__(self, db_session: AsyncSession):
+        super().__init__()
+        self.db = db_session
+
+    async def lock_pending(self, limit: int) -> list[OutboxEntry]:
+        # SKIP LOCKED 讓多個 relay instance 各自拿到不重疊的 batch
+        stmt = (
+            select(TaskOutboxORM.id, TaskOutboxORM.task_id, TaskORM.payload, TaskORM.priority)
+            .join(TaskORM, TaskORM.id == TaskOutboxORM.task_id)
+            .order_by(TaskOutboxORM.id)
+            .limit(limit)
+            .with_for_update(of=TaskOutboxORM, skip_locked=True)
+        )
+        result = await self.db.execute(stmt)
+        return [
+            OutboxEntry(id=row.id, task_id=row.task_id, payload=row.payload, priority=TaskPriority(row.priority))
+            for row in result.all()
+        ]
+
+    async def delete(self, entry_ids: list[int]) -> None:
+        await self.db.execute(delete(TaskOutboxORM).where(TaskOutboxORM.id.in_(entry_ids)))
+        await self.db.commit()
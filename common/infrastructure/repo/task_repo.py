@@ -1,10 +1,13 @@
+from typing import AsyncIterator, Sequence
+
 from loguru import logger
-from sqlalchemy import select
+from sqlalchemy import Integer, String, any_, bindparam, func, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from common.domain.models import Task, TaskStatus
+from common.domain.models import DEFAULT_TASK_TYPE, Task, TaskPriority, TaskRecord, TaskStatus
 from common.domain.repo.task_repo import ITaskRepository, TaskNotFoundError
-from common.infrastructure.db_schema import TaskORM
+from common.infrastructure.db_schema import TaskORM, TaskOutboxORM
 
 
 class TaskRepository(ITaskRepository):
@@ -12,31 +15,80 @@ class TaskRepository(ITaskRepository):
         super().__init__()
         self.db = db_session
 
-    async def create_task(self, payload: str) -> Task:
-        domain_task = Task(payload=payload)
+    async def create_task(
+        self, payload: str, task_type: str = DEFAULT_TASK_TYPE, priority: TaskPriority = TaskPriority.NORMAL
+    ) -> Task:
+        domain_task = Task(payload=payload, task_type=task_type, priority=priority)
         logger.info(f"create_task: {domain_task}")
-        task_orm = TaskORM(payload=domain_task.payload, status=domain_task.status.value)
+        task_orm = TaskORM(
+            payload=domain_task.payload,
+            status=domain_task.status.value,
+            task_type=domain_task.task_type,
+            priority=domain_task.priority.value,
+        )
         self.db.add(task_orm)
+        await self.db.flush()
+        # outbox entry 與 task 同一個 transaction, 由 outbox relay 負責 publish
+        self.db.add(TaskOutboxORM(task_id=task_orm.id))
         await self.db.commit()
-        await self.db.refresh(task_orm)
         domain_task.id = task_orm.id
+        domain_task.created_at = task_orm.created_at
         return domain_task
 
+    async def create_tasks(
+        self,
+        payloads: list[str],
+        task_types: list[str] | None = None,
+        priorities: list[TaskPriority] | None = None,
+    ) -> list[Task]:
+        if not payloads:
+            return []
+
+        task_types = task_types or [DEFAULT_TASK_TYPE] * len(payloads)
+        priorities = priorities or [TaskPriority.NORMAL] * len(payloads)
+        domain_tasks = [
+            Task(payload=payload, task_type=task_type, priority=priority)
+            for payload, task_type, priority in zip(payloads, task_types, priorities)
+        ]
+        logger.info(f"create_tasks: {len(domain_tasks)} tasks")
+
+        # insertmanyvalues: asyncpg 上會編譯成 multi-row INSERT ... RETURNING, 一次 round trip 拿回所有 id
+        stmt = insert(TaskORM).returning(TaskORM.id, TaskORM.created_at, sort_by_parameter_order=True)
+        result = await self.db.execute(
+            stmt,
+            [
+                {
+                    "payload": task.payload,
+                    "status": task.status.value,
+                    "task_type": task.task_type,
+                    "priority": task.priority.value,
+                }
+                for task in domain_tasks
+            ],
+        )
+        for domain_task, row in zip(domain_tasks, result.all()):
+            domain_task.id = row.id
+            domain_task.created_at = row.created_at
+        await self.db.execute(insert(TaskOutboxORM), [{"task_id": domain_task.id} for domain_task in domain_tasks])
+        await self.db.commit()
+        return domain_tasks
+
     async def get_task(self, task_id: int) -> Task:
         stmt = select(TaskORM).where(TaskORM.id == task_id)
         result = await self.db.execute(stmt)
         task_orm = result.scalar_one_or_none()
         if not task_orm:
-            raise TaskNotFoundError()
-        await self.db.refresh(task_orm)
+            raise TaskNotFoundError(task_id=task_id)
         return Task(
             id=task_orm.id,
             payload=task_orm.payload,
             status=task_orm.status,
             created_at=task_orm.created_at,
+            task_type=task_orm.task_type,
+            priority=task_orm.priority,
         )
 
-    async def update_task(self, domain_task: Task):
+    async def update_task(self, domain_task: Task | TaskRecord):
         stmt = select(TaskORM).where(TaskORM.id == domain_task.id)
         result = await self.db.execute(stmt)
         task_orm = result.scalar_one_or_none()
@@ -44,20 +96,105 @@ class TaskRepository(ITaskRepository):
             task_orm.status = domain_task.status.value
             await self.db.commit()
 
-    async def get_tasks_by_ids(self, task_ids: list[int]) -> list[Task]:
-        stmt = select(TaskORM).where(TaskORM.id.in_(task_ids))
+    async def get_tasks_by_ids(self, task_ids: list[int]) -> list[TaskRecord]:
+        # 只 select 欄位，不經過 ORM identity map 與 pydantic validation
+        stmt = select(
+            TaskORM.id, TaskORM.payload, TaskORM.status, TaskORM.created_at, TaskORM.task_type, TaskORM.priority
+        ).where(TaskORM.id.in_(task_ids))
         result = await self.db.execute(stmt)
-        tasks_orm = result.scalars().all()
-        return [
-            Task(id=task.id, payload=task.payload, status=TaskStatus(task.status), created_at=task.created_at)
-            for task in tasks_orm
-        ]
+        return [TaskRecord.from_row(*row) for row in result.all()]
+
+    async def iter_task_statuses(self, task_ids: list[int]) -> AsyncIterator[tuple[int, TaskStatus]]:
+        # 單一 array 參數 (= ANY), 不論 id 數量都是同一個 prepared statement
+        stmt = (
+            select(TaskORM.id, TaskORM.status)
+            .where(TaskORM.id == any_(bindparam("task_ids", task_ids, type_=ARRAY(Integer))))
+            .execution_options(yield_per=1000)
+        )
+        result = await self.db.stream(stmt)
+        async for row in result:
+            yield row.id, TaskStatus(row.status)
+
+    async def claim_tasks(self, task_ids: list[int]) -> list[TaskRecord]:
+        if not task_ids:
+            return []
+
+        tasks_table = TaskORM.__table__
+        stmt = (
+            update(tasks_table)
+            .where(
+                tasks_table.c.id == any_(bindparam("task_ids", type_=ARRAY(Integer))),
+                tasks_table.c.status == TaskStatus.PENDING.value,
+            )
+            .values(status=TaskStatus.PROCESSING.value)
+            .returning(
+                tasks_table.c.id,
+                tasks_table.c.payload,
+                tasks_table.c.status,
+                tasks_table.c.created_at,
+                tasks_table.c.task_type,
+                tasks_table.c.priority,
+            )
+        )
+        result = await self.db.execute(stmt, {"task_ids": task_ids})
+        tasks = [TaskRecord.from_row(*row) for row in result.all()]
+        await self.db.commit()
+        return tasks
+
+    async def transition_tasks(
+        self, task_ids: list[int], status: TaskStatus, expected_statuses: Sequence[TaskStatus]
+    ) -> list[int]:
+        if not task_ids:
+            return []
+
+        tasks_table = TaskORM.__table__
+        stmt = (
+            update(tasks_table)
+            .where(
+                tasks_table.c.id == any_(bindparam("task_ids", type_=ARRAY(Integer))),
+                tasks_table.c.status == any_(bindparam("expected_statuses", type_=ARRAY(String))),
+            )
+            .values(status=status.value)
+            .returning(tasks_table.c.id)
+        )
+        result = await self.db.execute(
+            stmt, {"task_ids": task_ids, "expected_statuses": [expected.value for expected in expected_statuses]}
+        )
+        updated_task_ids = list(result.scalars().all())
+        await self.db.commit()
+        return updated_task_ids
+
+    async def update_tasks(
+        self, tasks: list[Task | TaskRecord], expected_statuses: Sequence[TaskStatus] | None = None
+    ) -> list[int]:
+        if not tasks:
+            return []
+
+        # UPDATE ... FROM unnest(ids, statuses): 兩個 array 參數，不論筆數都是同一個 prepared statement, 一次 round trip
+        new_status = (
+            func.unnest(
+                bindparam("task_ids", type_=ARRAY(Integer)),
+                bindparam("statuses", type_=ARRAY(String)),
+            )
+            .table_valued("id", "status")
+            .render_derived(name="new_status")
+        )
+        tasks_table = TaskORM.__table__
+        stmt = (
+            update(tasks_table)
+            .where(tasks_table.c.id == new_status.c.id)
+            .values(status=new_status.c.status)
+            .returning(tasks_table.c.id)
+        )
+        params = {
+            "task_ids": [task.id for task in tasks],
+            "statuses": [task.status.value for task in tasks],
+        }
+        if expected_statuses is not None:
+            stmt = stmt.where(tasks_table.c.status == any_(bindparam("expected_statuses", type_=ARRAY(String))))
+            params["expected_statuses"] = [status.value for status in expected_statuses]
 
-    async def update_tasks(self, tasks: list[Task]) -> None:
-        for task in tasks:
-            stmt = select(TaskORM).where(TaskORM.id == task.id)
-            result = await self.db.execute(stmt)
-            task_orm = result.scalar_one_or_none()
-            if task_orm:
-                task_orm.status = task.status.value
+        result = await self.db.execute(stmt, params)
+        updated_task_ids = list(result.scalars().all())
         await self.db.commit()
+        return updated_task_ids
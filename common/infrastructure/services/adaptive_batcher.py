@@ -0,0 +1,92 @@
+import asyncio
+from typing import Generic, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class AdaptiveBatcher(Generic[T]):
+    """
+    用真正的 timer 決定 flush 時機：第一個 message 進來後最多等待 batch_timeout, 不需要等下一個 message 才檢查時間。
+
+    batch_size 依照觀察到的處理延遲與 backlog (本地 buffer + broker queue depth) 在上下限之間調整：
+    - 處理延遲超過 target_latency: 減半，讓每批更快結束
+    - 批次塞滿且 backlog 仍然足夠: 加倍，高流量時自動使用大 batch
+    - 批次沒塞滿且沒有 backlog: 縮小到實際大小，低流量時第一個 message 幾乎立即 flush
+    """
+
+    def __init__(
+        self,
+        min_batch_size: int = 1,
+        max_batch_size: int = 1024,
+        initial_batch_size: int = 32,
+        batch_timeout: float = 0.1,
+        target_latency: float = 5.0,
+        prefetch_multiplier: int = 2,
+        min_prefetch: int = 32,
+        max_prefetch: int = 2048,
+    ):
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_size = max(min_batch_size, min(initial_batch_size, max_batch_size))
+        self.batch_timeout = batch_timeout
+        self.target_latency = target_latency
+        self.prefetch_multiplier = prefetch_multiplier
+        self.min_prefetch = min_prefetch
+        self.max_prefetch = max_prefetch
+
+        # broker 端尚未投遞的 message 數量，由 consumer 定期更新
+        self.queue_depth = 0
+        # 可以換成其他實作 asyncio.Queue 介面的 buffer (例如 WeightedFairQueue)
+        self.buffer: asyncio.Queue[T] = asyncio.Queue()
+
+    @property
+    def prefetch_count(self) -> int:
+        return max(self.min_prefetch, min(self.batch_size * self.prefetch_multiplier, self.max_prefetch))
+
+    @property
+    def backlog(self) -> int:
+        return self.buffer.qsize() + self.queue_depth
+
+    async def put(self, item: T):
+        self.buffer.put_nowait(item)
+
+    async def next_batch(self) -> list[T]:
+        # 沒有流量時在這裡等待，不佔 CPU
+        batch = [await self.buffer.get()]
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            while len(batch) < self.batch_size and not self.buffer.empty():
+                batch.append(self.buffer.get_nowait())
+            if len(batch) >= self.batch_size:
+                break
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.buffer.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def record_batch(self, size: int, latency: float):
+        """回報一批的大小與處理時間，調整下一批的 batch_size"""
+        batch_size = self.batch_size
+        if latency > self.target_latency:
+            batch_size = batch_size // 2
+        elif size >= self.batch_size and self.backlog >= self.batch_size:
+            batch_size = batch_size * 2
+        elif size < self.batch_size and self.backlog == 0:
+            batch_size = max(size, batch_size // 2)
+
+        batch_size = max(self.min_batch_size, min(batch_size, self.max_batch_size))
+        if batch_size != self.batch_size:
+            logger.info(
+                f"Adjust batch size {self.batch_size} -> {batch_size} "
+                f"(latency={latency:.3f}s, backlog={self.backlog})"
+            )
+            self.batch_size = batch_size
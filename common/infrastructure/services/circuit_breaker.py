@@ -0,0 +1,71 @@
+import time
+from enum import Enum
+from typing import Callable
+
+from loguru import logger
+
+
+class CircuitState(str, Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """
+    連續失敗 failure_threshold 次後 OPEN, 在 reset_timeout 內直接拒絕呼叫；
+    之後進入 HALF_OPEN 只放行一個試探呼叫，成功就回到 CLOSED。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_progress = False
+
+    def allow_request(self) -> bool:
+        if self.state == CircuitState.CLOSED:
+            return True
+
+        if self.state == CircuitState.OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self._trial_in_progress = False
+
+        # HALF_OPEN: 同一時間只放行一個試探
+        if self._trial_in_progress:
+            return False
+        self._trial_in_progress = True
+        return True
+
+    def record_success(self):
+        if self.state != CircuitState.CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._trial_in_progress = False
+
+    def release_trial(self):
+        """試探呼叫沒有結果 (例如被取消) 時釋放名額，讓下一個呼叫可以再試探"""
+        self._trial_in_progress = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != CircuitState.OPEN:
+                logger.warning(f"Circuit {self.name} opened after {self.failures} failures")
+            self.state = CircuitState.OPEN
+            self.opened_at = self.clock()
+            self._trial_in_progress = False
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import redis
+
+from common.domain.models import TaskStatus
+from common.domain.services.idempotency_store import (
+    IdempotencyKeyInProgressError,
+    IdempotencyKeyMismatchError,
+    IdempotencyRecord,
+    IIdempotencyStore,
+)
+
+
+class IdempotencyStore(IIdempotencyStore):
+    """
+    SET NX 原子地保留 key, 只有第一個 request 會寫 database / outbox:
+    - value 帶著 request 內容的 fingerprint, 同一個 key 換了 payload 會被拒絕
+    - 保留中的 key 只有 pending_ttl, 由 keep_reserved 定期延長; web_api crash 時不會把 key 鎖住整個 window
+    - 完成後寫入 task_id / status, 保留 window 秒
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        window: int = 86400,
+        pending_ttl: int = 30,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+    ):
+        self.redis_client = redis_client
+        self.window = window
+        self.pending_ttl = pending_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"idempotency:{key}"
+
+    async def reserve(self, key: str, fingerprint: str) -> IdempotencyRecord | None:
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            if await self.redis_client.set(
+                self._key(key), json.dumps({"fingerprint": fingerprint}), ex=self.pending_ttl, nx=True
+            ):
+                return None
+
+            value = await self.redis_client.get(self._key(key))
+            # value 為 None 代表第一個 request 失敗後 release 了 key, 下一輪重新搶
+            if value is not None:
+                data = json.loads(value)
+                if data["fingerprint"] != fingerprint:
+                    raise IdempotencyKeyMismatchError(key)
+                if "task_id" in data:
+                    return IdempotencyRecord(task_id=data["task_id"], status=TaskStatus(data["status"]))
+
+            if asyncio.get_running_loop().time() >= deadline:
+                raise IdempotencyKeyInProgressError(key)
+            await asyncio.sleep(self.poll_interval)
+
+    async def keep_reserved(self, key: str):
+        while True:
+            await asyncio.sleep(self.pending_ttl / 3)
+            await self.redis_client.expire(self._key(key), self.pending_ttl)
+
+    async def complete(self, key: str, fingerprint: str, record: IdempotencyRecord):
+        await self.redis_client.set(
+            self._key(key),
+            json.dumps({"fingerprint": fingerprint, "task_id": record.task_id, "status": record.status.value}),
+            ex=self.window,
+        )
+
+    async def release(self, key: str):
+        await self.redis_client.delete(self._key(key))
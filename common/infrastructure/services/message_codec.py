@@ -0,0 +1,83 @@
+import json
+
+from common.domain.services.message_codec import IMessageCodec
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+class JsonMessageCodec(IMessageCodec):
+    content_type = "application/json"
+
+    def encode(self, message: dict) -> bytes:
+        return json.dumps(message, separators=(",", ":")).encode()
+
+    def decode(self, body: bytes) -> dict:
+        return json.loads(body)
+
+
+class OrjsonMessageCodec(IMessageCodec):
+    # 與 JsonMessageCodec 輸出相容的 JSON, 只是 encode / decode 較快
+    content_type = "application/json"
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError("orjson is not installed, use MESSAGE_CODEC=json or `poetry install -E codecs`")
+
+    def encode(self, message: dict) -> bytes:
+        return orjson.dumps(message)
+
+    def decode(self, body: bytes) -> dict:
+        return orjson.loads(body)
+
+
+class MsgpackMessageCodec(IMessageCodec):
+    content_type = "application/msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed, use MESSAGE_CODEC=json or `poetry install -E codecs`")
+
+    def encode(self, message: dict) -> bytes:
+        return msgpack.packb(message)
+
+    def decode(self, body: bytes) -> dict:
+        return msgpack.unpackb(body)
+
+
+MESSAGE_CODECS: dict[str, type[IMessageCodec]] = {
+    "json": JsonMessageCodec,
+    "orjson": OrjsonMessageCodec,
+    "msgpack": MsgpackMessageCodec,
+}
+
+
+def create_message_codec(name: str) -> IMessageCodec:
+    try:
+        return MESSAGE_CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown message codec {name!r}, expected one of {sorted(MESSAGE_CODECS)}")
+
+
+class ContentTypeMessageDecoder:
+    """
+    依 message 的 content_type 挑選 decoder, publisher 切換 codec 的過渡期間 consumer 仍能解析舊 message
+    """
+
+    def __init__(self, default_codec: IMessageCodec):
+        self.default_codec = default_codec
+        self.codecs: dict[str, IMessageCodec] = {default_codec.content_type: default_codec}
+        if default_codec.content_type != JsonMessageCodec.content_type:
+            self.codecs[JsonMessageCodec.content_type] = JsonMessageCodec()
+        if msgpack is not None and MsgpackMessageCodec.content_type not in self.codecs:
+            self.codecs[MsgpackMessageCodec.content_type] = MsgpackMessageCodec()
+
+    def decode(self, body: bytes, content_type: str | None) -> dict:
+        return self.codecs.get(content_type, self.default_codec).decode(body)
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Iterable
+
+from aio_pika.abc import AbstractIncomingMessage
+
+
+class MessageSettler:
+    """
+    追蹤 channel 上尚未 settle 的 delivery tag, 把 ack 合併成 multiple=True 的單一 frame。
+
+    multiple=True 會一併 ack 所有「小於等於該 tag 且尚未 settle」的 message, 所以只有在
+    「從最小的 outstanding tag 開始、連續都是這次要 ack 的 message」時才能合併，
+    其餘的 ack 逐筆送出。nack / reject 一律先送，避免被後面的 multiple ack 涵蓋。
+
+    delivery tag 只在同一個 channel 內有意義: robust connection 重新連線後 tag 會從 1 重新開始，
+    所以依 channel 分開追蹤，舊 channel 的 message 不會被算進新 channel 的連續區間。
+    """
+
+    def __init__(self):
+        # channel -> {delivery tag -> message}, 同一個 channel 的 tag 遞增，dict 的插入順序就是 tag 順序
+        self._outstanding: dict[object, dict[int, AbstractIncomingMessage]] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def outstanding(self) -> int:
+        return sum(len(messages) for messages in self._outstanding.values())
+
+    def track(self, message: AbstractIncomingMessage):
+        self._outstanding.setdefault(message.channel, {})[message.delivery_tag] = message
+
+    def discard_closed_channels(self):
+        """channel 重新開啟後呼叫: 已關閉的 channel 上未 settle 的 message 已經被 broker requeue, 不再追蹤"""
+        for channel in [channel for channel in self._outstanding if channel.is_closed]:
+            del self._outstanding[channel]
+
+    def _untrack(self, message: AbstractIncomingMessage):
+        self._outstanding.get(message.channel, {}).pop(message.delivery_tag, None)
+
+    async def settle(
+        self,
+        acks: Iterable[AbstractIncomingMessage] = (),
+        nacks: Iterable[AbstractIncomingMessage] = (),
+        rejects: Iterable[AbstractIncomingMessage] = (),
+    ):
+        async with self._lock:
+            nacks, rejects = list(nacks), list(rejects)
+            for message in [*nacks, *rejects]:
+                self._untrack(message)
+            await asyncio.gather(
+                *[message.nack(requeue=True) for message in nacks],
+                *[message.reject(requeue=False) for message in rejects],
+            )
+
+            acks_by_channel: dict[object, dict[int, AbstractIncomingMessage]] = {}
+            for message in acks:
+                acks_by_channel.setdefault(message.channel, {})[message.delivery_tag] = message
+
+            multiple_acks: list[AbstractIncomingMessage] = []
+            single_acks: list[AbstractIncomingMessage] = []
+            for channel, ack_tags in acks_by_channel.items():
+                outstanding = self._outstanding.get(channel, {})
+
+                # 從最小的 outstanding tag 開始，連續都要 ack 的部分用一個 multiple ack 送出
+                contiguous: list[AbstractIncomingMessage] = []
+                for tag, message in outstanding.items():
+                    if tag not in ack_tags:
+                        break
+                    contiguous.append(message)
+
+                for message in contiguous:
+                    del outstanding[message.delivery_tag]
+                    del ack_tags[message.delivery_tag]
+                for tag in ack_tags:
+                    outstanding.pop(tag, None)
+
+                if contiguous:
+                    multiple_acks.append(contiguous[-1])
+                single_acks.extend(ack_tags.values())
+
+            await asyncio.gather(
+                *[message.ack(multiple=True) for message in multiple_acks],
+                *[message.ack() for message in single_acks],
+            )
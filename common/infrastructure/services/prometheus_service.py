@@ -1,22 +1,76 @@
+import os
+
 from loguru import logger
-from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess, start_http_server
 
+from common.domain.models import TaskPriority
 from common.domain.services.prometheus_service import IPrometheusMetricsService
 
 
+def start_multiprocess_server(port: int = 8002):
+    """彙整 PROMETHEUS_MULTIPROC_DIR 內所有 worker 的 metrics, 從單一 port 提供"""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+
+
 class PrometheusMetricsService(IPrometheusMetricsService):
     def __init__(self):
         # 定義指標，並註冊標籤
         self.task_counter = Counter("tasks_processed", "Total number of tasks processed", ["status"])
         self.task_processing_time = Histogram("task_processing_seconds", "Time spent processing tasks")
         self.task_execution_time = Histogram("task_execution_seconds", "Time from task creation to completion")
+        self.task_create_batch_size = Histogram(
+            "task_create_batch_size",
+            "Number of tasks written per group commit",
+            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+        )
+        self.task_status_batch_size = Histogram(
+            "task_status_batch_request_size",
+            "Number of task ids per batch status request",
+            buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+        )
+        self.consumer_settlement_time = Histogram(
+            "consumer_batch_settlement_seconds",
+            "Time spent acking / nacking one consumer batch",
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+        )
+        self.task_interruption_latency = Histogram(
+            "task_interruption_latency_seconds",
+            "Time from a cancel request to the running task being interrupted",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+        )
+        self.task_interruption_time_saved = Histogram(
+            "task_interruption_time_saved_seconds",
+            "Expected processing time skipped by interrupting a cancelled task",
+        )
+        self.task_queue_wait_time = Histogram(
+            "task_queue_wait_seconds",
+            "Time from task creation to the consumer starting it, by priority",
+            ["priority"],
+            buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0),
+        )
+
+        self.task_result_cache_lookups = Counter(
+            "task_result_cache_lookups",
+            "Number of memoized task executions, by whether the result came from the cache",
+            ["outcome"],
+        )
 
         # 預先初始化需要的標籤，確保不會在運行時出現未定義標籤的錯誤
         self.task_counter.labels(status="received")
         self.task_counter.labels(status="success")
         self.task_counter.labels(status="failed")  # 可以預設其他可能的狀態
+        for priority in TaskPriority:
+            self.task_queue_wait_time.labels(priority=priority.value)
+        for outcome in ("local_hit", "redis_hit", "coalesced", "miss"):
+            self.task_result_cache_lookups.labels(outcome=outcome)
 
     def start_server(self, port: int = 8002):
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            # multiprocess mode: 各 worker 只寫入 metrics 檔案，由 supervisor 彙整後提供
+            logger.info("Prometheus multiprocess mode, metrics are served by the supervisor")
+            return
         logger.info("Start Prometheus metrics server...")
         start_http_server(port)
         logger.info("Success Start Prometheus metrics server")
@@ -32,3 +86,31 @@ class PrometheusMetricsService(IPrometheusMetricsService):
     def observe_execution_time(self, duration: float):
         # 記錄每個任務從創建到完成的總執行時間
         self.task_execution_time.observe(duration)
+
+    def observe_create_batch_size(self, size: int):
+        # 記錄 group commit 實際合併到的 batch 大小
+        self.task_create_batch_size.observe(size)
+
+    def observe_status_batch_size(self, size: int):
+        # 記錄 batch status 查詢一次帶了多少 task id
+        self.task_status_batch_size.observe(size)
+
+    def observe_settlement_time(self, duration: float):
+        # 記錄每個 batch 的 ack / nack 花費時間
+        self.consumer_settlement_time.observe(duration)
+
+    def observe_interruption_latency(self, duration: float):
+        # 從取消請求到 consumer 中斷執行中 task 的時間
+        self.task_interruption_latency.observe(duration)
+
+    def observe_interruption_time_saved(self, duration: float):
+        # 中斷後省下的預期處理時間
+        self.task_interruption_time_saved.observe(duration)
+
+    def observe_queue_wait(self, priority: str, duration: float):
+        # 從建立 task 到 consumer 開始處理的等待時間，依 priority 分開觀察 bulk load 時的影響
+        self.task_queue_wait_time.labels(priority=priority).observe(duration)
+
+    def inc_result_cache_lookup(self, outcome: str):
+        # local_hit / redis_hit / coalesced 都不需要執行 handler, hit rate = 1 - miss / 全部
+        self.task_result_cache_lookups.labels(outcome=outcome).inc()
@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractIncomingMessage
+from loguru import logger
+
+from common.domain.services.message_codec import (
+    ATTEMPT_HEADER,
+    DEAD_LETTER_REASON_HEADER,
+    DEAD_LETTERED_AT_HEADER,
+    ORIGINAL_QUEUE_HEADER,
+)
+
+DEFAULT_RETRY_DELAYS = (1.0, 4.0, 16.0, 64.0, 256.0)  # seconds
+# broker dead-letter 時加上的 header, 重新 publish 時不帶過去，避免 header 越來越大
+BROKER_DEATH_HEADERS = ("x-death", "x-first-death-", "x-last-death-")
+
+
+def delay_queue_name(routing_key: str, delay: float) -> str:
+    return f"{routing_key}.delay.{int(delay * 1000)}ms"
+
+
+def dead_letter_queue_name(routing_key: str) -> str:
+    return f"{routing_key}.dead"
+
+
+class RetryScheduler:
+    """
+    失敗的 message 不再 nack(requeue=True) 立即重送，而是依失敗次數送進對應的延遲 queue:
+
+    - 每個 delay 一個 fanout exchange + queue (x-message-ttl), 同一個 queue 內的 TTL 相同，不會有 head-of-line blocking
+    - TTL 到期後經由 default exchange dead-letter 回原本的 routing key (也就是原本的 priority queue)
+    - 失敗次數超過 delays 的數量時送進 dead-letter queue, 等待人工檢查或 replay
+
+    publish 使用 publisher confirms, 確認送達後呼叫端才 ack 原本的 message; publish 失敗的 message 交回呼叫端 nack
+    """
+
+    def __init__(self, routing_key: str = "task_queue", delays: tuple[float, ...] = DEFAULT_RETRY_DELAYS):
+        self.routing_key = routing_key
+        self.delays = tuple(delays)
+        self.dead_letter_queue = dead_letter_queue_name(routing_key)
+        self.channel: AbstractChannel | None = None
+        self._delay_exchanges: list[aio_pika.abc.AbstractExchange] = []
+
+    async def declare(self, channel: AbstractChannel):
+        """channel 必須開啟 publisher confirms"""
+        self._delay_exchanges = []
+        for delay in self.delays:
+            name = delay_queue_name(self.routing_key, delay)
+            exchange = await channel.declare_exchange(name, aio_pika.ExchangeType.FANOUT)
+            queue = await channel.declare_queue(
+                name,
+                arguments={"x-message-ttl": int(delay * 1000), "x-dead-letter-exchange": ""},
+            )
+            await queue.bind(exchange)
+            self._delay_exchanges.append(exchange)
+        await channel.declare_queue(self.dead_letter_queue)
+        self.channel = channel
+        logger.info(f"Declared {len(self.delays)} retry delay queues and {self.dead_letter_queue}")
+
+    async def schedule_retries(
+        self, messages: list[AbstractIncomingMessage], reason: str = "processing_failed"
+    ) -> tuple[list[AbstractIncomingMessage], list[AbstractIncomingMessage]]:
+        """回傳 (已送進延遲 queue 或 dead-letter queue 的 message, publish 失敗的 message)"""
+        publishes = []
+        for message in messages:
+            attempts = self._attempts(message)
+            if attempts > len(self.delays):
+                publishes.append(self._publish_dead_letter(message, attempts, reason))
+            else:
+                publishes.append(self._publish_delayed(message, attempts))
+        return await self._gather(messages, publishes)
+
+    async def dead_letter(
+        self, messages: list[AbstractIncomingMessage], reason: str
+    ) -> tuple[list[AbstractIncomingMessage], list[AbstractIncomingMessage]]:
+        """重試也不會成功的 message (例如無法解析) 直接送進 dead-letter queue"""
+        return await self._gather(
+            messages,
+            [self._publish_dead_letter(message, self._attempts(message), reason) for message in messages],
+        )
+
+    def is_exhausted(self, message: AbstractIncomingMessage) -> bool:
+        """schedule_retries 會把這個 message 送進 dead-letter queue 而不是延遲 queue"""
+        return self._attempts(message) > len(self.delays)
+
+    @staticmethod
+    def _attempts(message: AbstractIncomingMessage) -> int:
+        """包含這一次在內的失敗次數"""
+        return int((message.headers or {}).get(ATTEMPT_HEADER) or 0) + 1
+
+    async def _gather(self, messages, publishes) -> tuple[list, list]:
+        if not messages:
+            return [], []
+        if self.channel is None or self.channel.is_closed:
+            for publish in publishes:
+                publish.close()
+            return [], list(messages)
+
+        results = await asyncio.gather(*publishes, return_exceptions=True)
+        published, failed = [], []
+        for message, result in zip(messages, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to schedule retry for message {message.delivery_tag}: {result}")
+                failed.append(message)
+            else:
+                published.append(message)
+        return published, failed
+
+    async def _publish_delayed(self, message: AbstractIncomingMessage, attempts: int):
+        exchange = self._delay_exchanges[attempts - 1]
+        # fanout exchange 忽略 routing key, 但 TTL 到期 dead-letter 時會沿用它回到原本的 queue
+        await exchange.publish(
+            self._copy(message, {ATTEMPT_HEADER: attempts}),
+            routing_key=message.routing_key or self.routing_key,
+        )
+
+    async def _publish_dead_letter(self, message: AbstractIncomingMessage, attempts: int, reason: str):
+        headers = {
+            ATTEMPT_HEADER: attempts,
+            ORIGINAL_QUEUE_HEADER: message.routing_key or self.routing_key,
+            DEAD_LETTER_REASON_HEADER: reason,
+            DEAD_LETTERED_AT_HEADER: time.time(),
+        }
+        await self.channel.default_exchange.publish(self._copy(message, headers), routing_key=self.dead_letter_queue)
+        logger.warning(f"Message {message.delivery_tag} dead-lettered after {attempts} attempts: {reason}")
+
+    @staticmethod
+    def _copy(message: AbstractIncomingMessage, headers: dict) -> aio_pika.Message:
+        original_headers = {
+            key: value for key, value in (message.headers or {}).items() if not key.startswith(BROKER_DEATH_HEADERS)
+        }
+        return aio_pika.Message(
+            body=message.body,
+            content_type=message.content_type,
+            headers={**original_headers, **headers},
+        )
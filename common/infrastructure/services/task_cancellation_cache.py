@@ -1,16 +1,87 @@
+import asyncio
+import json
+import time
+from contextlib import suppress
+from typing import Callable
+
 import redis
+from loguru import logger
 
 from common.domain.services.task_cancellation_cache import ITaskCancellationCache
 
+TASK_CANCELLATION_EVENTS_CHANNEL = "task_cancellation_events"
+CANCEL_FLAG_TTL = 3600  # seconds
+
 
 class TaskCancellationCache(ITaskCancellationCache):
-    def __init__(self, redis_client: redis.Redis):
+    """
+    取消標記存在 redis, set_task_cancelled 同時 publish 取消事件。
+
+    呼叫 start() 後訂閱取消事件並通知 add_cancel_listener 註冊的 callback, 用來中斷執行中的 task。
+    consumer 是否要寫入 COMPLETED 由 database 的 compare-and-set 決定，不需要查詢取消標記。
+    """
+
+    def __init__(self, redis_client: redis.Redis, ttl: int = CANCEL_FLAG_TTL):
         self.redis_client = redis_client
+        self.ttl = ttl
+
+        self._listener: asyncio.Task | None = None
+        self._cancel_listeners: list[Callable[[int, float], None]] = []
+
+    @staticmethod
+    def _key(task_id: int) -> str:
+        return f"task:{task_id}:cancel"
 
     async def set_task_cancelled(self, task_id: int):
         """設置任務取消標記"""
-        await self.redis_client.set(f"task:{task_id}:cancel", "1", ex=3600)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(task_id), "1", ex=self.ttl)
+            pipe.publish(
+                TASK_CANCELLATION_EVENTS_CHANNEL, json.dumps({"task_id": task_id, "cancelled_at": time.time()})
+            )
+            await pipe.execute()
 
     async def is_task_cancelled(self, task_id: int) -> bool:
         """檢查任務是否被取消"""
-        return await self.redis_client.exists(f"task:{task_id}:cancel") > 0
+        return await self.redis_client.exists(self._key(task_id)) > 0
+
+    def add_cancel_listener(self, listener: Callable[[int, float], None]):
+        self._cancel_listeners.append(listener)
+
+    async def start(self):
+        """啟動取消事件的訂閱"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(TASK_CANCELLATION_EVENTS_CHANNEL)
+                    async for message in pubsub.listen():
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Task cancellation subscription lost: {e}")
+                await asyncio.sleep(1)
+
+    def _dispatch(self, data: bytes | str):
+        try:
+            event = json.loads(data)
+            task_id, cancelled_at = int(event["task_id"]), float(event["cancelled_at"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignore malformed task cancellation event: {data!r}")
+            return
+
+        for listener in self._cancel_listeners:
+            try:
+                listener(task_id, cancelled_at)
+            except Exception as e:
+                logger.exception(f"Task cancellation listener failed: {e}")
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
@@ -0,0 +1,81 @@
+import asyncio
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+from loguru import logger
+
+from common.domain.models import DEFAULT_TASK_TYPE, Task, TaskPriority
+from common.domain.repo.task_repo import ITaskRepository
+from common.domain.services.prometheus_service import IPrometheusMetricsService
+from common.domain.services.task_create_batcher import ITaskCreateBatcher
+
+
+class TaskCreateBatcher(ITaskCreateBatcher):
+    """
+    Group commit: 把 window 內併發進來的 create_task 收集起來，用一次 create_tasks 寫入，
+    每個 caller 的 future 各自拿回自己的 Task。
+    """
+
+    def __init__(
+        self,
+        task_repo_factory: Callable[[], AbstractAsyncContextManager[ITaskRepository]],
+        metrics: IPrometheusMetricsService,
+        window: float = 0.005,
+        max_batch_size: int = 100,
+    ):
+        self.task_repo_factory = task_repo_factory
+        self.metrics = metrics
+        self.window = window
+        self.max_batch_size = max_batch_size
+
+        self._pending: list[tuple[str, str, TaskPriority, asyncio.Future]] = []
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._writers: set[asyncio.Task] = set()
+
+    async def create_task(
+        self, payload: str, task_type: str = DEFAULT_TASK_TYPE, priority: TaskPriority = TaskPriority.NORMAL
+    ) -> Task:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((payload, task_type, priority, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # 保留 reference, 避免 writer task 在完成前被 GC
+        writer = asyncio.create_task(self._write(batch))
+        self._writers.add(writer)
+        writer.add_done_callback(self._writers.discard)
+
+    async def _write(self, batch: list[tuple[str, str, TaskPriority, asyncio.Future]]):
+        self.metrics.observe_create_batch_size(len(batch))
+        try:
+            async with self.task_repo_factory() as task_repo:
+                tasks = await task_repo.create_tasks(
+                    [payload for payload, _, _, _ in batch],
+                    [task_type for _, task_type, _, _ in batch],
+                    [priority for _, _, priority, _ in batch],
+                )
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} tasks failed: {e}")
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (*_, future), task in zip(batch, tasks):
+            if not future.done():
+                future.set_result(task)
@@ -0,0 +1,95 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+from loguru import logger
+
+from common.domain.models import Task, TaskRecord
+from common.domain.services.task_handler import (
+    BatchTaskHandler,
+    ExecutionBackend,
+    ITaskHandlerRegistry,
+    TaskHandler,
+    UnknownTaskTypeError,
+)
+
+
+class TaskHandlerRegistry(ITaskHandlerRegistry):
+    """
+    依 task_type 找到 handler, 再依 handler 宣告的 backend 執行。
+    每個 backend 各自一個 semaphore 限制並行數量，CPU-bound 的 task 在 process pool 執行，不會卡住
+    負責 ack、heartbeat 與取消事件的 event loop。
+
+    thread / process backend 被取消時只會停止等待結果，已經開始的工作會在背景跑完
+    """
+
+    def __init__(
+        self,
+        asyncio_concurrency: int = 10000,
+        thread_workers: int = 32,
+        process_workers: int = 4,
+    ):
+        self._handlers: dict[str, TaskHandler | BatchTaskHandler] = {}
+        self._limits = {
+            ExecutionBackend.ASYNCIO: asyncio.Semaphore(asyncio_concurrency),
+            ExecutionBackend.THREAD: asyncio.Semaphore(thread_workers),
+            ExecutionBackend.PROCESS: asyncio.Semaphore(process_workers),
+        }
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        # 第一次用到時才建立，supervisor fork 出來的 worker 各自擁有自己的 pool
+        self._executors: dict[ExecutionBackend, Executor] = {}
+
+    def register(self, handler: TaskHandler | BatchTaskHandler):
+        if handler.task_type in self._handlers:
+            raise ValueError(f"Task handler for {handler.task_type!r} is already registered")
+        self._handlers[handler.task_type] = handler
+
+    def get(self, task_type: str) -> TaskHandler | BatchTaskHandler:
+        handler = self._handlers.get(task_type)
+        if handler is None:
+            raise UnknownTaskTypeError(task_type=task_type)
+        return handler
+
+    async def run(self, handler: TaskHandler, task: Task | TaskRecord) -> Any:
+        async with self._limits[handler.backend]:
+            if handler.backend == ExecutionBackend.ASYNCIO:
+                return await handler.func(task.payload)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor(handler.backend), handler.func, task.payload)
+
+    async def run_batch(self, handler: BatchTaskHandler, tasks: list[Task | TaskRecord]) -> list[Any]:
+        async with self._limits[handler.backend]:
+            if handler.backend == ExecutionBackend.ASYNCIO:
+                outcomes = await handler.func(tasks)
+            else:
+                loop = asyncio.get_running_loop()
+                outcomes = await loop.run_in_executor(self._executor(handler.backend), handler.func, tasks)
+
+        outcomes = list(outcomes)
+        if len(outcomes) != len(tasks):
+            raise ValueError(
+                f"Batch handler {handler.task_type!r} returned {len(outcomes)} outcomes for {len(tasks)} tasks"
+            )
+        return outcomes
+
+    def _executor(self, backend: ExecutionBackend) -> Executor:
+        executor = self._executors.get(backend)
+        if executor is None:
+            if backend == ExecutionBackend.THREAD:
+                executor = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="task-handler")
+            else:
+                # event loop 已經有其他 thread, 用 forkserver 避免 fork 時複製到鎖住的狀態
+                executor = ProcessPoolExecutor(
+                    max_workers=self.process_workers, mp_context=multiprocessing.get_context("forkserver")
+                )
+            logger.info(f"Start {backend.value} executor for task handlers")
+            self._executors[backend] = executor
+        return executor
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
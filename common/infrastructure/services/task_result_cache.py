@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+import redis
+from loguru import logger
+
+from common.domain.services.prometheus_service import IPrometheusMetricsService
+from common.domain.services.task_result_cache import ITaskResultCache
+
+
+class TaskResultCache(ITaskResultCache):
+    """
+    兩層快取，只給結果只取決於 payload 的 handler 使用 (TaskHandler.memoize):
+    - local: process 內的 LRU, 最多 max_entries 筆，每筆 ttl 秒後過期
+    - redis: 所有 consumer 共用，同樣 ttl 秒後過期; 結果無法轉成 JSON 時只留在 local
+    同一個 key 正在執行時，後到的 task 等待同一次執行 (in-flight coalescing)
+    redis 失敗時當作 miss, 快取不會讓 task 失敗
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        metrics: IPrometheusMetricsService | None = None,
+        max_entries: int = 10000,
+        ttl: int = 3600,
+    ):
+        self.redis_client = redis_client
+        self.metrics = metrics
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # key -> (過期時間 (monotonic), 結果), 依最近使用的順序排列
+        self._local: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _key(task_type: str, payload: str) -> str:
+        digest = hashlib.sha256(f"{task_type}\0{payload}".encode()).hexdigest()
+        return f"task_result:{digest}"
+
+    async def get_or_compute(self, task_type: str, payload: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        key = self._key(task_type, payload)
+        while True:
+            hit, value = self._get_local(key)
+            if hit:
+                self._inc_lookup("local_hit")
+                return value
+
+            future = self._in_flight.get(key)
+            if future is None:
+                return await self._compute(key, compute)
+
+            self._inc_lookup("coalesced")
+            try:
+                # shield: 等待中的 task 被中斷時不會連帶取消正在執行的那一個
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling() or not future.cancelled():
+                    raise
+                # 正在執行的 task 被中斷，由等待中的 task 重新執行
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        # 沒有其他 task 在等待時，不會出現 exception never retrieved 的警告
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._in_flight[key] = future
+        try:
+            hit, value = await self._get_redis(key)
+            if hit:
+                self._inc_lookup("redis_hit")
+            else:
+                self._inc_lookup("miss")
+                value = await compute()
+                await self._set_redis(key, value)
+            self._set_local(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _get_local(self, key: str) -> tuple[bool, Any]:
+        entry = self._local.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._local[key]
+            return False, None
+        self._local.move_to_end(key)
+        return True, value
+
+    def _set_local(self, key: str, value: Any):
+        self._local[key] = (time.monotonic() + self.ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def _get_redis(self, key: str) -> tuple[bool, Any]:
+        try:
+            value = await self.redis_client.get(key)
+        except Exception as e:
+            logger.warning(f"Task result cache lookup failed: {e}")
+            return False, None
+        if value is None:
+            return False, None
+        return True, json.loads(value)
+
+    async def _set_redis(self, key: str, value: Any):
+        try:
+            data = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        try:
+            await self.redis_client.set(key, data, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Task result cache write failed: {e}")
+
+    def _inc_lookup(self, outcome: str):
+        if self.metrics:
+            self.metrics.inc_result_cache_lookup(outcome)
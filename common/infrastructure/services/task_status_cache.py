@@ -0,0 +1,43 @@
+import json
+
+import redis
+
+from common.domain.models import TaskStatus
+from common.domain.services.task_status_cache import ITaskStatusCache
+
+TASK_STATUS_EVENTS_CHANNEL = "task_status_events"
+
+
+class TaskStatusCache(ITaskStatusCache):
+    def __init__(self, redis_client: redis.Redis, ttl: int = 3600):
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(task_id: int) -> str:
+        return f"task:{task_id}:status"
+
+    async def set_statuses(self, statuses: dict[int, TaskStatus]):
+        """寫入狀態轉換 (覆蓋舊值)"""
+        if not statuses:
+            return
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for task_id, status in statuses.items():
+                pipe.set(self._key(task_id), status.value, ex=self.ttl)
+            # 同一個 pipeline 順便通知 web_api 上等待中的 long-poll / SSE
+            pipe.publish(
+                TASK_STATUS_EVENTS_CHANNEL,
+                json.dumps({task_id: status.value for task_id, status in statuses.items()}),
+            )
+            await pipe.execute()
+
+    async def backfill_status(self, task_id: int, status: TaskStatus):
+        """cache miss 後從 database 回填，只在 key 不存在時寫入"""
+        await self.redis_client.set(self._key(task_id), status.value, ex=self.ttl, nx=True)
+
+    async def get_status(self, task_id: int) -> TaskStatus | None:
+        """讀取狀態，沒有 projection 時回傳 None"""
+        value = await self.redis_client.get(self._key(task_id))
+        if value is None:
+            return None
+        return TaskStatus(value.decode() if isinstance(value, bytes) else value)
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+import redis
+from loguru import logger
+
+from common.domain.models import TaskStatus
+from common.domain.services.task_status_notifier import ITaskStatusNotifier
+from common.infrastructure.services.task_status_cache import TASK_STATUS_EVENTS_CHANNEL
+
+
+class TaskStatusNotifier(ITaskStatusNotifier):
+    """
+    整個 process 共用一個 redis pub/sub 連線，依 task_id 把事件分派到各 waiter 的 queue,
+    每個 idle waiter 只佔一個 asyncio.Queue 與 dict entry
+    """
+
+    def __init__(self, redis_client: redis.Redis, subscribe_timeout: float = 1.0):
+        self.redis_client = redis_client
+        self.subscribe_timeout = subscribe_timeout
+
+        self._waiters: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._listener: asyncio.Task | None = None
+        self._subscribed = asyncio.Event()
+
+    async def start(self):
+        """預先建立 pub/sub 連線，第一個 waiter 不必等待訂閱完成"""
+        await self._ensure_listener()
+
+    @asynccontextmanager
+    async def subscribe(self, task_ids: list[int]) -> AsyncIterator[asyncio.Queue[tuple[int, TaskStatus]]]:
+        await self._ensure_listener()
+
+        queue: asyncio.Queue[tuple[int, TaskStatus]] = asyncio.Queue()
+        for task_id in task_ids:
+            self._waiters[task_id].add(queue)
+        try:
+            yield queue
+        finally:
+            for task_id in task_ids:
+                waiters = self._waiters.get(task_id)
+                if waiters is None:
+                    continue
+                waiters.discard(queue)
+                if not waiters:
+                    del self._waiters[task_id]
+
+    async def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._subscribed = asyncio.Event()
+            self._listener = asyncio.create_task(self._listen())
+
+        # redis 無法使用時不阻塞 request, waiter 會退化成等到 timeout 後再讀一次狀態
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._subscribed.wait(), timeout=self.subscribe_timeout)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(TASK_STATUS_EVENTS_CHANNEL)
+                    self._subscribed.set()
+                    async for message in pubsub.listen():
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._subscribed.clear()
+                logger.error(f"Task status subscription lost: {e}")
+                await asyncio.sleep(1)
+
+    def _dispatch(self, data: bytes | str):
+        try:
+            statuses = json.loads(data)
+        except ValueError:
+            logger.warning(f"Ignore malformed task status event: {data!r}")
+            return
+
+        for raw_task_id, raw_status in statuses.items():
+            waiters = self._waiters.get(int(raw_task_id))
+            if not waiters:
+                continue
+            status = TaskStatus(raw_status)
+            for queue in waiters:
+                queue.put_nowait((int(raw_task_id), status))
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
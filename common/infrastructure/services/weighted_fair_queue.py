@@ -0,0 +1,73 @@
+import asyncio
+from collections import deque
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class WeightedFairQueue(Generic[T]):
+    """
+    依 class 分開排隊，取出時以 smooth weighted round robin 在「目前有 item 的 class」之間分配：
+    權重 8:4:1 且三個 class 都有 backlog 時，每 13 個 item 依序交錯取出 8 / 4 / 1 個;
+    只有一個 class 有 item 時全部給它，不會因為權重而閒置。
+
+    實作 AdaptiveBatcher 用到的 asyncio.Queue 介面 (put_nowait / get / get_nowait / empty / qsize)
+    """
+
+    def __init__(self, weights: dict[str, int], key: Callable[[T], str], default_class: str | None = None):
+        if not weights or any(weight <= 0 for weight in weights.values()):
+            raise ValueError("weights must be positive")
+        self.weights = dict(weights)
+        self.key = key
+        # key 回傳未知的 class 時歸到這個 class
+        self.default_class = default_class or next(iter(self.weights))
+        self._queues: dict[str, deque[T]] = {name: deque() for name in self.weights}
+        self._credits: dict[str, int] = {name: 0 for name in self.weights}
+        self._size = 0
+        self._not_empty = asyncio.Event()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def class_size(self, name: str) -> int:
+        return len(self._queues[name])
+
+    def put_nowait(self, item: T):
+        name = self.key(item)
+        if name not in self._queues:
+            name = self.default_class
+        self._queues[name].append(item)
+        self._size += 1
+        self._not_empty.set()
+
+    def get_nowait(self) -> T:
+        if self._size == 0:
+            raise asyncio.QueueEmpty
+
+        total = 0
+        chosen = None
+        for name, queue in self._queues.items():
+            if not queue:
+                continue
+            self._credits[name] += self.weights[name]
+            total += self.weights[name]
+            if chosen is None or self._credits[name] > self._credits[chosen]:
+                chosen = name
+        self._credits[chosen] -= total
+
+        queue = self._queues[chosen]
+        item = queue.popleft()
+        if not queue:
+            # 清空的 class 不保留累積的 credit, 之後有新 item 時不會一次爆量搶走名額
+            self._credits[chosen] = 0
+        self._size -= 1
+        return item
+
+    async def get(self) -> T:
+        while self._size == 0:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
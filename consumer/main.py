@@ -11,8 +11,11 @@ from common.infrastructure.dependencies import (
     get_consume_queue_service,
     get_prometheus_metrics_service,
     get_task_cancellation_cache,
+    get_task_handler_registry,
+    get_task_result_cache,
+    get_task_status_cache,
+    task_repo_scope,
 )
-from common.infrastructure.repo.task_repo import TaskRepository
 
 app = FastAPI()
 
@@ -21,26 +24,35 @@ app = FastAPI()
 async def lifespan(app: FastAPI):
     consume_queue_service = get_consume_queue_service()
     metrics_service = get_prometheus_metrics_service()
+    metrics_service.start_server()
     cancellation_cache = get_task_cancellation_cache()
+    await cancellation_cache.start()
 
-    async for session in get_db():
-        task_repository = TaskRepository(db_session=session)
-        task_process_use_case = TaskProcessUseCase(
-            task_repository=task_repository,
-            metrics=metrics_service,
-            cancellation_cache=cancellation_cache,
-        )
+    task_process_use_case = TaskProcessUseCase(
+        task_repo_factory=task_repo_scope,
+        metrics=metrics_service,
+        status_cache=get_task_status_cache(),
+        handler_registry=get_task_handler_registry(),
+        result_cache=get_task_result_cache(),
+    )
+    # 取消事件直接中斷執行中的 task
+    cancellation_cache.add_cancel_listener(task_process_use_case.interrupt_task)
 
-        # Pass `task_process_use_case.process_batch` as the batch handler function
-        consumer_task = asyncio.create_task(
-            consume_queue_service.consume(handler_function=task_process_use_case.process_batch)
+    # Pass `task_process_use_case.process_batch` as the batch handler function
+    consumer_task = asyncio.create_task(
+        consume_queue_service.consume(
+            handler_function=task_process_use_case.process_batch,
+            dead_letter_handler=task_process_use_case.fail_tasks,
         )
+    )
 
-        yield
+    yield
 
-        # Cleanup on shutdown
-        consumer_task.cancel()
-        await consume_queue_service.close()
+    # Cleanup on shutdown
+    consumer_task.cancel()
+    await consume_queue_service.close()
+    await cancellation_cache.close()
+    get_task_handler_registry().shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -0,0 +1,152 @@
+"""
+多 process 的 consumer entry point: 一個 supervisor fork 出 N 個 worker, 每個 worker 有自己的 event loop、
+RabbitMQ 連線、DB pool 與 redis client。
+
+- fork 前先 import 所有模組並 gc.freeze(), 讓 worker 以 copy-on-write 共用這些記憶體
+- worker 共用 supervisor 預先 bind 的 socket 提供 /health
+- worker 異常結束時自動重啟
+- prometheus 使用 multiprocess mode, 由獨立的 metrics process 彙整所有 worker 的 metrics
+
+執行: CONSUMER_WORKERS=4 python -m consumer.supervisor
+"""
+
+import gc
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+
+# prometheus_client 在 import 時決定 metrics 的儲存方式，必須在 import 任何 metrics 之前設定
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "consumer_metrics"))
+# 預載期間不做 GC, 避免 fork 前產生的 object 在 worker 內被 GC 觸碰而複製 page
+gc.disable()
+
+# isort: split
+import uvicorn  # noqa: E402
+from loguru import logger  # noqa: E402
+from prometheus_client import multiprocess  # noqa: E402
+
+from common.infrastructure.database import engine  # noqa: E402
+from common.infrastructure.services.prometheus_service import start_multiprocess_server  # noqa: E402
+from consumer.main import app  # noqa: E402
+
+WORKER = "worker"
+METRICS_EXPORTER = "metrics_exporter"
+
+
+class ConsumerSupervisor:
+    def __init__(
+        self,
+        workers: int,
+        host: str = "0.0.0.0",
+        port: int = 8001,
+        metrics_port: int = 8002,
+        restart_delay: float = 1.0,
+    ):
+        self.workers = max(1, workers)
+        self.host = host
+        self.port = port
+        self.metrics_port = metrics_port
+        self.restart_delay = restart_delay
+
+        self.socket: socket.socket | None = None
+        # pid -> (role, 啟動時間)
+        self.children: dict[int, tuple[str, float]] = {}
+        self.stopping = False
+
+    def run(self):
+        self._reset_metrics_dir()
+        self.socket = socket.create_server((self.host, self.port))
+        self.socket.set_inheritable(True)
+
+        gc.freeze()
+        self._spawn(METRICS_EXPORTER)
+        for _ in range(self.workers):
+            self._spawn(WORKER)
+        logger.info(f"Consumer supervisor started {self.workers} workers")
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        while self.children:
+            pid, status = os.waitpid(-1, 0)
+            role, started_at = self.children.pop(pid, (None, 0.0))
+            if role is None:
+                continue
+            if role == WORKER:
+                multiprocess.mark_process_dead(pid)
+            if self.stopping:
+                continue
+
+            logger.error(f"{role} {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            # 啟動後立刻 crash 的 worker 稍等再重啟，避免 busy loop
+            if time.monotonic() - started_at < self.restart_delay:
+                time.sleep(self.restart_delay)
+            self._spawn(role)
+
+        self.socket.close()
+        logger.info("Consumer supervisor stopped")
+
+    def _spawn(self, role: str):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = (role, time.monotonic())
+            return
+
+        # child process
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            gc.enable()
+            if role == WORKER:
+                self._run_worker()
+            else:
+                self._run_metrics_exporter()
+        except BaseException as e:
+            logger.exception(f"{role} {os.getpid()} crashed: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _run_worker(self):
+        # fork 前沒有建立任何 DB 連線，這裡保險起見丟掉繼承的 pool, 每個 worker 各自建立連線
+        engine.sync_engine.dispose(close=False)
+        config = uvicorn.Config(app, log_level=os.getenv("LOG_LEVEL", "info").lower())
+        uvicorn.Server(config).run(sockets=[self.socket])
+
+    def _run_metrics_exporter(self):
+        self.socket.close()
+        start_multiprocess_server(self.metrics_port)
+        while True:
+            signal.pause()
+
+    def _handle_stop(self, signum, frame):
+        # 第一次訊號: 讓 worker graceful shutdown; 再收到一次則強制結束
+        sig = signal.SIGKILL if self.stopping else signal.SIGTERM
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    @staticmethod
+    def _reset_metrics_dir():
+        metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+
+def main():
+    ConsumerSupervisor(
+        workers=int(os.getenv("CONSUMER_WORKERS", str(os.cpu_count() or 1))),
+        port=int(os.getenv("CONSUMER_PORT", "8001")),
+        metrics_port=int(os.getenv("CONSUMER_METRICS_PORT", "8002")),
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""0004 add task type column
+
+Revision ID: 3c7d5e9a1b2f
+Revises: 8f3b2c1d9e4a
+Create Date: 2026-10-18 21:02:41.508213
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c7d5e9a1b2f"
+down_revision: Union[str, None] = "8f3b2c1d9e4a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tasks",
+        sa.Column("task_type", sa.String(length=64), server_default="default", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "task_type")
@@ -0,0 +1,29 @@
+"""0005 add task priority column
+
+Revision ID: 6a1e4f2c8d3b
+Revises: 3c7d5e9a1b2f
+Create Date: 2026-10-18 23:14:07.312845
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6a1e4f2c8d3b"
+down_revision: Union[str, None] = "3c7d5e9a1b2f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tasks",
+        sa.Column("priority", sa.String(length=16), server_default="normal", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "priority")
@@ -0,0 +1,64 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from loguru import logger
+from sqlalchemy import text
+
+from common.infrastructure.database import get_db
+from common.infrastructure.dependencies import get_outbox_relay_use_case, get_send_to_queue_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    outbox_relay_use_case = get_outbox_relay_use_case()
+
+    # 先建立連線、宣告 queue 並開好 publisher channels, 第一批 outbox entry 不必等待
+    try:
+        await get_send_to_queue_service().connect()
+    except Exception as e:
+        logger.error(f"RabbitMQ warm-up failed, relay will retry on demand: {e}")
+
+    # 同一個 process 內也可以跑多個 relay loop, 靠 SKIP LOCKED 互不重複
+    concurrency = int(os.getenv("OUTBOX_RELAY_CONCURRENCY", "2"))
+    relay_tasks = [asyncio.create_task(outbox_relay_use_case.run()) for _ in range(concurrency)]
+
+    yield
+
+    # Cleanup on shutdown
+    for relay_task in relay_tasks:
+        relay_task.cancel()
+    await get_send_to_queue_service().close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/health")
+async def health_check():
+    send_to_queue_service = get_send_to_queue_service()
+    rabbitmq_status = send_to_queue_service.connection is not None and not send_to_queue_service.connection.is_closed
+
+    try:
+        async for session in get_db():
+            await session.execute(text("SELECT 1"))
+        database_status = True
+    except Exception as e:
+        logger.error(f"Database connection error: {e}")
+        database_status = False
+
+    if not rabbitmq_status or not database_status:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "status": "unhealthy",
+                "rabbitmq_connected": rabbitmq_status,
+                "database_connected": database_status,
+            },
+        )
+    return {
+        "status": "healthy",
+        "rabbitmq_connected": rabbitmq_status,
+        "database_connected": database_status,
+    }
@@ -1,195 +1,352 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import partial
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 
+from common.applications.use_case.consumer.task_handlers import create_default_task_handlers, mock_processing
 from common.applications.use_case.consumer.task_processing import TaskProcessUseCase
-from common.domain.models import Task, TaskStatus
+from common.domain.models import Task, TaskRecord, TaskStatus
 from common.domain.repo.task_repo import ITaskRepository
+from common.domain.services.consume_queue_service import TaskMessage
 from common.domain.services.prometheus_service import IPrometheusMetricsService
-from common.infrastructure.services.task_cancellation_cache import TaskCancellationCache
+from common.domain.services.task_handler import BatchTaskHandler, TaskHandler
+from common.domain.services.task_status_cache import ITaskStatusCache
+from common.infrastructure.services.task_handler_registry import TaskHandlerRegistry
+from common.infrastructure.services.task_result_cache import TaskResultCache
+
+
+def make_task_repo_factory(mock_repo):
+    @asynccontextmanager
+    async def task_repo_factory():
+        yield mock_repo
+
+    return task_repo_factory
+
+
+def make_repo(claimed_tasks=(), cancelled_task_ids=()):
+    """claim_tasks 回傳 claimed_tasks; update_tasks 的 compare-and-set 對 cancelled_task_ids 以外的 task 都成功"""
+    mock_repo = AsyncMock(spec=ITaskRepository)
+    mock_repo.claim_tasks.return_value = list(claimed_tasks)
+    mock_repo.update_tasks.side_effect = lambda tasks, expected_statuses=None: [
+        task.id for task in tasks if task.id not in cancelled_task_ids
+    ]
+    return mock_repo
+
+
+def make_use_case(mock_repo, mock_metrics=None, handlers=None, result_cache=None):
+    handler_registry = TaskHandlerRegistry()
+    for handler in handlers or create_default_task_handlers(sleep_time=0):  # No sleep for testing
+        handler_registry.register(handler)
+
+    return TaskProcessUseCase(
+        task_repo_factory=make_task_repo_factory(mock_repo),
+        metrics=mock_metrics or Mock(spec=IPrometheusMetricsService),
+        status_cache=AsyncMock(spec=ITaskStatusCache),
+        handler_registry=handler_registry,
+        result_cache=result_cache,
+    )
 
 
 class TestTaskProcessUseCase:
 
     @pytest.mark.asyncio
-    async def test_task_processing_when_status_pending(self, mocker):
+    async def test_task_processing_runs_started_task(self, mocker):
         # Arrange
         task_id = 1
-        task = Task(id=task_id, payload="test", status=TaskStatus.PENDING, created_at=datetime.now())
+        task = Task(id=task_id, payload="test", status=TaskStatus.PROCESSING, created_at=datetime.now())
 
-        # Mock the TaskRepository
-        mock_repo = AsyncMock(spec=ITaskRepository)
-        mock_repo.get_task.return_value = task
-        mock_repo.update_task.return_value = None
+        mock_repo = make_repo()
+        mock_metrics = Mock(spec=IPrometheusMetricsService)
+        use_case = make_use_case(mock_repo, mock_metrics)
 
-        # Mock the TaskCancellationCache
-        mock_cancellation_cache = AsyncMock(spec=TaskCancellationCache)
-        mock_cancellation_cache.is_task_cancelled.return_value = False
+        # Act
+        result = await use_case.task_processing(task)
+
+        # Assert: 狀態寫回由 process_batch 整批處理，這裡不碰 database
+        assert result == task_id
+        assert task.status == TaskStatus.PROCESSING
+        mock_repo.update_tasks.assert_not_called()
+        mock_metrics.observe_processing_time.assert_called_once()
 
-        # Mock the PrometheusMetricsService
+    @pytest.mark.asyncio
+    async def test_finish_tasks_resolves_cancellation_with_compare_and_set(self, mocker):
+        # Arrange
+        tasks = [
+            TaskRecord.from_row(5, "test", "PROCESSING", datetime.now()),
+            TaskRecord.from_row(6, "test", "PROCESSING", datetime.now()),
+            TaskRecord.from_row(7, "test", "PROCESSING", datetime.now()),
+        ]
+        # 6 在執行期間被 web_api 取消, database 已經不是 PROCESSING
+        mock_repo = make_repo(cancelled_task_ids={6})
         mock_metrics = Mock(spec=IPrometheusMetricsService)
-        mock_metrics.inc_label.return_value = None
-        mock_metrics.observe_processing_time.return_value = None
-        mock_metrics.observe_execution_time.return_value = None
-
-        # Instantiate the use case with all dependencies
-        use_case = TaskProcessUseCase(
-            task_repository=mock_repo,
-            metrics=mock_metrics,
-            cancellation_cache=mock_cancellation_cache,
-            sleep_time=0,  # No sleep for testing
-        )
+        use_case = make_use_case(mock_repo, mock_metrics)
 
         # Act
-        await use_case.task_processing(task)
+        await use_case.finish_tasks(tasks, failed_task_ids={7})
 
-        # Assert
-        assert task.status == TaskStatus.COMPLETED
-        mock_repo.update_task.assert_any_call(task)
-        mock_metrics.inc_label.assert_any_call("received")
-        mock_metrics.inc_label.assert_any_call("success")
-        mock_metrics.observe_processing_time.assert_called_once()
+        # Assert: 一個 UPDATE 寫回整批，失敗的 7 交還給 queue
+        assert [task.status for task in tasks] == [TaskStatus.COMPLETED, TaskStatus.CANCELED, TaskStatus.PENDING]
+        mock_repo.update_tasks.assert_called_once_with(tasks, expected_statuses=[TaskStatus.PROCESSING])
         mock_metrics.observe_execution_time.assert_called_once()
-        mock_cancellation_cache.is_task_cancelled.assert_called_with(task_id)
+        mock_metrics.inc_label.assert_called_once_with("success")
+        use_case.status_cache.set_statuses.assert_called_once_with(
+            {5: TaskStatus.COMPLETED, 6: TaskStatus.CANCELED, 7: TaskStatus.PENDING}
+        )
 
     @pytest.mark.asyncio
-    async def test_task_processing_with_cancellation_before_processing(self, mocker):
-        # Arrange
-        task_id = 2
-        task = Task(id=task_id, payload="test", status=TaskStatus.PENDING, created_at=datetime.now())
+    async def test_finish_tasks_does_not_overwrite_cancellation_of_failed_task(self, mocker):
+        # Arrange: 8 執行失敗，但執行期間已經被 web_api 取消
+        tasks = [TaskRecord.from_row(8, "test", "PROCESSING", datetime.now())]
+        mock_repo = make_repo(cancelled_task_ids={8})
+        use_case = make_use_case(mock_repo)
 
-        # Mock the TaskRepository
-        mock_repo = AsyncMock(spec=ITaskRepository)
-        mock_repo.get_task.return_value = task
-        mock_repo.update_task.return_value = None
+        # Act
+        await use_case.finish_tasks(tasks, failed_task_ids={8})
 
-        # Mock the TaskCancellationCache to return True (task is cancelled)
-        mock_cancellation_cache = AsyncMock(spec=TaskCancellationCache)
-        mock_cancellation_cache.is_task_cancelled.return_value = True
+        # Assert: projection 跟 database 一樣是 CANCELED, 不會寫回 PENDING
+        assert tasks[0].status == TaskStatus.CANCELED
+        use_case.status_cache.set_statuses.assert_called_once_with({8: TaskStatus.CANCELED})
 
-        # Mock the PrometheusMetricsService
+    @pytest.mark.asyncio
+    async def test_fail_tasks_marks_dead_lettered_tasks_failed(self, mocker):
+        # Arrange: finish_tasks 已經把失敗的 task 改回 PENDING; 8 在重試期間被取消
+        mock_repo = make_repo()
+        mock_repo.transition_tasks.return_value = [7]
         mock_metrics = Mock(spec=IPrometheusMetricsService)
-        mock_metrics.inc_label.return_value = None
-
-        # Instantiate the use case with all dependencies
-        use_case = TaskProcessUseCase(
-            task_repository=mock_repo,
-            metrics=mock_metrics,
-            cancellation_cache=mock_cancellation_cache,
-            sleep_time=0,
-        )
+        use_case = make_use_case(mock_repo, mock_metrics)
 
         # Act
-        await use_case.task_processing(task)
+        await use_case.fail_tasks([7, 8])
 
-        # Assert
-        mock_metrics.inc_label.assert_called_with("received")
-        mock_cancellation_cache.is_task_cancelled.assert_called_with(task_id)
+        # Assert: database 與 projection 都是 FAILED, 不會一直停在 PENDING
+        mock_repo.transition_tasks.assert_called_once_with(
+            [7, 8], TaskStatus.FAILED, expected_statuses=[TaskStatus.PENDING]
+        )
+        mock_metrics.inc_label.assert_called_once_with("failed")
+        use_case.status_cache.set_statuses.assert_called_once_with({7: TaskStatus.FAILED})
 
     @pytest.mark.asyncio
-    async def test_task_processing_when_status_not_pending(self, mocker):
+    async def test_start_tasks_claims_whole_batch_in_one_update(self, mocker):
         # Arrange
-        task_id = 3
-        task = Task(id=task_id, payload="test", status=TaskStatus.PROCESSING)
+        claimed_tasks = [
+            TaskRecord.from_row(1, "test", "PROCESSING", datetime.now(), "default", "high"),
+            TaskRecord.from_row(2, "test", "PROCESSING", datetime.now()),
+        ]
+        mock_repo = make_repo(claimed_tasks)
+        mock_metrics = Mock(spec=IPrometheusMetricsService)
+        use_case = make_use_case(mock_repo, mock_metrics)
+
+        # Act: 3 已取消、4 已完成，不會被 claim
+        started_tasks = await use_case.start_tasks([1, 2, 3, 4])
+
+        # Assert: 不需要另外讀取或寫回
+        assert started_tasks == claimed_tasks
+        mock_repo.claim_tasks.assert_called_once_with([1, 2, 3, 4])
+        mock_repo.get_tasks_by_ids.assert_not_called()
+        mock_repo.update_tasks.assert_not_called()
+        use_case.status_cache.set_statuses.assert_called_once_with({1: TaskStatus.PROCESSING, 2: TaskStatus.PROCESSING})
+        # 開始執行的 task 記錄 queue wait, 依 priority 分開
+        assert [call.args[0] for call in mock_metrics.observe_queue_wait.call_args_list] == ["high", "normal"]
+
+    @pytest.mark.asyncio
+    async def test_start_tasks_skips_status_cache_when_nothing_is_claimed(self, mocker):
+        # Arrange
+        mock_repo = make_repo()
+        use_case = make_use_case(mock_repo)
 
-        # Mock the TaskRepository
-        mock_repo = AsyncMock(spec=ITaskRepository)
-        mock_repo.get_task.return_value = task
-        mock_repo.update_task.return_value = None
+        # Act
+        started_tasks = await use_case.start_tasks([3])
 
-        # Mock the TaskCancellationCache (should not be called)
-        mock_cancellation_cache = AsyncMock(spec=TaskCancellationCache)
+        # Assert
+        assert started_tasks == []
+        mock_repo.update_tasks.assert_not_called()
+        use_case.status_cache.set_statuses.assert_not_called()
 
-        # Mock the PrometheusMetricsService
+    @pytest.mark.asyncio
+    async def test_process_batch_returns_success_task_ids(self, mocker):
+        # Arrange
+        tasks = [
+            Task(id=7, payload="test", status=TaskStatus.PROCESSING, created_at=datetime.now()),
+            Task(id=8, payload="test", status=TaskStatus.PROCESSING, created_at=datetime.now()),
+        ]
+        mock_repo = make_repo(tasks)
         mock_metrics = Mock(spec=IPrometheusMetricsService)
+        use_case = make_use_case(mock_repo, mock_metrics)
 
-        # Instantiate the use case with all dependencies
-        use_case = TaskProcessUseCase(
-            task_repository=mock_repo,
-            metrics=mock_metrics,
-            cancellation_cache=mock_cancellation_cache,
-            sleep_time=0,
+        # Act
+        success_task_ids = await use_case.process_batch(
+            [TaskMessage(task_id=7, payload="test"), TaskMessage(task_id=8, payload="test")]
         )
 
+        # Assert: 一次 claim, 一次寫回最終狀態
+        assert success_task_ids == [7, 8]
+        mock_repo.claim_tasks.assert_called_once_with([7, 8])
+        mock_repo.update_tasks.assert_called_once_with(tasks, expected_statuses=[TaskStatus.PROCESSING])
+        mock_repo.get_tasks_by_ids.assert_not_called()
+        mock_metrics.inc_label.assert_any_call("received")
+        use_case.status_cache.set_statuses.assert_any_call({7: TaskStatus.PROCESSING, 8: TaskStatus.PROCESSING})
+        use_case.status_cache.set_statuses.assert_any_call({7: TaskStatus.COMPLETED, 8: TaskStatus.COMPLETED})
+
+    @pytest.mark.asyncio
+    async def test_process_batch_requeues_failed_tasks_only(self, mocker):
+        # Arrange: 10 已完成，不會被 claim
+        task = TaskRecord.from_row(9, "test", "PROCESSING", datetime.now())
+        mock_repo = make_repo([task])
+        use_case = make_use_case(mock_repo)
+        use_case.task_processing = AsyncMock(side_effect=RuntimeError("handler failed"))
+
         # Act
-        await use_case.task_processing(task)
+        success_task_ids = await use_case.process_batch([TaskMessage(task_id=9), TaskMessage(task_id=10)])
 
-        # Assert
-        assert task.status == TaskStatus.PROCESSING  # Status remains unchanged
-        mock_repo.update_task.assert_not_called()
-        mock_cancellation_cache.is_task_cancelled.assert_not_called()
+        # Assert: 9 執行失敗，改回 PENDING 並 requeue; 10 直接 ack
+        assert success_task_ids == [10]
+        assert task.status == TaskStatus.PENDING
 
     @pytest.mark.asyncio
-    async def test_task_processing_when_status_canceled(self, mocker):
+    @pytest.mark.parametrize("started", [False, True])
+    async def test_cancel_event_interrupts_running_task(self, mocker, started):
         # Arrange
-        task_id = 4
-        task = Task(id=task_id, payload="test", status=TaskStatus.CANCELED)
+        task = TaskRecord.from_row(11, "test", "PROCESSING", datetime.now())
+        mock_repo = make_repo([task])
 
-        # Mock the TaskRepository
-        mock_repo = AsyncMock(spec=ITaskRepository)
-        mock_repo.get_task.return_value = task
-        mock_repo.update_task.return_value = None
+        mock_metrics = Mock(spec=IPrometheusMetricsService)
+        on_interrupted = AsyncMock()
+        slow_handler = TaskHandler(
+            task_type="default",
+            func=partial(mock_processing, sleep_time=10),
+            expected_duration=10,
+            on_interrupted=on_interrupted,
+        )
+        use_case = make_use_case(mock_repo, mock_metrics, handlers=[slow_handler])
 
-        # Mock the TaskCancellationCache (should not be called)
-        mock_cancellation_cache = AsyncMock(spec=TaskCancellationCache)
+        # Act
+        batch = asyncio.create_task(use_case.process_batch([TaskMessage(task_id=11)]))
+        while 11 not in use_case._running:
+            await asyncio.sleep(0)
+        if started:
+            # 讓 task 進入執行中的 sleep; 否則是在開始執行前就被中斷
+            await asyncio.sleep(0)
+        use_case.interrupt_task(11, time.time())
+        success_task_ids = await asyncio.wait_for(batch, timeout=1)
+
+        # Assert: 不必等到 sleep 結束，task 直接標記為 CANCELED 並 ack
+        assert success_task_ids == [11]
+        assert task.status == TaskStatus.CANCELED
+        on_interrupted.assert_awaited_once_with(task)
+        mock_metrics.observe_interruption_latency.assert_called_once()
+        mock_metrics.observe_interruption_time_saved.assert_called_once()
+        mock_metrics.observe_processing_time.assert_not_called()
+        use_case.status_cache.set_statuses.assert_called_with({11: TaskStatus.CANCELED})
+        assert use_case._running == {}
 
-        # Mock the PrometheusMetricsService
+    @pytest.mark.asyncio
+    async def test_start_tasks_ends_tasks_without_handler(self, mocker):
+        # Arrange
+        tasks = [
+            TaskRecord.from_row(12, "test", "PROCESSING", datetime.now(), "checksum"),
+            TaskRecord.from_row(13, "test", "PROCESSING", datetime.now(), "unknown"),
+        ]
+        mock_repo = make_repo(tasks)
         mock_metrics = Mock(spec=IPrometheusMetricsService)
+        use_case = make_use_case(mock_repo, mock_metrics)
 
-        # Instantiate the use case with all dependencies
-        use_case = TaskProcessUseCase(
-            task_repository=mock_repo,
-            metrics=mock_metrics,
-            cancellation_cache=mock_cancellation_cache,
-            sleep_time=0,
-        )
+        # Act
+        started_tasks = await use_case.start_tasks([12, 13])
+
+        # Assert: requeue 也不會成功的 task 直接結束，不會卡在 PROCESSING
+        assert started_tasks == [tasks[0]]
+        assert tasks[1].status == TaskStatus.FAILED
+        mock_repo.update_tasks.assert_called_once_with([tasks[1]], expected_statuses=[TaskStatus.PROCESSING])
+        mock_metrics.inc_label.assert_called_once_with("failed")
+
+    @pytest.mark.asyncio
+    async def test_start_tasks_does_not_fail_task_cancelled_after_claim(self, mocker):
+        # Arrange: 14 沒有 handler, claim 之後被 web_api 取消
+        tasks = [TaskRecord.from_row(14, "test", "PROCESSING", datetime.now(), "unknown")]
+        mock_repo = make_repo(tasks, cancelled_task_ids={14})
+        mock_metrics = Mock(spec=IPrometheusMetricsService)
+        use_case = make_use_case(mock_repo, mock_metrics)
 
         # Act
-        await use_case.task_processing(task)
+        started_tasks = await use_case.start_tasks([14])
 
         # Assert
-        assert task.status == TaskStatus.CANCELED
-        mock_repo.update_task.assert_not_called()
-        mock_cancellation_cache.is_task_cancelled.assert_not_called()
+        assert started_tasks == []
+        assert tasks[0].status == TaskStatus.CANCELED
+        mock_metrics.inc_label.assert_not_called()
+        use_case.status_cache.set_statuses.assert_called_once_with({14: TaskStatus.CANCELED})
 
     @pytest.mark.asyncio
-    async def test_task_processing_with_cancellation_during_processing(self, mocker):
+    async def test_process_batch_routes_batch_handler_per_task_type(self, mocker):
         # Arrange
-        task_id = 6
-        task = Task(id=task_id, payload="test", status=TaskStatus.PENDING, created_at=datetime.now())
+        tasks = [
+            TaskRecord.from_row(21, "a", "PROCESSING", datetime.now(), "bulk"),
+            TaskRecord.from_row(22, "b", "PROCESSING", datetime.now()),
+            TaskRecord.from_row(23, "c", "PROCESSING", datetime.now(), "bulk"),
+            TaskRecord.from_row(24, "d", "PROCESSING", datetime.now(), "bulk"),
+        ]
+        mock_repo = make_repo(tasks)
+        mock_metrics = Mock(spec=IPrometheusMetricsService)
 
-        # Mock the TaskRepository
-        mock_repo = AsyncMock(spec=ITaskRepository)
-        mock_repo.get_task.return_value = task
-        mock_repo.update_task.return_value = None
+        calls = []
 
-        # Mock the TaskCancellationCache to first return False, then True
-        mock_cancellation_cache = AsyncMock(spec=TaskCancellationCache)
-        mock_cancellation_cache.is_task_cancelled.side_effect = [False, True]
+        async def bulk(batch):
+            calls.append([task.id for task in batch])
+            return [None, ValueError("bad payload"), None][: len(batch)]
 
-        # Mock the PrometheusMetricsService
-        mock_metrics = Mock(spec=IPrometheusMetricsService)
-        mock_metrics.inc_label.return_value = None
-        mock_metrics.observe_processing_time.return_value = None
-        mock_metrics.observe_execution_time.return_value = None
-
-        # Instantiate the use case with all dependencies
-        use_case = TaskProcessUseCase(
-            task_repository=mock_repo,
-            metrics=mock_metrics,
-            cancellation_cache=mock_cancellation_cache,
-            sleep_time=0,  # No sleep for testing
+        handlers = [
+            *create_default_task_handlers(sleep_time=0)[:1],
+            BatchTaskHandler(task_type="bulk", func=bulk, max_batch_size=2),
+        ]
+        use_case = make_use_case(mock_repo, mock_metrics, handlers=handlers)
+
+        # Act
+        success_task_ids = await use_case.process_batch([TaskMessage(task_id=task.id) for task in tasks])
+
+        # Assert: 同 type 的 task 依 max_batch_size 分組呼叫，失敗的 23 會被 requeue
+        assert calls == [[21, 23], [24]]
+        assert success_task_ids == [21, 22, 24]
+        assert [task.status for task in tasks] == [
+            TaskStatus.COMPLETED,
+            TaskStatus.COMPLETED,
+            TaskStatus.PENDING,
+            TaskStatus.COMPLETED,
+        ]
+        assert mock_metrics.observe_processing_time.call_count == 3
+        # 狀態寫回仍然是整批一次
+        assert mock_repo.update_tasks.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_identical_payloads_of_memoized_handler_execute_once(self, mocker):
+        # Arrange
+        tasks = [
+            TaskRecord.from_row(31, "same", "PROCESSING", datetime.now(), "pure"),
+            TaskRecord.from_row(32, "same", "PROCESSING", datetime.now(), "pure"),
+            TaskRecord.from_row(33, "other", "PROCESSING", datetime.now(), "pure"),
+        ]
+        mock_repo = make_repo(tasks)
+        calls = []
+
+        async def pure(payload):
+            calls.append(payload)
+            await asyncio.sleep(0.01)
+            return payload.upper()
+
+        redis_client = Mock(get=AsyncMock(return_value=None), set=AsyncMock())
+        use_case = make_use_case(
+            mock_repo,
+            handlers=[TaskHandler(task_type="pure", func=pure, memoize=True)],
+            result_cache=TaskResultCache(redis_client=redis_client),
         )
 
         # Act
-        await use_case.task_processing(task)
+        success_task_ids = await use_case.process_batch([TaskMessage(task_id=task.id) for task in tasks])
 
-        # Assert
-        # Since cancellation_cache returns True during processing, task should not be completed
-        assert task.status == TaskStatus.CANCELED
-        mock_repo.update_task.assert_any_call(task)
-        mock_metrics.inc_label.assert_any_call("received")
-        mock_metrics.observe_processing_time.assert_not_called()
-        mock_metrics.observe_execution_time.assert_not_called()
-        assert mock_cancellation_cache.is_task_cancelled.call_count == 2
+        # Assert: 同時到達的相同 payload 等待同一次執行，每個 task 仍然各自完成
+        assert sorted(calls) == ["other", "same"]
+        assert success_task_ids == [31, 32, 33]
+        assert all(task.status == TaskStatus.COMPLETED for task in tasks)
@@ -0,0 +1,80 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+import pytest
+
+from common.applications.use_case.outbox_relay.outbox_relay import OutboxRelayUseCase
+from common.domain.models import TaskPriority
+from common.domain.repo.task_outbox_repo import ITaskOutboxRepository, OutboxEntry
+from common.domain.services.send_to_queue_service import ISendToQueueService, QueueUnavailableError
+
+
+def make_use_case(mock_outbox_repo, mock_task_queue_service, batch_size=500):
+    @asynccontextmanager
+    async def outbox_repo_factory():
+        yield mock_outbox_repo
+
+    return OutboxRelayUseCase(
+        outbox_repo_factory=outbox_repo_factory,
+        task_queue_service=mock_task_queue_service,
+        batch_size=batch_size,
+    )
+
+
+class TestOutboxRelayUseCase:
+
+    @pytest.mark.asyncio
+    async def test_relay_batch_publishes_and_deletes_entries(self):
+        # Arrange
+        mock_outbox_repo = AsyncMock(spec=ITaskOutboxRepository)
+        mock_outbox_repo.lock_pending.return_value = [
+            OutboxEntry(id=10, task_id=1, payload="payload 1"),
+            OutboxEntry(id=11, task_id=2, payload="payload 2", priority=TaskPriority.HIGH),
+        ]
+        mock_task_queue_service = AsyncMock(spec=ISendToQueueService)
+        use_case = make_use_case(mock_outbox_repo, mock_task_queue_service, batch_size=100)
+
+        # Act
+        relayed = await use_case.relay_batch()
+
+        # Assert
+        assert relayed == 2
+        mock_outbox_repo.lock_pending.assert_called_once_with(100)
+        mock_task_queue_service.send_messages.assert_called_once_with(
+            messages=[
+                {"task_id": 1, "payload": "payload 1", "priority": "normal"},
+                {"task_id": 2, "payload": "payload 2", "priority": "high"},
+            ]
+        )
+        mock_outbox_repo.delete.assert_called_once_with([10, 11])
+
+    @pytest.mark.asyncio
+    async def test_relay_batch_keeps_entries_when_publish_fails(self):
+        # Arrange
+        mock_outbox_repo = AsyncMock(spec=ITaskOutboxRepository)
+        mock_outbox_repo.lock_pending.return_value = [OutboxEntry(id=10, task_id=1, payload="payload 1")]
+        mock_task_queue_service = AsyncMock(spec=ISendToQueueService)
+        mock_task_queue_service.send_messages.side_effect = QueueUnavailableError("RabbitMQ circuit is open")
+        use_case = make_use_case(mock_outbox_repo, mock_task_queue_service)
+
+        # Act & Assert
+        with pytest.raises(QueueUnavailableError):
+            await use_case.relay_batch()
+
+        mock_outbox_repo.delete.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_relay_batch_with_empty_outbox(self):
+        # Arrange
+        mock_outbox_repo = AsyncMock(spec=ITaskOutboxRepository)
+        mock_outbox_repo.lock_pending.return_value = []
+        mock_task_queue_service = AsyncMock(spec=ISendToQueueService)
+        use_case = make_use_case(mock_outbox_repo, mock_task_queue_service)
+
+        # Act
+        relayed = await use_case.relay_batch()
+
+        # Assert
+        assert relayed == 0
+        mock_task_queue_service.send_messages.assert_not_called()
+        mock_outbox_repo.delete.assert_not_called()
@@ -0,0 +1,58 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+import pytest
+
+from common.applications.use_case.web_api.dead_letter import DeadLetterUseCase
+from common.domain.models import TaskStatus
+from common.domain.repo.task_repo import ITaskRepository
+from common.domain.services.dead_letter_queue import IDeadLetterQueueService
+from common.domain.services.task_status_cache import ITaskStatusCache
+
+
+def make_use_case(mock_service, mock_repo, mock_status_cache):
+    @asynccontextmanager
+    async def task_repo_factory():
+        yield mock_repo
+
+    return DeadLetterUseCase(
+        dead_letter_queue_service=mock_service,
+        task_repo_factory=task_repo_factory,
+        status_cache=mock_status_cache,
+    )
+
+
+class TestDeadLetterUseCase:
+
+    @pytest.mark.asyncio
+    async def test_replay_requeues_tasks_and_fails_them_again_if_not_replayed(self):
+        # Arrange: 送出 1, 2 之前改回 PENDING; 2 送不出去，留在 dead-letter queue
+        async def replay(limit, on_replay, on_replay_failed):
+            await on_replay([1, 2])
+            await on_replay_failed([2])
+            return 1
+
+        mock_service = AsyncMock(spec=IDeadLetterQueueService)
+        mock_service.replay.side_effect = replay
+        mock_repo = AsyncMock(spec=ITaskRepository)
+        mock_repo.transition_tasks.side_effect = lambda task_ids, status, expected_statuses: task_ids
+        mock_status_cache = AsyncMock(spec=ITaskStatusCache)
+        use_case = make_use_case(mock_service, mock_repo, mock_status_cache)
+
+        # Act
+        replayed = await use_case.replay_dead_letters(10)
+
+        # Assert
+        assert replayed == 1
+        assert [call.args for call in mock_repo.transition_tasks.call_args_list] == [
+            ([1, 2], TaskStatus.PENDING),
+            ([2], TaskStatus.FAILED),
+        ]
+        assert [call.kwargs for call in mock_repo.transition_tasks.call_args_list] == [
+            {"expected_statuses": [TaskStatus.FAILED]},
+            {"expected_statuses": [TaskStatus.PENDING]},
+        ]
+        assert [call.args[0] for call in mock_status_cache.set_statuses.call_args_list] == [
+            {1: TaskStatus.PENDING, 2: TaskStatus.PENDING},
+            {2: TaskStatus.FAILED},
+        ]
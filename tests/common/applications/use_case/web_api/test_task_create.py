@@ -1,9 +1,14 @@
+import asyncio
+
 import pytest
 
-from common.applications.use_case.web_api.task_create import CreateTaskUseCase
-from common.domain.models import Task, TaskStatus
+from common.applications.use_case.web_api.task_create import CancelTaskUseCase, CreateTaskUseCase
+from common.domain.models import DEFAULT_TASK_TYPE, Task, TaskPriority, TaskStatus
 from common.domain.repo.task_repo import ITaskRepository
-from common.domain.services.send_to_queue_service import ISendToQueueService
+from common.domain.services.idempotency_store import IdempotencyRecord, IIdempotencyStore
+from common.domain.services.task_cancellation_cache import ITaskCancellationCache
+from common.domain.services.task_create_batcher import ITaskCreateBatcher
+from common.domain.services.task_status_cache import ITaskStatusCache
 
 
 class TestCreateTaskUseCase:
@@ -12,8 +17,7 @@ class TestCreateTaskUseCase:
     async def test_create_task_with_valid_payload(self, mocker):
         # Arrange
         mock_task_repo = mocker.Mock(spec=ITaskRepository)
-        mock_task_queue_service = mocker.Mock(spec=ISendToQueueService)
-        use_case = CreateTaskUseCase(mock_task_repo, mock_task_queue_service)
+        use_case = CreateTaskUseCase(mock_task_repo)
         payload = "valid payload"
         expected_task = Task(id=1, payload=payload, status=TaskStatus.PENDING)
 
@@ -24,17 +28,13 @@ class TestCreateTaskUseCase:
 
         # Assert
         assert result == expected_task
-        mock_task_repo.create_task.assert_called_once_with(payload)
-        mock_task_queue_service.send_message.assert_called_once_with(
-            message={"task_id": expected_task.id, "payload": expected_task.payload}
-        )
+        mock_task_repo.create_task.assert_called_once_with(payload, DEFAULT_TASK_TYPE, TaskPriority.NORMAL)
 
     @pytest.mark.asyncio
     async def test_create_task_raises_exception_on_repo_failure(self, mocker):
         # Arrange
         mock_task_repo = mocker.Mock(spec=ITaskRepository)
-        mock_task_queue_service = mocker.Mock(spec=ISendToQueueService)
-        use_case = CreateTaskUseCase(mock_task_repo, mock_task_queue_service)
+        use_case = CreateTaskUseCase(mock_task_repo)
         payload = "valid payload"
 
         mock_task_repo.create_task.side_effect = Exception("Repository failure")
@@ -43,27 +43,186 @@ class TestCreateTaskUseCase:
         with pytest.raises(Exception, match="Repository failure"):
             await use_case.create_task(payload)
 
-        mock_task_repo.create_task.assert_called_once_with(payload)
-        mock_task_queue_service.send_message.assert_not_called()
+        mock_task_repo.create_task.assert_called_once_with(payload, DEFAULT_TASK_TYPE, TaskPriority.NORMAL)
 
     @pytest.mark.asyncio
-    async def test_create_task_handles_queue_exception(self, mocker):
+    async def test_create_tasks_writes_one_batch(self, mocker):
         # Arrange
         mock_task_repo = mocker.Mock(spec=ITaskRepository)
-        mock_task_queue_service = mocker.Mock(spec=ISendToQueueService)
-        use_case = CreateTaskUseCase(mock_task_repo, mock_task_queue_service)
-        payload = "valid payload"
-        expected_task = Task(id=1, payload=payload, status=TaskStatus.PENDING)
+        use_case = CreateTaskUseCase(mock_task_repo)
+        payloads = ["payload 1", "payload 2"]
+        expected_tasks = [
+            Task(id=1, payload="payload 1", status=TaskStatus.PENDING),
+            Task(id=2, payload="payload 2", status=TaskStatus.PENDING),
+        ]
 
-        mock_task_repo.create_task.return_value = expected_task
-        mock_task_queue_service.send_message.side_effect = Exception("Queue error")
+        mock_task_repo.create_tasks.return_value = expected_tasks
+
+        # Act
+        result = await use_case.create_tasks(payloads, priority=TaskPriority.LOW)
+
+        # Assert
+        assert result == expected_tasks
+        mock_task_repo.create_tasks.assert_called_once_with(
+            payloads, [DEFAULT_TASK_TYPE, DEFAULT_TASK_TYPE], [TaskPriority.LOW, TaskPriority.LOW]
+        )
+        mock_task_repo.create_task.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_create_task_goes_through_batcher_when_enabled(self, mocker):
+        # Arrange
+        mock_task_repo = mocker.Mock(spec=ITaskRepository)
+        mock_batcher = mocker.Mock(spec=ITaskCreateBatcher)
+        use_case = CreateTaskUseCase(mock_task_repo, task_create_batcher=mock_batcher)
+        expected_task = Task(id=1, payload="valid payload", status=TaskStatus.PENDING)
+
+        mock_batcher.create_task.return_value = expected_task
+
+        # Act
+        result = await use_case.create_task("valid payload", task_type="report")
+
+        # Assert
+        assert result == expected_task
+        mock_batcher.create_task.assert_called_once_with("valid payload", "report", TaskPriority.NORMAL)
+        mock_task_repo.create_task.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_create_task_with_new_idempotency_key_stores_result(self, mocker):
+        # Arrange
+        mock_task_repo = mocker.Mock(spec=ITaskRepository)
+        mock_store = mocker.Mock(spec=IIdempotencyStore)
+        mock_store.reserve.return_value = None
+        use_case = CreateTaskUseCase(mock_task_repo, idempotency_store=mock_store)
+        mock_task_repo.create_task.return_value = Task(id=1, payload="valid payload", status=TaskStatus.PENDING)
+
+        # Act
+        result = await use_case.create_task("valid payload", idempotency_key="abc")
+
+        # Assert
+        assert result.id == 1
+        key, fingerprint = mock_store.reserve.call_args.args
+        assert key == "abc"
+        mock_store.complete.assert_called_once_with(
+            "abc", fingerprint, IdempotencyRecord(task_id=1, status=TaskStatus.PENDING)
+        )
+
+    @pytest.mark.asyncio
+    async def test_duplicate_idempotency_key_returns_original_task(self, mocker):
+        # Arrange
+        mock_task_repo = mocker.Mock(spec=ITaskRepository)
+        mock_store = mocker.Mock(spec=IIdempotencyStore)
+        mock_store.reserve.return_value = IdempotencyRecord(task_id=1, status=TaskStatus.PENDING)
+        use_case = CreateTaskUseCase(mock_task_repo, idempotency_store=mock_store)
+
+        # Act
+        result = await use_case.create_task("valid payload", idempotency_key="abc")
+
+        # Assert: 不會再寫 database / outbox
+        assert (result.id, result.status) == (1, TaskStatus.PENDING)
+        mock_task_repo.create_task.assert_not_called()
+        mock_store.complete.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_create_releases_idempotency_key(self, mocker):
+        # Arrange
+        mock_task_repo = mocker.Mock(spec=ITaskRepository)
+        mock_store = mocker.Mock(spec=IIdempotencyStore)
+        mock_store.reserve.return_value = None
+        use_case = CreateTaskUseCase(mock_task_repo, idempotency_store=mock_store)
+        mock_task_repo.create_task.side_effect = Exception("Repository failure")
 
         # Act & Assert
-        with pytest.raises(Exception) as exc:
-            await use_case.create_task(payload)
+        with pytest.raises(Exception, match="Repository failure"):
+            await use_case.create_task("valid payload", idempotency_key="abc")
+
+        mock_store.release.assert_called_once_with("abc")
+        mock_store.complete.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_complete_waits_for_in_flight_ttl_refresh(self, mocker):
+        # Arrange: 取消時 keep_reserved 還有一個 EXPIRE 在送出中
+        events = []
+
+        async def keep_reserved(key):
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await asyncio.sleep(0)
+                events.append("expire")
+
+        async def create_task(*args):
+            await asyncio.sleep(0)
+            return Task(id=1, payload="valid payload", status=TaskStatus.PENDING)
+
+        mock_task_repo = mocker.Mock(spec=ITaskRepository)
+        mock_task_repo.create_task.side_effect = create_task
+        mock_store = mocker.Mock(spec=IIdempotencyStore)
+        mock_store.reserve.return_value = None
+        mock_store.keep_reserved = keep_reserved
+        mock_store.complete.side_effect = lambda *args: events.append("complete")
+        use_case = CreateTaskUseCase(mock_task_repo, idempotency_store=mock_store)
+
+        # Act
+        await use_case.create_task("valid payload", idempotency_key="abc")
+
+        # Assert: complete 寫入的 dedup window 不會被之後才到的 EXPIRE 縮短
+        assert events == ["expire", "complete"]
+
+    @pytest.mark.asyncio
+    async def test_failed_complete_still_returns_created_task(self, mocker):
+        # Arrange
+        mock_task_repo = mocker.Mock(spec=ITaskRepository)
+        mock_task_repo.create_task.return_value = Task(id=1, payload="valid payload", status=TaskStatus.PENDING)
+        mock_store = mocker.Mock(spec=IIdempotencyStore)
+        mock_store.reserve.return_value = None
+        mock_store.complete.side_effect = ConnectionError("redis down")
+        use_case = CreateTaskUseCase(mock_task_repo, idempotency_store=mock_store)
+
+        # Act
+        result = await use_case.create_task("valid payload", idempotency_key="abc")
+
+        # Assert: task 已經 commit, 不回 500 讓 client 重試建立重複的 task
+        assert result.id == 1
+        mock_store.release.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_idempotency_fingerprint_depends_on_request_body(self, mocker):
+        # Arrange
+        mock_store = mocker.Mock(spec=IIdempotencyStore)
+        mock_store.reserve.return_value = IdempotencyRecord(task_id=1, status=TaskStatus.PENDING)
+        use_case = CreateTaskUseCase(mocker.Mock(spec=ITaskRepository), idempotency_store=mock_store)
+
+        # Act
+        await use_case.create_task("payload 1", idempotency_key="abc")
+        await use_case.create_task("payload 1", idempotency_key="abc")
+        await use_case.create_task("payload 2", idempotency_key="abc")
+
+        # Assert
+        fingerprints = [call.args[1] for call in mock_store.reserve.call_args_list]
+        assert fingerprints[0] == fingerprints[1] != fingerprints[2]
+
+
+class TestCancelTaskUseCase:
 
-        assert str(exc.value) == "Queue error"
-        mock_task_repo.create_task.assert_called_once_with(payload)
-        mock_task_queue_service.send_message.assert_called_once_with(
-            message={"task_id": expected_task.id, "payload": expected_task.payload}
+    @pytest.mark.asyncio
+    async def test_cancel_task_loses_race_with_completion(self, mocker):
+        # Arrange: 讀取時還是 PROCESSING, 寫入前 consumer 已經把它改成 COMPLETED
+        mock_task_repo = mocker.AsyncMock(spec=ITaskRepository)
+        mock_task_repo.get_task.return_value = Task(id=1, payload="payload", status=TaskStatus.PROCESSING)
+        mock_task_repo.update_tasks.return_value = []
+        mock_cancellation_cache = mocker.AsyncMock(spec=ITaskCancellationCache)
+        use_case = CancelTaskUseCase(
+            task_repo=mock_task_repo,
+            cancellation_cache=mock_cancellation_cache,
+            status_cache=mocker.AsyncMock(spec=ITaskStatusCache),
         )
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            await use_case.cancel_task(1)
+
+        assert mock_task_repo.update_tasks.call_args.kwargs["expected_statuses"] == [
+            TaskStatus.PENDING,
+            TaskStatus.PROCESSING,
+        ]
+        mock_cancellation_cache.set_task_cancelled.assert_not_called()
@@ -0,0 +1,135 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.applications.use_case.web_api.task_status import BatchTaskStatusUseCase, WatchTaskStatusUseCase
+from common.domain.models import Task, TaskStatus
+from common.domain.repo.task_repo import ITaskRepository, TaskNotFoundError
+from common.domain.services.prometheus_service import IPrometheusMetricsService
+from common.domain.services.task_status_cache import ITaskStatusCache
+from common.domain.services.task_status_notifier import ITaskStatusNotifier
+
+
+class FakeTaskStatusNotifier(ITaskStatusNotifier):
+    def __init__(self, events: list[tuple[int, TaskStatus]]):
+        self.events = events
+
+    @asynccontextmanager
+    async def subscribe(self, task_ids):
+        queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        yield queue
+
+
+def make_use_case(mock_task_repo, mock_status_cache, events):
+    @asynccontextmanager
+    async def task_repo_factory():
+        yield mock_task_repo
+
+    return WatchTaskStatusUseCase(
+        task_repo_factory=task_repo_factory,
+        status_cache=mock_status_cache,
+        status_notifier=FakeTaskStatusNotifier(events),
+    )
+
+
+class TestWatchTaskStatusUseCase:
+
+    @pytest.mark.asyncio
+    async def test_wait_for_task_returns_when_task_finishes(self):
+        # Arrange
+        mock_status_cache = AsyncMock(spec=ITaskStatusCache)
+        mock_status_cache.get_status.return_value = TaskStatus.PENDING
+        use_case = make_use_case(
+            AsyncMock(spec=ITaskRepository),
+            mock_status_cache,
+            events=[(1, TaskStatus.PROCESSING), (1, TaskStatus.COMPLETED)],
+        )
+
+        # Act
+        status = await use_case.wait_for_task(1, timeout=1)
+
+        # Assert
+        assert status == TaskStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_wait_for_task_returns_when_task_fails(self):
+        # Arrange
+        mock_status_cache = AsyncMock(spec=ITaskStatusCache)
+        mock_status_cache.get_status.return_value = TaskStatus.PENDING
+        use_case = make_use_case(AsyncMock(spec=ITaskRepository), mock_status_cache, events=[(1, TaskStatus.FAILED)])
+
+        # Act
+        status = await use_case.wait_for_task(1, timeout=1)
+
+        # Assert
+        assert status == TaskStatus.FAILED
+
+    @pytest.mark.asyncio
+    async def test_wait_for_task_returns_current_status_on_timeout(self):
+        # Arrange
+        mock_task_repo = AsyncMock(spec=ITaskRepository)
+        mock_task_repo.get_task.return_value = Task(id=1, payload="test", status=TaskStatus.PENDING)
+        mock_status_cache = AsyncMock(spec=ITaskStatusCache)
+        mock_status_cache.get_status.return_value = None
+        use_case = make_use_case(mock_task_repo, mock_status_cache, events=[(1, TaskStatus.PROCESSING)])
+
+        # Act
+        status = await use_case.wait_for_task(1, timeout=0.01)
+
+        # Assert
+        assert status == TaskStatus.PROCESSING
+        mock_task_repo.get_task.assert_called_once_with(1)
+
+    @pytest.mark.asyncio
+    async def test_stream_task_statuses_until_all_finished(self):
+        # Arrange
+        mock_task_repo = AsyncMock(spec=ITaskRepository)
+        mock_task_repo.get_task.side_effect = TaskNotFoundError(task_id=3)
+        mock_status_cache = AsyncMock(spec=ITaskStatusCache)
+        mock_status_cache.get_status.side_effect = [TaskStatus.COMPLETED, TaskStatus.PROCESSING, None]
+        use_case = make_use_case(mock_task_repo, mock_status_cache, events=[(2, TaskStatus.CANCELED)])
+
+        # Act
+        events = [event async for event in use_case.stream_task_statuses([1, 2, 3], timeout=1)]
+
+        # Assert
+        assert events == [
+            (1, TaskStatus.COMPLETED),
+            (2, TaskStatus.PROCESSING),
+            (2, TaskStatus.CANCELED),
+        ]
+
+
+class TestBatchTaskStatusUseCase:
+
+    @pytest.mark.asyncio
+    async def test_iter_task_statuses_deduplicates_ids_and_records_size(self):
+        # Arrange
+        requested_task_ids = []
+
+        async def iter_task_statuses(task_ids):
+            requested_task_ids.extend(task_ids)
+            for task_id in task_ids:
+                yield task_id, TaskStatus.PENDING
+
+        mock_task_repo = Mock(spec=ITaskRepository)
+        mock_task_repo.iter_task_statuses = iter_task_statuses
+
+        @asynccontextmanager
+        async def task_repo_factory():
+            yield mock_task_repo
+
+        mock_metrics = Mock(spec=IPrometheusMetricsService)
+        use_case = BatchTaskStatusUseCase(task_repo_factory=task_repo_factory, metrics=mock_metrics)
+
+        # Act
+        statuses = [item async for item in use_case.iter_task_statuses([3, 1, 3, 2])]
+
+        # Assert
+        assert requested_task_ids == [3, 1, 2]
+        assert statuses == [(3, TaskStatus.PENDING), (1, TaskStatus.PENDING), (2, TaskStatus.PENDING)]
+        mock_metrics.observe_status_batch_size.assert_called_once_with(3)
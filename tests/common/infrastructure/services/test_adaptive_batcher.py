@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from common.infrastructure.services.adaptive_batcher import AdaptiveBatcher
+
+
+class TestAdaptiveBatcher:
+
+    @pytest.mark.asyncio
+    async def test_flushes_partial_batch_on_timer_without_new_messages(self):
+        # Arrange
+        batcher = AdaptiveBatcher(initial_batch_size=32, batch_timeout=0.01)
+        for i in range(5):
+            await batcher.put(i)
+
+        # Act
+        batch = await asyncio.wait_for(batcher.next_batch(), timeout=1)
+
+        # Assert
+        assert batch == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_flushes_immediately_when_batch_is_full(self):
+        # Arrange
+        batcher = AdaptiveBatcher(initial_batch_size=2, batch_timeout=10)
+        for i in range(3):
+            await batcher.put(i)
+
+        # Act
+        batch = await asyncio.wait_for(batcher.next_batch(), timeout=1)
+
+        # Assert
+        assert batch == [0, 1]
+
+    def test_grows_under_backlog_and_shrinks_when_idle(self):
+        batcher = AdaptiveBatcher(min_batch_size=1, max_batch_size=128, initial_batch_size=32)
+
+        batcher.queue_depth = 1000
+        batcher.record_batch(size=32, latency=0.1)
+        assert batcher.batch_size == 64
+        assert batcher.prefetch_count == 128
+
+        batcher.queue_depth = 0
+        batcher.record_batch(size=3, latency=0.1)
+        assert batcher.batch_size == 32
+        batcher.record_batch(size=1, latency=0.1)
+        assert batcher.batch_size == 16
+
+    def test_shrinks_when_processing_is_slower_than_target(self):
+        batcher = AdaptiveBatcher(min_batch_size=8, initial_batch_size=32, target_latency=1.0)
+        batcher.queue_depth = 1000
+
+        batcher.record_batch(size=32, latency=2.0)
+        assert batcher.batch_size == 16
+        batcher.record_batch(size=16, latency=2.0)
+        batcher.record_batch(size=8, latency=2.0)
+        assert batcher.batch_size == 8
@@ -0,0 +1,158 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.domain.models import TaskPriority
+from common.domain.services.message_codec import ATTEMPT_HEADER, TASK_ID_HEADER
+from common.infrastructure.services.adaptive_batcher import AdaptiveBatcher
+from common.infrastructure.services.consume_queue_service import ConsumeQueueService
+from common.infrastructure.services.retry_scheduler import RetryScheduler
+
+CHANNEL = Mock(is_closed=False)
+
+
+def make_message(task_id: int, acked: list, routing_key: str = "task_queue"):
+    message = Mock(
+        delivery_tag=task_id,
+        body=json.dumps({"task_id": task_id}).encode(),
+        headers={},
+        routing_key=routing_key,
+        channel=CHANNEL,
+    )
+    message.content_type = "application/json"
+    message.ack = AsyncMock(side_effect=lambda multiple=False: acked.append(task_id))
+    message.nack = AsyncMock()
+    message.reject = AsyncMock()
+    return message
+
+
+class TestConsumeQueueService:
+
+    @pytest.mark.asyncio
+    async def test_slow_batch_does_not_block_next_batch(self):
+        # Arrange
+        acked = []
+        service = ConsumeQueueService(
+            batcher=AdaptiveBatcher(min_batch_size=1, initial_batch_size=1, batch_timeout=0.01),
+            max_in_flight_batches=2,
+        )
+        service.channel = AsyncMock()
+        release_slow_batch = asyncio.Event()
+
+        async def handler(task_messages):
+            if task_messages[0].task_id == 1:
+                await release_slow_batch.wait()
+            return [message.task_id for message in task_messages]
+
+        for task_id in (1, 2):
+            await service._on_message(make_message(task_id, acked))
+
+        # Act
+        runner = asyncio.create_task(service._run_batches(handler))
+        for _ in range(50):
+            if acked:
+                break
+            await asyncio.sleep(0.01)
+
+        # Assert: 第二個 batch 在第一個還沒完成前就已經 settle
+        assert acked == [2]
+
+        release_slow_batch.set()
+        for _ in range(50):
+            if len(acked) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert acked == [2, 1]
+        assert service.settler.outstanding == 0
+
+        runner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await runner
+
+    @pytest.mark.asyncio
+    async def test_high_priority_messages_skip_low_priority_backlog(self):
+        # Arrange
+        service = ConsumeQueueService(
+            batcher=AdaptiveBatcher(min_batch_size=4, initial_batch_size=4, batch_timeout=0.01),
+            priority_weights={TaskPriority.HIGH: 3, TaskPriority.NORMAL: 2, TaskPriority.LOW: 1},
+        )
+        for task_id in range(1, 11):
+            await service._on_message(make_message(task_id, [], routing_key="task_queue.low"))
+        await service._on_message(make_message(11, [], routing_key="task_queue.high"))
+        await service._on_message(make_message(12, [], routing_key="task_queue.high"))
+
+        # Act
+        batch = await service.batcher.next_batch()
+
+        # Assert: 先到的 backfill 不會擋住 high, 但 low 仍然拿到自己的份額
+        assert [message.delivery_tag for message in batch] == [11, 12, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_failed_task_is_scheduled_for_retry_instead_of_requeued(self):
+        # Arrange
+        acked = []
+        service = ConsumeQueueService(batcher=AdaptiveBatcher(min_batch_size=1, initial_batch_size=2))
+        service.channel = AsyncMock()
+        service.retry_scheduler = Mock(
+            schedule_retries=AsyncMock(side_effect=lambda messages: (messages, [])),
+            dead_letter=AsyncMock(return_value=([], [])),
+        )
+        messages = [make_message(task_id, acked) for task_id in (1, 2)]
+        for message in messages:
+            service.settler.track(message)
+
+        async def handler(task_messages):
+            return [1]
+
+        # Act
+        await service._handle_batch(messages, handler)
+
+        # Assert: 失敗的 task 已送進延遲 queue, 原本的 message 直接 ack 而不是 requeue
+        service.retry_scheduler.schedule_retries.assert_awaited_once_with([messages[1]])
+        assert service.settler.outstanding == 0
+        for message in messages:
+            message.nack.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_dead_lettered_tasks_are_passed_to_dead_letter_handler(self):
+        # Arrange: 1 成功, 2 最後一次重試仍失敗, 3 還有重試次數, 4 沒有 task_id header 也無法解析
+        service = ConsumeQueueService(retry_scheduler=RetryScheduler(delays=(1.0,)))
+        service.retry_scheduler.channel = Mock(is_closed=False)
+        service.retry_scheduler.channel.default_exchange.publish = AsyncMock()
+        service.retry_scheduler._delay_exchanges = [Mock(publish=AsyncMock())]
+        messages = [make_message(task_id, []) for task_id in (1, 2, 3, 4)]
+        messages[1].headers = {ATTEMPT_HEADER: 1}
+        messages[3].body = b"not json"
+        for message in messages:
+            service.settler.track(message)
+        dead_letter_handler = AsyncMock()
+
+        async def handler(task_messages):
+            return [1]
+
+        # Act
+        await service._handle_batch(messages, handler, dead_letter_handler)
+
+        # Assert: 送進 dead-letter queue 的 task 交給 handler 結束狀態，其餘照常 ack
+        dead_letter_handler.assert_awaited_once_with([2])
+        assert service.retry_scheduler.channel.default_exchange.publish.await_count == 2
+        assert service.settler.outstanding == 0
+
+    def test_decode_batch_uses_task_id_header_without_decoding_body(self):
+        # Arrange: 1 帶 header, 2 是沒有 header 的舊 message
+        decoder = Mock()
+        decoder.decode.return_value = {"task_id": 2, "payload": "legacy"}
+        service = ConsumeQueueService(decoder=decoder)
+        messages = [make_message(1, []), make_message(2, [])]
+        messages[0].headers = {TASK_ID_HEADER: 1}
+
+        # Act
+        deliveries, task_messages, undecodable = service._decode_batch(messages)
+
+        # Assert: 只有沒有 header 的 message 需要 decode body
+        assert [task_id for _, task_id in deliveries] == [1, 2]
+        assert [task_message.task_id for task_message in task_messages] == [1, 2]
+        assert undecodable == []
+        decoder.decode.assert_called_once_with(messages[1].body, "application/json")
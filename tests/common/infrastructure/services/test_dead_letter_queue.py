@@ -0,0 +1,65 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.domain.services.message_codec import ATTEMPT_HEADER, ORIGINAL_QUEUE_HEADER, TASK_ID_HEADER
+from common.infrastructure.services.dead_letter_queue import DeadLetterQueueService
+
+
+def make_dead_letter(task_id: int):
+    message = Mock(
+        delivery_tag=task_id,
+        body=b"{}",
+        headers={TASK_ID_HEADER: task_id, ATTEMPT_HEADER: 6, ORIGINAL_QUEUE_HEADER: "task_queue.high"},
+        ack=AsyncMock(),
+        nack=AsyncMock(),
+    )
+    message.content_type = "application/json"
+    return message
+
+
+class TestDeadLetterQueueService:
+
+    @pytest.mark.asyncio
+    async def test_replay_requeues_tasks_before_publishing(self):
+        # Arrange: 2 送不出去
+        service = DeadLetterQueueService()
+        messages = [make_dead_letter(1), make_dead_letter(2)]
+        service._get_messages = AsyncMock(return_value=messages)
+        calls = []
+
+        async def publish(message, routing_key, timeout):
+            calls.append(("publish", message.headers[TASK_ID_HEADER]))
+            if message.headers[TASK_ID_HEADER] == 2:
+                raise ConnectionError("broker down")
+
+        service.channel = Mock(default_exchange=Mock(publish=publish))
+
+        async def on_replay(task_ids):
+            calls.append(("on_replay", task_ids))
+
+        async def on_replay_failed(task_ids):
+            calls.append(("on_replay_failed", task_ids))
+
+        # Act
+        replayed = await service.replay(10, on_replay=on_replay, on_replay_failed=on_replay_failed)
+
+        # Assert: task 先改回 PENDING 才送出; 送不出去的 dead letter 放回 queue, task 再改回 FAILED
+        assert replayed == 1
+        assert calls == [("on_replay", [1, 2]), ("publish", 1), ("publish", 2), ("on_replay_failed", [2])]
+        messages[0].ack.assert_awaited_once()
+        messages[1].nack.assert_awaited_once_with(requeue=True)
+
+    @pytest.mark.asyncio
+    async def test_replay_returns_dead_letters_when_requeue_fails(self):
+        # Arrange
+        service = DeadLetterQueueService()
+        messages = [make_dead_letter(1)]
+        service._get_messages = AsyncMock(return_value=messages)
+        service.channel = Mock(default_exchange=Mock(publish=AsyncMock()))
+
+        # Act & Assert: database 寫不進去時不送出，dead letter 留在 queue
+        with pytest.raises(ConnectionError):
+            await service.replay(10, on_replay=AsyncMock(side_effect=ConnectionError("db down")))
+        service.channel.default_exchange.publish.assert_not_awaited()
+        messages[0].nack.assert_awaited_once_with(requeue=True)
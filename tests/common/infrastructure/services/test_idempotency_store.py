@@ -0,0 +1,101 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.domain.models import TaskStatus
+from common.domain.services.idempotency_store import (
+    IdempotencyKeyInProgressError,
+    IdempotencyKeyMismatchError,
+    IdempotencyRecord,
+)
+from common.infrastructure.services.idempotency_store import IdempotencyStore
+
+PENDING = json.dumps({"fingerprint": "f1"}).encode()
+
+
+class TestIdempotencyStore:
+
+    @pytest.mark.asyncio
+    async def test_first_request_reserves_key(self):
+        # Arrange
+        redis_client = Mock(set=AsyncMock(return_value=True), get=AsyncMock())
+        store = IdempotencyStore(redis_client=redis_client, pending_ttl=30)
+
+        # Act
+        record = await store.reserve("abc", "f1")
+
+        # Assert
+        assert record is None
+        redis_client.set.assert_awaited_once_with("idempotency:abc", PENDING.decode(), ex=30, nx=True)
+        redis_client.get.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_duplicate_waits_for_original_result(self):
+        # Arrange: 第一次讀到 pending, 第二次讀到完成的結果
+        redis_client = Mock(
+            set=AsyncMock(return_value=False),
+            get=AsyncMock(
+                side_effect=[PENDING, json.dumps({"fingerprint": "f1", "task_id": 7, "status": "PENDING"}).encode()]
+            ),
+        )
+        store = IdempotencyStore(redis_client=redis_client, poll_interval=0)
+
+        # Act
+        record = await store.reserve("abc", "f1")
+
+        # Assert
+        assert record == IdempotencyRecord(task_id=7, status=TaskStatus.PENDING)
+
+    @pytest.mark.asyncio
+    async def test_same_key_with_different_request_is_rejected(self):
+        # Arrange
+        redis_client = Mock(
+            set=AsyncMock(return_value=False),
+            get=AsyncMock(return_value=json.dumps({"fingerprint": "f1", "task_id": 7, "status": "PENDING"})),
+        )
+        store = IdempotencyStore(redis_client=redis_client)
+
+        # Act & Assert
+        with pytest.raises(IdempotencyKeyMismatchError):
+            await store.reserve("abc", "f2")
+
+    @pytest.mark.asyncio
+    async def test_duplicate_times_out_while_original_in_progress(self):
+        # Arrange
+        redis_client = Mock(set=AsyncMock(return_value=False), get=AsyncMock(return_value=PENDING))
+        store = IdempotencyStore(redis_client=redis_client, wait_timeout=0, poll_interval=0)
+
+        # Act & Assert
+        with pytest.raises(IdempotencyKeyInProgressError):
+            await store.reserve("abc", "f1")
+
+    @pytest.mark.asyncio
+    async def test_keep_reserved_extends_pending_ttl(self):
+        # Arrange
+        redis_client = Mock(expire=AsyncMock())
+        store = IdempotencyStore(redis_client=redis_client, pending_ttl=0.03)
+
+        # Act
+        keep_reserved = asyncio.create_task(store.keep_reserved("abc"))
+        await asyncio.sleep(0.05)
+        keep_reserved.cancel()
+
+        # Assert: 建立比 pending_ttl 慢時，保留不會過期
+        assert redis_client.expire.await_count >= 2
+        redis_client.expire.assert_awaited_with("idempotency:abc", 0.03)
+
+    @pytest.mark.asyncio
+    async def test_complete_keeps_result_for_window(self):
+        # Arrange
+        redis_client = Mock(set=AsyncMock())
+        store = IdempotencyStore(redis_client=redis_client, window=600)
+
+        # Act
+        await store.complete("abc", "f1", IdempotencyRecord(task_id=7, status=TaskStatus.PENDING))
+
+        # Assert
+        redis_client.set.assert_awaited_once_with(
+            "idempotency:abc", json.dumps({"fingerprint": "f1", "task_id": 7, "status": "PENDING"}), ex=600
+        )
@@ -0,0 +1,34 @@
+import pytest
+
+from common.infrastructure.services.message_codec import (
+    MESSAGE_CODECS,
+    ContentTypeMessageDecoder,
+    JsonMessageCodec,
+    create_message_codec,
+)
+
+
+@pytest.mark.parametrize("name", sorted(MESSAGE_CODECS))
+def test_codec_round_trip(name):
+    try:
+        codec = create_message_codec(name)
+    except RuntimeError:
+        pytest.skip(f"{name} is not installed")
+    message = {"task_id": 1, "payload": "測試 payload"}
+
+    assert codec.decode(codec.encode(message)) == message
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        create_message_codec("xml")
+
+
+def test_decoder_falls_back_to_json_for_legacy_messages():
+    try:
+        decoder = ContentTypeMessageDecoder(create_message_codec("msgpack"))
+    except RuntimeError:
+        pytest.skip("msgpack is not installed")
+    body = JsonMessageCodec().encode({"task_id": 1})
+
+    assert decoder.decode(body, "application/json") == {"task_id": 1}
@@ -0,0 +1,103 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.infrastructure.services.message_settler import MessageSettler
+
+CHANNEL = Mock(is_closed=False)
+
+
+def make_message(delivery_tag: int, calls: list, channel=CHANNEL):
+    message = Mock(delivery_tag=delivery_tag, channel=channel)
+    message.ack = AsyncMock(side_effect=lambda multiple=False: calls.append(("ack", channel, delivery_tag, multiple)))
+    message.nack = AsyncMock(side_effect=lambda requeue: calls.append(("nack", channel, delivery_tag, requeue)))
+    message.reject = AsyncMock(side_effect=lambda requeue: calls.append(("reject", channel, delivery_tag, requeue)))
+    return message
+
+
+class TestMessageSettler:
+
+    @pytest.mark.asyncio
+    async def test_contiguous_acks_become_one_multiple_ack(self):
+        # Arrange
+        calls = []
+        settler = MessageSettler()
+        messages = [make_message(tag, calls) for tag in range(1, 6)]
+        for message in messages:
+            settler.track(message)
+
+        # Act
+        await settler.settle(acks=[messages[0], messages[1], messages[3]], nacks=[messages[2]])
+
+        # Assert: tag 3 先 nack, 剩下的 1, 2, 4 在 outstanding 中是連續的
+        assert calls == [
+            ("nack", CHANNEL, 3, True),
+            ("ack", CHANNEL, 4, True),
+        ]
+        assert settler.outstanding == 1
+
+    @pytest.mark.asyncio
+    async def test_does_not_multiple_ack_over_other_outstanding_messages(self):
+        # Arrange
+        calls = []
+        settler = MessageSettler()
+        messages = [make_message(tag, calls) for tag in range(1, 5)]
+        for message in messages:
+            settler.track(message)
+
+        # Act: tag 1 屬於另一個還在處理中的 batch
+        await settler.settle(acks=messages[1:])
+
+        # Assert
+        assert sorted(call[2:] for call in calls) == [(2, False), (3, False), (4, False)]
+
+        # Act: tag 1 完成後，就是最小的 outstanding tag
+        await settler.settle(acks=[messages[0]])
+
+        # Assert
+        assert calls[-1] == ("ack", CHANNEL, 1, True)
+        assert settler.outstanding == 0
+
+    @pytest.mark.asyncio
+    async def test_rejects_are_sent_without_requeue(self):
+        # Arrange
+        calls = []
+        settler = MessageSettler()
+        message = make_message(1, calls)
+        settler.track(message)
+
+        # Act
+        await settler.settle(rejects=[message])
+
+        # Assert
+        assert calls == [("reject", CHANNEL, 1, False)]
+        assert settler.outstanding == 0
+
+    @pytest.mark.asyncio
+    async def test_reconnect_does_not_mix_delivery_tags_of_old_channel(self):
+        # Arrange: 舊 channel 上 tag 1 還沒 settle 就斷線，新 channel 的 tag 又從 1 開始
+        calls = []
+        settler = MessageSettler()
+        old_channel, new_channel = Mock(is_closed=False), Mock(is_closed=False)
+        stale = make_message(1, calls, channel=old_channel)
+        settler.track(stale)
+        old_channel.is_closed = True
+        messages = [make_message(tag, calls, channel=new_channel) for tag in (1, 2, 3)]
+        for message in messages:
+            settler.track(message)
+
+        # Act
+        await settler.settle(acks=messages[:2])
+
+        # Assert: 新 channel 上只 multiple ack 到 tag 2, tag 3 與舊 channel 的 message 都沒有被 ack
+        assert calls == [("ack", new_channel, 2, True)]
+        stale.ack.assert_not_awaited()
+        assert settler.outstanding == 2
+
+        # Act: channel 重新開啟後不再追蹤舊 channel 的 message
+        settler.discard_closed_channels()
+        await settler.settle(acks=[messages[2]])
+
+        # Assert
+        assert calls[-1] == ("ack", new_channel, 3, True)
+        assert settler.outstanding == 0
@@ -0,0 +1,82 @@
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.domain.services.message_codec import (
+    ATTEMPT_HEADER,
+    DEAD_LETTER_REASON_HEADER,
+    ORIGINAL_QUEUE_HEADER,
+    TASK_ID_HEADER,
+)
+from common.infrastructure.services.retry_scheduler import RetryScheduler
+
+
+def make_message(task_id: int, attempts: int = 0, routing_key: str = "task_queue.high"):
+    headers = {TASK_ID_HEADER: task_id, "x-death": [{"count": 1}]}
+    if attempts:
+        headers[ATTEMPT_HEADER] = attempts
+    message = Mock(
+        delivery_tag=task_id,
+        body=json.dumps({"task_id": task_id}).encode(),
+        headers=headers,
+        routing_key=routing_key,
+    )
+    message.content_type = "application/json"
+    return message
+
+
+def make_scheduler(delays=(1.0, 4.0)):
+    scheduler = RetryScheduler(delays=delays)
+    scheduler.channel = Mock(is_closed=False)
+    scheduler.channel.default_exchange.publish = AsyncMock()
+    scheduler._delay_exchanges = [Mock(publish=AsyncMock()) for _ in delays]
+    return scheduler
+
+
+class TestRetryScheduler:
+
+    @pytest.mark.asyncio
+    async def test_failed_message_goes_to_delay_tier_by_attempt(self):
+        # Arrange
+        scheduler = make_scheduler()
+
+        # Act
+        published, failed = await scheduler.schedule_retries([make_message(1, attempts=1)])
+
+        # Assert: 第二次失敗進第二個 tier, routing key 保留原本的 priority queue
+        assert [message.delivery_tag for message in published] == [1]
+        assert failed == []
+        scheduler._delay_exchanges[0].publish.assert_not_awaited()
+        retry, kwargs = scheduler._delay_exchanges[1].publish.await_args
+        assert retry[0].headers == {TASK_ID_HEADER: 1, ATTEMPT_HEADER: 2}
+        assert kwargs["routing_key"] == "task_queue.high"
+
+    @pytest.mark.asyncio
+    async def test_message_is_dead_lettered_after_last_tier(self):
+        # Arrange
+        scheduler = make_scheduler()
+
+        # Act
+        published, failed = await scheduler.schedule_retries([make_message(1, attempts=2)], reason="boom")
+
+        # Assert
+        assert len(published) == 1
+        dead_letter, kwargs = scheduler.channel.default_exchange.publish.await_args
+        assert kwargs["routing_key"] == "task_queue.dead"
+        assert dead_letter[0].headers[ATTEMPT_HEADER] == 3
+        assert dead_letter[0].headers[ORIGINAL_QUEUE_HEADER] == "task_queue.high"
+        assert dead_letter[0].headers[DEAD_LETTER_REASON_HEADER] == "boom"
+
+    @pytest.mark.asyncio
+    async def test_publish_failure_returns_message_to_caller(self):
+        # Arrange
+        scheduler = make_scheduler()
+        scheduler._delay_exchanges[0].publish.side_effect = ConnectionError("broker down")
+
+        # Act
+        published, failed = await scheduler.schedule_retries([make_message(1)])
+
+        # Assert: 呼叫端會退回 nack(requeue=True), message 不會遺失
+        assert published == []
+        assert [message.delivery_tag for message in failed] == [1]
@@ -0,0 +1,124 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.domain.services.send_to_queue_service import QueueUnavailableError
+from common.infrastructure.services.circuit_breaker import CircuitBreaker, CircuitState
+from common.infrastructure.services.send_to_queue_service import SendToQueueService
+
+
+def make_channel(publish=None, is_closed=False):
+    channel = Mock(is_closed=is_closed)
+    channel.default_exchange.publish = publish or AsyncMock()
+    return channel
+
+
+def make_service(channels, **kwargs):
+    service = SendToQueueService(**kwargs)
+    # 已連線，connect() 直接返回
+    service.connection = Mock(is_closed=False)
+    service.channels = channels
+    return service
+
+
+class TestSendToQueueService:
+
+    @pytest.mark.asyncio
+    async def test_publishes_round_robin_and_skips_closed_channels(self):
+        # Arrange
+        channels = [make_channel(), make_channel(is_closed=True), make_channel()]
+        service = make_service(channels, publish_timeout=3)
+
+        # Act
+        await service.send_messages([{"task_id": task_id} for task_id in range(4)])
+
+        # Assert
+        assert channels[0].default_exchange.publish.await_count == 2
+        assert channels[1].default_exchange.publish.await_count == 0
+        assert channels[2].default_exchange.publish.await_count == 2
+        _, kwargs = channels[0].default_exchange.publish.await_args
+        assert kwargs["routing_key"] == "task_queue"
+        assert kwargs["timeout"] == 3
+
+    @pytest.mark.asyncio
+    async def test_all_channels_closed_raises_queue_unavailable(self):
+        service = make_service([make_channel(is_closed=True)])
+
+        with pytest.raises(QueueUnavailableError):
+            await service.send_message({"task_id": 1})
+        assert service.circuit_breaker.failures == 1
+
+    @pytest.mark.asyncio
+    async def test_in_flight_window_limits_unconfirmed_publishes(self):
+        # Arrange
+        release = asyncio.Event()
+        in_flight = []
+        max_in_flight = []
+
+        async def publish(message, routing_key, timeout):
+            in_flight.append(message)
+            max_in_flight.append(len(in_flight))
+            await release.wait()
+            in_flight.remove(message)
+
+        service = make_service([make_channel(publish=publish)], max_in_flight=2)
+
+        # Act
+        sending = asyncio.create_task(service.send_messages([{"task_id": task_id} for task_id in range(5)]))
+        await asyncio.sleep(0.01)
+        blocked = len(in_flight)
+        release.set()
+        await sending
+
+        # Assert
+        assert blocked == 2
+        assert max(max_in_flight) == 2
+
+    @pytest.mark.asyncio
+    async def test_publish_timeout_records_failure(self):
+        # Arrange
+        publish = AsyncMock(side_effect=asyncio.TimeoutError())
+        service = make_service(
+            [make_channel(publish=publish)], circuit_breaker=CircuitBreaker(name="test", failure_threshold=1)
+        )
+
+        # Act & Assert
+        with pytest.raises(QueueUnavailableError):
+            await service.send_message({"task_id": 1})
+        assert service.circuit_breaker.state == CircuitState.OPEN
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self):
+        publish = AsyncMock()
+        breaker = CircuitBreaker(name="test", failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        service = make_service([make_channel(publish=publish)], circuit_breaker=breaker)
+
+        with pytest.raises(QueueUnavailableError):
+            await service.send_message({"task_id": 1})
+        publish.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_half_open_trial_does_not_wedge_breaker(self):
+        # Arrange: circuit 已經可以試探
+        started = asyncio.Event()
+
+        async def publish(message, routing_key, timeout):
+            started.set()
+            await asyncio.sleep(10)
+
+        breaker = CircuitBreaker(name="test", failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        service = make_service([make_channel(publish=publish)], circuit_breaker=breaker)
+
+        # Act: 試探中的 publish 被取消 (例如 client 斷線)
+        trial = asyncio.create_task(service.send_message({"task_id": 1}))
+        await started.wait()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        # Assert: 下一個呼叫仍然可以試探
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.allow_request()
@@ -0,0 +1,35 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.infrastructure.services.task_cancellation_cache import TaskCancellationCache
+
+
+class TestTaskCancellationCache:
+
+    @pytest.mark.asyncio
+    async def test_is_task_cancelled_checks_redis_flag(self):
+        # Arrange
+        redis_client = Mock()
+        redis_client.exists = AsyncMock(return_value=1)
+        cache = TaskCancellationCache(redis_client=redis_client)
+
+        # Act
+        cancelled = await cache.is_task_cancelled(2)
+
+        # Assert
+        assert cancelled
+        redis_client.exists.assert_awaited_once_with("task:2:cancel")
+
+    def test_cancel_event_notifies_listeners(self):
+        # Arrange
+        cache = TaskCancellationCache(redis_client=Mock())
+        events = []
+        cache.add_cancel_listener(lambda task_id, cancelled_at: events.append((task_id, cancelled_at)))
+
+        # Act
+        cache._dispatch(b'{"task_id": 7, "cancelled_at": 1700000000.5}')
+        cache._dispatch(b"not json")
+
+        # Assert
+        assert events == [(7, 1700000000.5)]
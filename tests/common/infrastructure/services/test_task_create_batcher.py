@@ -0,0 +1,87 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.domain.models import DEFAULT_TASK_TYPE, Task, TaskPriority, TaskStatus
+from common.domain.repo.task_repo import ITaskRepository
+from common.domain.services.prometheus_service import IPrometheusMetricsService
+from common.infrastructure.services.task_create_batcher import TaskCreateBatcher
+
+
+def make_batcher(mock_repo, window=0.01, max_batch_size=100):
+    @asynccontextmanager
+    async def task_repo_factory():
+        yield mock_repo
+
+    return TaskCreateBatcher(
+        task_repo_factory=task_repo_factory,
+        metrics=Mock(spec=IPrometheusMetricsService),
+        window=window,
+        max_batch_size=max_batch_size,
+    )
+
+
+async def fake_create_tasks(payloads, task_types, priorities):
+    return [
+        Task(id=index + 1, payload=payload, status=TaskStatus.PENDING, task_type=task_type, priority=priority)
+        for index, (payload, task_type, priority) in enumerate(zip(payloads, task_types, priorities))
+    ]
+
+
+class TestTaskCreateBatcher:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_creates_share_one_commit(self):
+        # Arrange
+        mock_repo = AsyncMock(spec=ITaskRepository)
+        mock_repo.create_tasks.side_effect = fake_create_tasks
+        batcher = make_batcher(mock_repo)
+
+        # Act
+        tasks = await asyncio.gather(
+            batcher.create_task("payload 0"),
+            batcher.create_task("payload 1", task_type="report"),
+            batcher.create_task("payload 2", priority=TaskPriority.HIGH),
+        )
+
+        # Assert
+        mock_repo.create_tasks.assert_called_once_with(
+            ["payload 0", "payload 1", "payload 2"],
+            [DEFAULT_TASK_TYPE, "report", DEFAULT_TASK_TYPE],
+            [TaskPriority.NORMAL, TaskPriority.NORMAL, TaskPriority.HIGH],
+        )
+        assert [task.task_type for task in tasks] == [DEFAULT_TASK_TYPE, "report", DEFAULT_TASK_TYPE]
+        assert [task.id for task in tasks] == [1, 2, 3]
+        assert [task.payload for task in tasks] == ["payload 0", "payload 1", "payload 2"]
+        batcher.metrics.observe_create_batch_size.assert_called_once_with(3)
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_max_batch_size_reached(self):
+        # Arrange
+        mock_repo = AsyncMock(spec=ITaskRepository)
+        mock_repo.create_tasks.side_effect = fake_create_tasks
+        batcher = make_batcher(mock_repo, window=10, max_batch_size=2)
+
+        # Act
+        tasks = await asyncio.wait_for(
+            asyncio.gather(batcher.create_task("a"), batcher.create_task("b")),
+            timeout=1,
+        )
+
+        # Assert
+        assert [task.payload for task in tasks] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_repo_failure_propagates_to_every_caller(self):
+        # Arrange
+        mock_repo = AsyncMock(spec=ITaskRepository)
+        mock_repo.create_tasks.side_effect = Exception("Repository failure")
+        batcher = make_batcher(mock_repo)
+
+        # Act
+        results = await asyncio.gather(batcher.create_task("a"), batcher.create_task("b"), return_exceptions=True)
+
+        # Assert
+        assert all(str(result) == "Repository failure" for result in results)
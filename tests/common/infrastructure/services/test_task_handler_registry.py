@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+
+from common.applications.use_case.consumer.task_handlers import compute_checksum
+from common.domain.models import TaskRecord
+from common.domain.services.task_handler import BatchTaskHandler, ExecutionBackend, TaskHandler, UnknownTaskTypeError
+from common.infrastructure.services.task_handler_registry import TaskHandlerRegistry
+
+
+def make_task(payload: str = "payload", task_type: str = "default") -> TaskRecord:
+    return TaskRecord.from_row(1, payload, "PROCESSING", datetime.now(), task_type)
+
+
+class TestTaskHandlerRegistry:
+
+    def test_get_unknown_task_type_raises(self):
+        registry = TaskHandlerRegistry()
+
+        with pytest.raises(UnknownTaskTypeError):
+            registry.get("unknown")
+
+    def test_register_duplicate_task_type_raises(self):
+        registry = TaskHandlerRegistry()
+        registry.register(TaskHandler(task_type="default", func=print, backend=ExecutionBackend.THREAD))
+
+        with pytest.raises(ValueError):
+            registry.register(TaskHandler(task_type="default", func=print, backend=ExecutionBackend.THREAD))
+
+    @pytest.mark.asyncio
+    async def test_thread_backend_runs_off_the_event_loop(self):
+        # Arrange
+        registry = TaskHandlerRegistry(thread_workers=2)
+        handler = TaskHandler(
+            task_type="blocking",
+            func=lambda payload: (payload, threading.current_thread().name),
+            backend=ExecutionBackend.THREAD,
+        )
+
+        # Act
+        payload, thread_name = await registry.run(handler, make_task())
+        registry.shutdown()
+
+        # Assert
+        assert payload == "payload"
+        assert thread_name.startswith("task-handler")
+
+    @pytest.mark.asyncio
+    async def test_backend_concurrency_limit(self):
+        # Arrange
+        registry = TaskHandlerRegistry(asyncio_concurrency=2)
+        running, max_running = 0, 0
+
+        async def func(payload):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        handler = TaskHandler(task_type="default", func=func)
+
+        # Act
+        await asyncio.gather(*[registry.run(handler, make_task()) for _ in range(5)])
+
+        # Assert
+        assert max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_process_backend_runs_cpu_bound_handler(self):
+        # Arrange
+        registry = TaskHandlerRegistry(process_workers=1)
+        handler = TaskHandler(task_type="checksum", func=compute_checksum, backend=ExecutionBackend.PROCESS)
+
+        # Act
+        result = await registry.run(handler, make_task("abc"))
+        registry.shutdown()
+
+        # Assert
+        assert result == compute_checksum("abc")
+
+    @pytest.mark.asyncio
+    async def test_run_batch_rejects_outcome_length_mismatch(self):
+        # Arrange
+        registry = TaskHandlerRegistry()
+
+        async def func(tasks):
+            return [None]
+
+        handler = BatchTaskHandler(task_type="bulk", func=func)
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            await registry.run_batch(handler, [make_task(), make_task()])
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.domain.services.prometheus_service import IPrometheusMetricsService
+from common.infrastructure.services.task_result_cache import TaskResultCache
+
+
+def make_cache(redis_value=None, **kwargs):
+    redis_client = Mock(get=AsyncMock(return_value=redis_value), set=AsyncMock())
+    metrics = Mock(spec=IPrometheusMetricsService)
+    return TaskResultCache(redis_client=redis_client, metrics=metrics, **kwargs), redis_client, metrics
+
+
+def lookups(metrics) -> list[str]:
+    return [call.args[0] for call in metrics.inc_result_cache_lookup.call_args_list]
+
+
+class TestTaskResultCache:
+
+    @pytest.mark.asyncio
+    async def test_miss_computes_once_and_later_calls_hit_local(self):
+        # Arrange
+        cache, redis_client, metrics = make_cache(ttl=60)
+        compute = AsyncMock(return_value="abc")
+
+        # Act
+        first = await cache.get_or_compute("checksum", "payload", compute)
+        second = await cache.get_or_compute("checksum", "payload", compute)
+
+        # Assert
+        assert first == second == "abc"
+        compute.assert_awaited_once()
+        key = redis_client.set.await_args.args[0]
+        redis_client.set.assert_awaited_once_with(key, json.dumps("abc"), ex=60)
+        assert lookups(metrics) == ["miss", "local_hit"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_share_one_execution(self):
+        # Arrange
+        cache, _, metrics = make_cache()
+        release = asyncio.Event()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await release.wait()
+            return "abc"
+
+        # Act
+        runs = [asyncio.create_task(cache.get_or_compute("checksum", "payload", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*runs)
+
+        # Assert
+        assert results == ["abc"] * 3
+        assert len(calls) == 1
+        assert sorted(lookups(metrics)) == ["coalesced", "coalesced", "miss"]
+
+    @pytest.mark.asyncio
+    async def test_redis_hit_skips_compute(self):
+        # Arrange: 其他 consumer 已經算過
+        cache, _, metrics = make_cache(redis_value=json.dumps("abc").encode())
+        compute = AsyncMock()
+
+        # Act
+        result = await cache.get_or_compute("checksum", "payload", compute)
+
+        # Assert
+        assert result == "abc"
+        compute.assert_not_awaited()
+        assert lookups(metrics) == ["redis_hit"]
+
+    @pytest.mark.asyncio
+    async def test_failure_is_not_cached(self):
+        # Arrange
+        cache, redis_client, _ = make_cache()
+        compute = AsyncMock(side_effect=[ValueError("boom"), "abc"])
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            await cache.get_or_compute("checksum", "payload", compute)
+        assert await cache.get_or_compute("checksum", "payload", compute) == "abc"
+        redis_client.set.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_execution_is_taken_over_by_waiting_call(self):
+        # Arrange
+        cache, _, _ = make_cache()
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(10)
+
+        leader = asyncio.create_task(cache.get_or_compute("checksum", "payload", compute))
+        await started.wait()
+        follower = asyncio.create_task(cache.get_or_compute("checksum", "payload", AsyncMock(return_value="abc")))
+        await asyncio.sleep(0)
+
+        # Act: 正在執行的 task 被中斷
+        leader.cancel()
+
+        # Assert: 等待中的 task 不會跟著取消，改由它自己執行
+        assert await follower == "abc"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    @pytest.mark.asyncio
+    async def test_local_tier_evicts_least_recently_used(self):
+        # Arrange
+        cache, _, _ = make_cache(max_entries=2)
+        for payload in ("a", "b"):
+            await cache.get_or_compute("checksum", payload, AsyncMock(return_value=payload))
+        await cache.get_or_compute("checksum", "a", AsyncMock())
+
+        # Act
+        await cache.get_or_compute("checksum", "c", AsyncMock(return_value="c"))
+
+        # Assert: 最久沒用到的 b 被淘汰
+        assert cache._get_local(cache._key("checksum", "a")) == (True, "a")
+        assert cache._get_local(cache._key("checksum", "b")) == (False, None)
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from common.infrastructure.services.weighted_fair_queue import WeightedFairQueue
+
+
+def make_queue(weights=None) -> WeightedFairQueue[tuple[str, int]]:
+    return WeightedFairQueue(weights=weights or {"high": 3, "low": 1}, key=lambda item: item[0])
+
+
+class TestWeightedFairQueue:
+
+    def test_backlogged_classes_share_by_weight(self):
+        # Arrange
+        queue = make_queue()
+        for index in range(8):
+            queue.put_nowait(("low", index))
+            queue.put_nowait(("high", index))
+
+        # Act
+        classes = [queue.get_nowait()[0] for _ in range(8)]
+
+        # Assert: 3:1, 且交錯取出而不是連續取完同一個 class
+        assert classes.count("high") == 6
+        assert classes.count("low") == 2
+        assert classes[:4] == ["high", "high", "low", "high"]
+
+    def test_single_backlogged_class_gets_everything(self):
+        # Arrange
+        queue = make_queue()
+        for index in range(3):
+            queue.put_nowait(("low", index))
+
+        # Act & Assert: 權重低也不會閒置，同一個 class 內維持 FIFO
+        assert [queue.get_nowait() for _ in range(3)] == [("low", 0), ("low", 1), ("low", 2)]
+        assert queue.empty()
+        with pytest.raises(asyncio.QueueEmpty):
+            queue.get_nowait()
+
+    def test_unknown_class_goes_to_default_class(self):
+        queue = WeightedFairQueue(weights={"high": 3, "normal": 1}, key=lambda item: item[0], default_class="normal")
+
+        queue.put_nowait(("unknown", 1))
+
+        assert queue.class_size("normal") == 1
+
+    @pytest.mark.asyncio
+    async def test_get_waits_for_item(self):
+        # Arrange
+        queue = make_queue()
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+
+        # Act
+        queue.put_nowait(("high", 1))
+
+        # Assert
+        assert await asyncio.wait_for(getter, timeout=1) == ("high", 1)
+        assert queue.qsize() == 0
@@ -0,0 +1,122 @@
+"""
+TaskProcessUseCase.process_batch benchmark: 比較同一批 task 交給一般 handler 與 batch handler 的耗時
+
+- per-task: 每個 task 一個 coroutine, 各自呼叫一次下游
+- batch: 同 task_type 的整批 task 一次交給 handler, 下游只呼叫一次
+
+兩種 workload:
+- overhead: 下游不花時間，只比較 use case 本身每個 task 的排程成本
+- round trip: 下游每次呼叫固定延遲，且最多 DOWNSTREAM_CONNECTIONS 個並行呼叫 (connection pool 的上限)
+
+repo 與 cache 都是 in-memory 的 fake, 量到的只有 handler 的呼叫方式造成的差異
+執行:
+    python -m tests.performance.bench_batch_handler
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from common.applications.use_case.consumer.task_processing import TaskProcessUseCase
+from common.domain.models import TaskRecord
+from common.domain.services.consume_queue_service import TaskMessage
+from common.domain.services.task_handler import BatchTaskHandler, TaskHandler
+from common.infrastructure.services.task_handler_registry import TaskHandlerRegistry
+
+BATCH_SIZES = (32, 128, 500, 1000)
+RUNS = 5
+ROUND_TRIP = 0.002
+DOWNSTREAM_CONNECTIONS = 16
+
+
+class FakeTaskRepository:
+    def __init__(self):
+        self.tasks: dict[int, TaskRecord] = {}
+
+    async def claim_tasks(self, task_ids):
+        return [self.tasks[task_id] for task_id in task_ids]
+
+    async def update_tasks(self, tasks, expected_statuses=None):
+        return [task.id for task in tasks]
+
+
+class FakeStatusCache:
+    async def set_statuses(self, statuses):
+        pass
+
+
+class NullMetrics:
+    def __getattr__(self, name):
+        return self._noop
+
+    @staticmethod
+    def _noop(*args, **kwargs):
+        pass
+
+    async def inc_label(self, label):
+        pass
+
+
+def make_handler(batch: bool, round_trip: float):
+    async def call_downstream():
+        if round_trip:
+            await asyncio.sleep(round_trip)
+
+    if batch:
+
+        async def bulk(tasks):
+            await call_downstream()
+            return [None] * len(tasks)
+
+        return BatchTaskHandler(task_type="default", func=bulk)
+
+    async def single(payload):
+        await call_downstream()
+
+    return TaskHandler(task_type="default", func=single)
+
+
+async def measure(batch: bool, round_trip: float, batch_size: int) -> float:
+    """回傳每批的平均毫秒數"""
+    repo = FakeTaskRepository()
+
+    @asynccontextmanager
+    async def task_repo_factory():
+        yield repo
+
+    registry = TaskHandlerRegistry(asyncio_concurrency=DOWNSTREAM_CONNECTIONS)
+    registry.register(make_handler(batch, round_trip))
+    use_case = TaskProcessUseCase(
+        task_repo_factory=task_repo_factory,
+        metrics=NullMetrics(),
+        status_cache=FakeStatusCache(),
+        handler_registry=registry,
+    )
+
+    elapsed = 0.0
+    for run in range(RUNS):
+        repo.tasks = {
+            task_id: TaskRecord.from_row(task_id, "bench", "PROCESSING", datetime.now())
+            for task_id in range(run * batch_size, (run + 1) * batch_size)
+        }
+        messages = [TaskMessage(task_id=task_id) for task_id in repo.tasks]
+
+        started = time.perf_counter()
+        await use_case.process_batch(messages)
+        elapsed += time.perf_counter() - started
+    return elapsed / RUNS * 1000
+
+
+async def main():
+    for name, round_trip in (("overhead", 0.0), ("round trip", ROUND_TRIP)):
+        print(f"{name}:")
+        print(f"{'batch':>6} {'per-task (ms)':>14} {'batch (ms)':>11} {'speedup':>8}")
+        for batch_size in BATCH_SIZES:
+            per_task = await measure(False, round_trip, batch_size)
+            batch = await measure(True, round_trip, batch_size)
+            print(f"{batch_size:>6} {per_task:>14.2f} {batch:>11.2f} {per_task / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
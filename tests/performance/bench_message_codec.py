@@ -0,0 +1,67 @@
+"""
+Message codec microbenchmark: 比較每個 message 在 publish + consume 路徑上花費的 CPU 時間
+
+- before: json.dumps 發送，consumer 端 process_batch 與 consume 各 json.loads 一次
+- after: publish 時 codec encode 一次，consumer 只讀 header 的 task_id, 不 decode body (payload 由 database 讀回)
+
+執行: python -m tests.performance.bench_message_codec
+"""
+
+import json
+import time
+
+from common.domain.services.message_codec import TASK_ID_HEADER
+from common.infrastructure.services.message_codec import MESSAGE_CODECS
+
+BATCH_SIZES = (32, 128, 512, 1024)
+MESSAGES_PER_RUN = 100_000
+
+
+def make_batch(batch_size: int) -> list[dict]:
+    return [{"task_id": 1_000_000 + i, "payload": "performance test payload"} for i in range(batch_size)]
+
+
+def baseline_round_trip(batch: list[dict]):
+    bodies = [json.dumps(message).encode() for message in batch]
+    task_ids = [json.loads(body)["task_id"] for body in bodies]
+    success_task_ids = set(task_ids)
+    for body in bodies:
+        json.loads(body).get("task_id") in success_task_ids
+
+
+def codec_round_trip(codec, batch: list[dict]):
+    deliveries = [(codec.encode(message), {TASK_ID_HEADER: message["task_id"]}) for message in batch]
+    success_task_ids = {int(headers[TASK_ID_HEADER]) for _, headers in deliveries}
+    for _, headers in deliveries:
+        headers[TASK_ID_HEADER] in success_task_ids
+
+
+def measure(round_trip, batch: list[dict]) -> float:
+    """回傳每個 message 的 CPU 微秒數"""
+    runs = max(1, MESSAGES_PER_RUN // len(batch))
+    round_trip(batch)  # warm up
+    started = time.process_time()
+    for _ in range(runs):
+        round_trip(batch)
+    return (time.process_time() - started) / (runs * len(batch)) * 1_000_000
+
+
+def main():
+    codecs = {}
+    for name, codec_class in MESSAGE_CODECS.items():
+        try:
+            codecs[name] = codec_class()
+        except RuntimeError as e:
+            print(f"skip {name}: {e}")
+
+    print(f"{'batch':>6} {'before (us/msg)':>16} " + " ".join(f"{name + ' (us/msg)':>16}" for name in codecs))
+    for batch_size in BATCH_SIZES:
+        batch = make_batch(batch_size)
+        row = [measure(baseline_round_trip, batch)]
+        for codec in codecs.values():
+            row.append(measure(lambda b: codec_round_trip(codec, b), batch))
+        print(f"{batch_size:>6} " + " ".join(f"{value:>16.2f}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from common.applications.use_case.web_api.dead_letter import DeadLetterUseCase
+from common.domain.services.dead_letter_queue import DeadLetter
+from common.infrastructure.dependencies import get_dead_letter_use_case
+from web_api.main import create_app
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    client = TestClient(app)
+    return client
+
+
+def test_list_dead_letters(client):
+    # arrange
+    mock_dead_letter_use_case = AsyncMock(spec=DeadLetterUseCase)
+    mock_dead_letter_use_case.list_dead_letters.return_value = [
+        DeadLetter(
+            task_id=1, attempts=6, reason="processing_failed", original_queue="task_queue", dead_lettered_at=1.5
+        ),
+    ]
+    client.app.dependency_overrides[get_dead_letter_use_case] = lambda: mock_dead_letter_use_case
+
+    # act
+    response = client.get("/dead-letters", params={"limit": 10})
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "task_id": 1,
+            "attempts": 6,
+            "reason": "processing_failed",
+            "original_queue": "task_queue",
+            "dead_lettered_at": 1.5,
+        }
+    ]
+    mock_dead_letter_use_case.list_dead_letters.assert_awaited_once_with(10)
+
+
+def test_replay_dead_letters(client):
+    # arrange
+    mock_dead_letter_use_case = AsyncMock(spec=DeadLetterUseCase)
+    mock_dead_letter_use_case.replay_dead_letters.return_value = 3
+    client.app.dependency_overrides[get_dead_letter_use_case] = lambda: mock_dead_letter_use_case
+
+    # act
+    response = client.post("/dead-letters/replay", json={"limit": 5})
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == {"replayed": 3}
+    mock_dead_letter_use_case.replay_dead_letters.assert_awaited_once_with(5)
+
+
+def test_replay_dead_letters_rejects_invalid_limit(client):
+    response = client.post("/dead-letters/replay", json={"limit": 0})
+    assert response.status_code == 422
@@ -0,0 +1,26 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from web_api.main import create_app
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    client = TestClient(app)
+    return client
+
+
+def test_health(client):
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "healthy"}
+
+
+def test_ready_reports_warm_up_state(client):
+    client.app.state.ready = False
+    assert client.get("/ready").status_code == 503
+
+    client.app.state.ready = True
+    assert client.get("/ready").status_code == 200
@@ -4,7 +4,13 @@ import pytest
 from fastapi.testclient import TestClient
 
 from common.applications.use_case.web_api.task_create import CancelTaskUseCase, CreateTaskUseCase
-from common.domain.models import Task, TaskStatus
+from common.applications.use_case.web_api.task_status import (
+    BatchTaskStatusUseCase,
+    GetTaskStatusUseCase,
+    WatchTaskStatusUseCase,
+)
+from common.domain.models import Task, TaskPriority, TaskStatus
+from common.domain.services.idempotency_store import IdempotencyKeyInProgressError, IdempotencyKeyMismatchError
 from common.infrastructure.repo.task_repo import TaskNotFoundError
 from web_api.main import create_app
 
@@ -38,20 +44,112 @@ def test_create_task_success(client, mocker):
     assert response.json() == {"task_id": 1, "status": "PENDING"}
 
 
+def test_create_task_passes_idempotency_key(client):
+    # arrange
+    mock_create_task_use_case = AsyncMock(spec=CreateTaskUseCase)
+    mock_create_task_use_case.create_task.return_value = Task(id=1, payload="test payload", status=TaskStatus.PENDING)
+
+    from common.infrastructure.dependencies import get_create_task_use_case
+
+    client.app.dependency_overrides[get_create_task_use_case] = lambda: mock_create_task_use_case
+
+    # act
+    response = client.post("/tasks", json={"payload": "test payload"}, headers={"Idempotency-Key": "abc"})
+
+    # assert
+    assert response.status_code == 200
+    mock_create_task_use_case.create_task.assert_awaited_once_with(
+        payload="test payload", task_type="default", priority=TaskPriority.NORMAL, idempotency_key="abc"
+    )
+
+
+def test_create_task_idempotency_key_in_progress(client):
+    # arrange
+    mock_create_task_use_case = AsyncMock(spec=CreateTaskUseCase)
+    mock_create_task_use_case.create_task.side_effect = IdempotencyKeyInProgressError("abc")
+
+    from common.infrastructure.dependencies import get_create_task_use_case
+
+    client.app.dependency_overrides[get_create_task_use_case] = lambda: mock_create_task_use_case
+
+    # act
+    response = client.post("/tasks", json={"payload": "test payload"}, headers={"Idempotency-Key": "abc"})
+
+    # assert
+    assert response.status_code == 409
+
+
+def test_create_task_idempotency_key_reused_with_different_payload(client):
+    # arrange
+    mock_create_task_use_case = AsyncMock(spec=CreateTaskUseCase)
+    mock_create_task_use_case.create_task.side_effect = IdempotencyKeyMismatchError("abc")
+
+    from common.infrastructure.dependencies import get_create_task_use_case
+
+    client.app.dependency_overrides[get_create_task_use_case] = lambda: mock_create_task_use_case
+
+    # act
+    response = client.post("/tasks", json={"payload": "other payload"}, headers={"Idempotency-Key": "abc"})
+
+    # assert
+    assert response.status_code == 422
+
+
 def test_create_task_invalid_payload(client):
     response = client.post("/tasks", json={"payload": ""})
     assert response.status_code == 422  # 参数验证错误
 
 
+def test_create_tasks_batch_success(client, mocker):
+    # arrange
+    mock_tasks = [
+        Task(id=1, payload="payload 1", status=TaskStatus.PENDING),
+        Task(id=2, payload="payload 2", status=TaskStatus.PENDING),
+    ]
+    mock_create_task_use_case = AsyncMock(spec=CreateTaskUseCase)
+    mock_create_task_use_case.create_tasks.return_value = mock_tasks
+
+    def override_create_task_use_case():
+        return mock_create_task_use_case
+
+    app = client.app
+    from common.infrastructure.dependencies import get_create_task_use_case
+
+    app.dependency_overrides[get_create_task_use_case] = override_create_task_use_case
+
+    # act
+    response = client.post(
+        "/tasks/batch", json={"payloads": ["payload 1", "payload 2"], "task_type": "report", "priority": "low"}
+    )
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == [
+        {"task_id": 1, "status": "PENDING"},
+        {"task_id": 2, "status": "PENDING"},
+    ]
+    mock_create_task_use_case.create_tasks.assert_called_once_with(
+        payloads=["payload 1", "payload 2"],
+        task_type="report",
+        priority=TaskPriority.LOW,
+    )
+
+
+def test_create_tasks_batch_invalid_payload(client):
+    assert client.post("/tasks/batch", json={"payloads": []}).status_code == 422
+    assert client.post("/tasks/batch", json={"payloads": ["ok", " "]}).status_code == 422
+
+
 def test_cancel_task_success(client, mocker):
     # arrange
     mock_task = Task(id=1, payload="test payload", status=TaskStatus.PENDING)
     mock_cancel_task_use_case = CancelTaskUseCase(
         task_repo=mocker.Mock(
             get_task=AsyncMock(return_value=mock_task),
-            update_task=AsyncMock(),
+            update_tasks=AsyncMock(return_value=[1]),
         ),
         cancellation_cache=mocker.Mock(set_task_cancelled=mocker.AsyncMock()),
+        status_cache=mocker.Mock(set_statuses=mocker.AsyncMock()),
     )
 
     def override_cancel_task_use_case():
@@ -75,6 +173,7 @@ def test_cancel_task_not_found(client, mocker):
     mock_cancel_task_use_case = CancelTaskUseCase(
         task_repo=mocker.Mock(get_task=AsyncMock(side_effect=TaskNotFoundError(task_id=1))),
         cancellation_cache=mocker.Mock(),
+        status_cache=mocker.Mock(),
     )
 
     def override_cancel_task_use_case():
@@ -93,41 +192,60 @@ def test_cancel_task_not_found(client, mocker):
     assert response.json() == {"detail": "Task with ID 1 not found"}
 
 
+def override_task_status_use_case(app, task_repo, status_cache):
+    from common.infrastructure.dependencies import get_task_status_use_case
+
+    app.dependency_overrides[get_task_status_use_case] = lambda: GetTaskStatusUseCase(
+        task_repo=task_repo,
+        status_cache=status_cache,
+    )
+
+
 def test_get_task_status_success(client, mocker):
     # arrange
     mock_task = Task(id=1, payload="test payload", status=TaskStatus.COMPLETED)
 
     mock_task_repo = AsyncMock()
     mock_task_repo.get_task.return_value = mock_task
+    mock_status_cache = AsyncMock()
+    mock_status_cache.get_status.return_value = None
 
-    def override_get_task_repo():
-        return mock_task_repo
+    override_task_status_use_case(client.app, mock_task_repo, mock_status_cache)
 
-    app = client.app
-    from common.infrastructure.dependencies import get_task_repo
+    # act
+    response = client.get("/tasks/1/status")
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == {"task_id": 1, "status": "COMPLETED"}
+    mock_status_cache.backfill_status.assert_called_once_with(1, TaskStatus.COMPLETED)
 
-    app.dependency_overrides[get_task_repo] = override_get_task_repo
+
+def test_get_task_status_from_projection(client, mocker):
+    # arrange
+    mock_task_repo = AsyncMock()
+    mock_status_cache = AsyncMock()
+    mock_status_cache.get_status.return_value = TaskStatus.PROCESSING
+
+    override_task_status_use_case(client.app, mock_task_repo, mock_status_cache)
 
     # act
     response = client.get("/tasks/1/status")
 
     # assert
     assert response.status_code == 200
-    assert response.json() == {"task_id": 1, "status": "COMPLETED"}
+    assert response.json() == {"task_id": 1, "status": "PROCESSING"}
+    mock_task_repo.get_task.assert_not_called()
 
 
 def test_get_task_status_not_found(client, mocker):
     # arrange
     mock_task_repo = AsyncMock()
     mock_task_repo.get_task.side_effect = TaskNotFoundError(task_id=1)
+    mock_status_cache = AsyncMock()
+    mock_status_cache.get_status.return_value = None
 
-    def override_get_task_repo():
-        return mock_task_repo
-
-    app = client.app
-    from common.infrastructure.dependencies import get_task_repo
-
-    app.dependency_overrides[get_task_repo] = override_get_task_repo
+    override_task_status_use_case(client.app, mock_task_repo, mock_status_cache)
 
     # act
     response = client.get("/tasks/1/status")
@@ -135,3 +253,141 @@ def test_get_task_status_not_found(client, mocker):
     # assert
     assert response.status_code == 404
     assert response.json() == {"detail": "Task with ID 1 not found"}
+
+
+def test_wait_task_returns_final_status(client, mocker):
+    # arrange
+    mock_watch_use_case = AsyncMock(spec=WatchTaskStatusUseCase)
+    mock_watch_use_case.wait_for_task.return_value = TaskStatus.COMPLETED
+
+    app = client.app
+    from common.infrastructure.dependencies import get_watch_task_status_use_case
+
+    app.dependency_overrides[get_watch_task_status_use_case] = lambda: mock_watch_use_case
+
+    # act
+    response = client.get("/tasks/1/wait", params={"timeout": 5})
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == {"task_id": 1, "status": "COMPLETED"}
+    mock_watch_use_case.wait_for_task.assert_called_once_with(1, timeout=5)
+
+
+def test_stream_task_events(client, mocker):
+    # arrange
+    async def stream_task_statuses(task_ids, timeout):
+        yield 1, TaskStatus.PROCESSING
+        yield 1, TaskStatus.COMPLETED
+
+    mock_watch_use_case = mocker.Mock(spec=WatchTaskStatusUseCase)
+    mock_watch_use_case.stream_task_statuses = stream_task_statuses
+
+    app = client.app
+    from common.infrastructure.dependencies import get_watch_task_status_use_case
+
+    app.dependency_overrides[get_watch_task_status_use_case] = lambda: mock_watch_use_case
+
+    # act
+    response = client.get("/tasks/events", params={"ids": [1]})
+
+    # assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        'event: status\ndata: {"task_id": 1, "status": "PROCESSING"}\n\n'
+        'event: status\ndata: {"task_id": 1, "status": "COMPLETED"}\n\n'
+    )
+
+
+def test_get_task_statuses_batch(client, mocker):
+    # arrange
+    async def iter_task_statuses(task_ids):
+        for task_id in task_ids:
+            yield task_id, TaskStatus.COMPLETED
+
+    mock_batch_use_case = mocker.Mock(spec=BatchTaskStatusUseCase)
+    mock_batch_use_case.iter_task_statuses = iter_task_statuses
+
+    app = client.app
+    from common.infrastructure.dependencies import get_batch_task_status_use_case
+
+    app.dependency_overrides[get_batch_task_status_use_case] = lambda: mock_batch_use_case
+
+    # act
+    response = client.post("/tasks/status:batch", json={"task_ids": list(range(1, 1002))})
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == [{"task_id": task_id, "status": "COMPLETED"} for task_id in range(1, 1002)]
+
+
+def test_get_task_statuses_batch_fails_before_streaming(client, mocker):
+    # arrange
+    async def iter_task_statuses(task_ids):
+        raise ConnectionError("database is down")
+        yield
+
+    mock_batch_use_case = mocker.Mock(spec=BatchTaskStatusUseCase)
+    mock_batch_use_case.iter_task_statuses = iter_task_statuses
+
+    from common.infrastructure.dependencies import get_batch_task_status_use_case
+
+    client.app.dependency_overrides[get_batch_task_status_use_case] = lambda: mock_batch_use_case
+
+    # act
+    response = TestClient(client.app, raise_server_exceptions=False).post(
+        "/tasks/status:batch", json={"task_ids": [1, 2]}
+    )
+
+    # assert
+    assert response.status_code == 500
+
+
+def test_get_task_statuses_batch_ends_with_error_marker_on_mid_stream_failure(client, mocker):
+    # arrange: 第一個 chunk 送出之後 database stream 中斷
+    async def iter_task_statuses(task_ids):
+        for task_id in task_ids[:600]:
+            yield task_id, TaskStatus.COMPLETED
+        raise ConnectionError("database connection lost")
+
+    mock_batch_use_case = mocker.Mock(spec=BatchTaskStatusUseCase)
+    mock_batch_use_case.iter_task_statuses = iter_task_statuses
+
+    from common.infrastructure.dependencies import get_batch_task_status_use_case
+
+    client.app.dependency_overrides[get_batch_task_status_use_case] = lambda: mock_batch_use_case
+
+    # act
+    response = client.post("/tasks/status:batch", json={"task_ids": list(range(1, 1002))})
+
+    # assert: 仍然是合法的 JSON, 最後一個元素標記中斷
+    assert response.status_code == 200
+    body = response.json()
+    assert body[:-1] == [{"task_id": task_id, "status": "COMPLETED"} for task_id in range(1, 601)]
+    assert body[-1] == {"error": "Task status stream interrupted"}
+
+
+def test_get_task_statuses_batch_empty_result(client, mocker):
+    # arrange
+    async def iter_task_statuses(task_ids):
+        return
+        yield
+
+    mock_batch_use_case = mocker.Mock(spec=BatchTaskStatusUseCase)
+    mock_batch_use_case.iter_task_statuses = iter_task_statuses
+
+    from common.infrastructure.dependencies import get_batch_task_status_use_case
+
+    client.app.dependency_overrides[get_batch_task_status_use_case] = lambda: mock_batch_use_case
+
+    # act
+    response = client.post("/tasks/status:batch", json={"task_ids": [1]})
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_get_task_statuses_batch_rejects_empty_request(client):
+    assert client.post("/tasks/status:batch", json={"task_ids": []}).status_code == 422
@@ -0,0 +1,43 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from web_api.main import create_app, warm_up
+
+
+@pytest.mark.asyncio
+async def test_warm_up_retries_until_connections_succeed(mocker):
+    # arrange: 第一次 database 連不上，第二次 redis 連不上，第三次等到 database 恢復才成功
+    database_recovered = asyncio.Event()
+    warm_up_pool_results = iter([ConnectionError("database is down"), None, database_recovered])
+
+    async def warm_up_pool(connections):
+        result = next(warm_up_pool_results)
+        if isinstance(result, Exception):
+            raise result
+        if result:
+            await result.wait()
+
+    warm_up_pool = mocker.patch("web_api.main.warm_up_pool", AsyncMock(side_effect=warm_up_pool))
+    redis_client = Mock(ping=AsyncMock(side_effect=[True, ConnectionError("redis is down"), True]))
+    mocker.patch("web_api.main.get_redis_client", return_value=redis_client)
+    mocker.patch("web_api.main.get_task_status_notifier", return_value=Mock(start=AsyncMock()))
+
+    app = create_app()
+    app.state.ready = False
+    client = TestClient(app)
+
+    # act
+    warm_up_task = asyncio.create_task(warm_up(app, retry_delay=0))
+    while warm_up_pool.await_count < 3:
+        await asyncio.sleep(0)
+
+    # assert: 重試期間 /ready 維持 503, 完成後才變成 200
+    assert client.get("/ready").status_code == 503
+
+    database_recovered.set()
+    await asyncio.wait_for(warm_up_task, timeout=1)
+    assert client.get("/ready").status_code == 200
+    assert redis_client.ping.await_count == 3
@@ -1,10 +1,19 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 
-from common.domain.models import TaskStatus
+from common.domain.models import DEFAULT_TASK_TYPE, MAX_TASK_TYPE_LENGTH, TaskPriority, TaskStatus
+
+MAX_TASK_BATCH_SIZE = 1000
+MAX_WAIT_TIMEOUT = 60
+MAX_WATCH_TASK_IDS = 1000
+MAX_STATUS_BATCH_SIZE = 10000
+MAX_DEAD_LETTER_LIMIT = 1000
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
 
 
 class TaskPayload(BaseModel):
     payload: str
+    task_type: str = Field(DEFAULT_TASK_TYPE, min_length=1, max_length=MAX_TASK_TYPE_LENGTH)
+    priority: TaskPriority = TaskPriority.NORMAL
 
     @field_validator("payload")
     def payload_must_not_be_empty(cls, value):
@@ -13,6 +22,39 @@ class TaskPayload(BaseModel):
         return value
 
 
+class TaskBatchPayload(BaseModel):
+    payloads: list[str] = Field(..., min_length=1, max_length=MAX_TASK_BATCH_SIZE)
+    task_type: str = Field(DEFAULT_TASK_TYPE, min_length=1, max_length=MAX_TASK_TYPE_LENGTH)
+    # backfill 之類的大量 task 建議使用 low, 不會延遲 high / normal 的 task
+    priority: TaskPriority = TaskPriority.NORMAL
+
+    @field_validator("payloads")
+    def payloads_must_not_be_empty(cls, values):
+        if any(not value.strip() for value in values):
+            raise ValueError("Payload cannot be empty or whitespace")
+        return values
+
+
+class TaskStatusBatchRequest(BaseModel):
+    task_ids: list[int] = Field(..., min_length=1, max_length=MAX_STATUS_BATCH_SIZE)
+
+
 class TaskResponse(BaseModel):
     task_id: int
     status: TaskStatus
+
+
+class DeadLetterResponse(BaseModel):
+    task_id: int | None
+    attempts: int
+    reason: str
+    original_queue: str
+    dead_lettered_at: float | None
+
+
+class DeadLetterReplayRequest(BaseModel):
+    limit: int = Field(100, ge=1, le=MAX_DEAD_LETTER_LIMIT)
+
+
+class DeadLetterReplayResponse(BaseModel):
+    replayed: int
@@ -5,6 +5,7 @@ from starlette.responses import JSONResponse
 
 from common.domain.models import OperationNotAllowed
 from common.domain.repo.task_repo import TaskNotFoundError
+from common.domain.services.idempotency_store import IdempotencyKeyInProgressError, IdempotencyKeyMismatchError
 
 
 def apply_exception_handler(app: FastAPI):
@@ -22,6 +23,20 @@ def apply_exception_handler(app: FastAPI):
             content={"detail": exc.message},
         )
 
+    @app.exception_handler(IdempotencyKeyInProgressError)
+    async def idempotency_key_in_progress_handler(request: Request, exc: IdempotencyKeyInProgressError):
+        return JSONResponse(
+            status_code=409,
+            content={"detail": "A request with the same Idempotency-Key is still in progress"},
+        )
+
+    @app.exception_handler(IdempotencyKeyMismatchError)
+    async def idempotency_key_mismatch_handler(request: Request, exc: IdempotencyKeyMismatchError):
+        return JSONResponse(
+            status_code=422,
+            content={"detail": "Idempotency-Key was already used with a different request"},
+        )
+
     @app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
         logger.exception(exc)
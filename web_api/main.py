@@ -1,13 +1,65 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from loguru import logger
 
+from common.infrastructure.database import warm_up_pool
+from common.infrastructure.dependencies import (
+    get_dead_letter_queue_service,
+    get_prometheus_metrics_service,
+    get_redis_client,
+    get_task_status_notifier,
+)
 from web_api.exception_handler import apply_exception_handler
+from web_api.routers.dead_letters import dead_letter_router
+from web_api.routers.health import health_router
 from web_api.routers.tasks import task_router
 
 
+async def warm_up(app: FastAPI, retry_delay: float = 1.0):
+    """
+    預先建立 database pool / redis / pub/sub 連線，避免 deploy 或 autoscale 後第一批 request 付出建立連線的延遲
+    失敗時持續重試，完成前 /ready 維持 503
+    """
+    db_connections = int(os.getenv("WEB_API_WARM_DB_CONNECTIONS", "10"))
+    while True:
+        try:
+            await asyncio.gather(
+                warm_up_pool(db_connections),
+                get_redis_client().ping(),
+                get_task_status_notifier().start(),
+            )
+            break
+        except Exception as e:
+            logger.error(f"Warm-up failed, retrying: {e}")
+            await asyncio.sleep(retry_delay)
+
+    app.state.ready = True
+    logger.info(f"Warm-up done ({db_connections} database connections)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    get_prometheus_metrics_service().start_server()
+    warm_up_task = asyncio.create_task(warm_up(app))
+
+    yield
+
+    app.state.ready = False
+    warm_up_task.cancel()
+    await get_task_status_notifier().close()
+    await get_dead_letter_queue_service().close()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
+    app.include_router(health_router)
     app.include_router(task_router)
+    app.include_router(dead_letter_router)
 
     apply_exception_handler(app=app)
 
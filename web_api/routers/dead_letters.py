@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, Query
+
+from common.applications.use_case.web_api.dead_letter import DeadLetterUseCase
+from common.infrastructure.dependencies import get_dead_letter_use_case
+from web_api.domain.models import (
+    MAX_DEAD_LETTER_LIMIT,
+    DeadLetterReplayRequest,
+    DeadLetterReplayResponse,
+    DeadLetterResponse,
+)
+
+dead_letter_router = APIRouter()
+
+
+@dead_letter_router.get("/dead-letters", response_model=list[DeadLetterResponse])
+async def list_dead_letters(
+    limit: int = Query(100, ge=1, le=MAX_DEAD_LETTER_LIMIT),
+    dead_letter_use_case: DeadLetterUseCase = Depends(get_dead_letter_use_case),
+):
+    """最舊的 limit 個 dead letter, 不會移出 queue"""
+    dead_letters = await dead_letter_use_case.list_dead_letters(limit)
+    return [DeadLetterResponse(**vars(dead_letter)) for dead_letter in dead_letters]
+
+
+@dead_letter_router.post("/dead-letters/replay", response_model=DeadLetterReplayResponse)
+async def replay_dead_letters(
+    replay_request: DeadLetterReplayRequest,
+    dead_letter_use_case: DeadLetterUseCase = Depends(get_dead_letter_use_case),
+):
+    """把最舊的 limit 個 dead letter 送回原本的 queue, 失敗次數重新計算"""
+    replayed = await dead_letter_use_case.replay_dead_letters(replay_request.limit)
+    return DeadLetterReplayResponse(replayed=replayed)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException, Request
+
+health_router = APIRouter()
+
+
+@health_router.get("/health")
+async def health_check():
+    """liveness: process 還活著就回 200"""
+    return {"status": "healthy"}
+
+
+@health_router.get("/ready")
+async def readiness_check(request: Request):
+    """readiness: 連線 warm-up 完成前回 503, load balancer 不會把流量導進來"""
+    if not getattr(request.app.state, "ready", False):
+        raise HTTPException(status_code=503, detail={"status": "warming_up"})
+    return {"status": "ready"}
@@ -1,9 +1,33 @@
-from fastapi import APIRouter, Depends
+import json
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from loguru import logger
 
 from common.applications.use_case.web_api.task_create import CancelTaskUseCase, CreateTaskUseCase
-from common.infrastructure.dependencies import get_cancel_task_use_case, get_create_task_use_case, get_task_repo
-from common.infrastructure.repo.task_repo import TaskRepository
-from web_api.domain.models import TaskPayload, TaskResponse
+from common.applications.use_case.web_api.task_status import (
+    BatchTaskStatusUseCase,
+    GetTaskStatusUseCase,
+    WatchTaskStatusUseCase,
+)
+from common.infrastructure.dependencies import (
+    get_batch_task_status_use_case,
+    get_cancel_task_use_case,
+    get_create_task_use_case,
+    get_task_status_use_case,
+    get_watch_task_status_use_case,
+)
+from web_api.domain.models import (
+    MAX_IDEMPOTENCY_KEY_LENGTH,
+    MAX_WAIT_TIMEOUT,
+    MAX_WATCH_TASK_IDS,
+    TaskBatchPayload,
+    TaskPayload,
+    TaskResponse,
+    TaskStatusBatchRequest,
+)
+
+STATUS_BATCH_CHUNK_SIZE = 500
 
 task_router = APIRouter()
 
@@ -11,15 +35,71 @@ task_router = APIRouter()
 @task_router.post("/tasks", response_model=TaskResponse)
 async def create_task(
     task_payload: TaskPayload,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=MAX_IDEMPOTENCY_KEY_LENGTH),
     create_task_use_case: CreateTaskUseCase = Depends(get_create_task_use_case),
 ):
+    """帶 Idempotency-Key 時，dedup window 內相同 key 的 request 回傳同一個 task"""
     domain_task = await create_task_use_case.create_task(
         payload=task_payload.payload,
+        task_type=task_payload.task_type,
+        priority=task_payload.priority,
+        idempotency_key=idempotency_key,
     )
 
     return TaskResponse(task_id=domain_task.id, status=domain_task.status)
 
 
+@task_router.post("/tasks/batch", response_model=list[TaskResponse])
+async def create_tasks(
+    task_batch_payload: TaskBatchPayload,
+    create_task_use_case: CreateTaskUseCase = Depends(get_create_task_use_case),
+):
+    domain_tasks = await create_task_use_case.create_tasks(
+        payloads=task_batch_payload.payloads,
+        task_type=task_batch_payload.task_type,
+        priority=task_batch_payload.priority,
+    )
+
+    return [TaskResponse(task_id=domain_task.id, status=domain_task.status) for domain_task in domain_tasks]
+
+
+@task_router.post("/tasks/status:batch")
+async def get_task_statuses(
+    status_batch_request: TaskStatusBatchRequest,
+    batch_task_status_use_case: BatchTaskStatusUseCase = Depends(get_batch_task_status_use_case),
+):
+    """
+    回傳 TaskResponse 的 JSON array, 不存在的 task id 會被略過
+    第一筆在開始 streaming 前讀取，database 一開始就失敗時回 5xx;
+    streaming 途中失敗時 status code 已經送出，以 {"error": ...} 作為最後一個元素結束 array
+    """
+    statuses = batch_task_status_use_case.iter_task_statuses(status_batch_request.task_ids)
+    first = await anext(statuses, None)
+
+    async def json_array_stream():
+        yield "["
+        if first is None:
+            yield "]"
+            return
+
+        chunk = [json.dumps({"task_id": first[0], "status": first[1].value})]
+        separator = ""
+        try:
+            async for task_id, status in statuses:
+                chunk.append(json.dumps({"task_id": task_id, "status": status.value}))
+                if len(chunk) >= STATUS_BATCH_CHUNK_SIZE:
+                    yield separator + ",".join(chunk)
+                    chunk, separator = [], ","
+        except Exception as e:
+            logger.exception(e)
+            chunk.append(json.dumps({"error": "Task status stream interrupted"}))
+        if chunk:
+            yield separator + ",".join(chunk)
+        yield "]"
+
+    return StreamingResponse(json_array_stream(), media_type="application/json")
+
+
 @task_router.post("/tasks/{task_id}/cancel", response_model=TaskResponse)
 async def cancel_task(
     task_id: int,
@@ -32,6 +112,36 @@ async def cancel_task(
 
 
 @task_router.get("/tasks/{task_id}/status", response_model=TaskResponse)
-async def get_task_status(task_id: int, task_repo: TaskRepository = Depends(get_task_repo)):
-    domain_task = await task_repo.get_task(task_id)
-    return TaskResponse(task_id=domain_task.id, status=domain_task.status)
+async def get_task_status(
+    task_id: int,
+    get_task_status_use_case: GetTaskStatusUseCase = Depends(get_task_status_use_case),
+):
+    status = await get_task_status_use_case.get_task_status(task_id)
+    return TaskResponse(task_id=task_id, status=status)
+
+
+@task_router.get("/tasks/{task_id}/wait", response_model=TaskResponse)
+async def wait_task(
+    task_id: int,
+    timeout: float = Query(30, ge=0, le=MAX_WAIT_TIMEOUT),
+    watch_task_status_use_case: WatchTaskStatusUseCase = Depends(get_watch_task_status_use_case),
+):
+    """long-poll: 任務結束 (COMPLETED / CANCELED / FAILED) 或 timeout 時回傳當下狀態"""
+    status = await watch_task_status_use_case.wait_for_task(task_id, timeout=timeout)
+    return TaskResponse(task_id=task_id, status=status)
+
+
+@task_router.get("/tasks/events")
+async def stream_task_events(
+    task_ids: list[int] = Query(..., alias="ids", min_length=1, max_length=MAX_WATCH_TASK_IDS),
+    timeout: float = Query(300, ge=0, le=3600),
+    watch_task_status_use_case: WatchTaskStatusUseCase = Depends(get_watch_task_status_use_case),
+):
+    """Server-Sent Events: 先送出目前狀態，之後每次狀態轉換送出一個 event, 全部結束後關閉"""
+
+    async def event_stream():
+        async for task_id, status in watch_task_status_use_case.stream_task_statuses(task_ids, timeout=timeout):
+            data = json.dumps(TaskResponse(task_id=task_id, status=status).model_dump(mode="json"))
+            yield f"event: status\ndata: {data}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")